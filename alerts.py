@@ -0,0 +1,296 @@
+import re
+
+import numpy as np
+
+# Values available to the rules, in the order of the rows' "valores" arrays.
+# Each row holds the previous and the last bar so crosses need no extra data.
+FEATURES = (
+    "precio", "SMA10", "SMA50", "SMA200", "MACD", "MACD_signal", "MACD_hist",
+    "%K", "%D", "RSI", "Volatilidad", "ATR14",
+)
+
+# Names accepted when writing a rule
+ALIASES = {name.upper(): name for name in FEATURES}
+ALIASES.update({
+    "PRECIO": "precio", "PRICE": "precio", "CIERRE": "precio", "CLOSE": "precio",
+    "SEÑAL": "MACD_signal", "SIGNAL": "MACD_signal", "HIST": "MACD_hist",
+    "ATR": "ATR14", "K": "%K", "D": "%D", "VOL": "Volatilidad",
+})
+
+LT, LE, GT, GE, CROSS_UP, CROSS_DOWN = range(6)
+
+OPERATORS = {"<": LT, "<=": LE, ">": GT, ">=": GE}
+CROSSES = {"ARRIBA": CROSS_UP, "ABAJO": CROSS_DOWN}
+SYMBOLS = {LT: "<", LE: "<=", GT: ">", GE: ">=", CROSS_UP: "cruza arriba", CROSS_DOWN: "cruza abajo"}
+
+_RULE = re.compile(
+    r"^\s*(?:(?P<ticker>[\w.\-^=]+)\s*:)?\s*(?P<lhs>[%\w]+)\s*"
+    r"(?:(?P<op><=|>=|<|>)|CRUZA\s+(?P<cross>ARRIBA|ABAJO)(?:\s+DE)?)\s*"
+    r"(?P<rhs>[%\w.\-]+)\s*$",
+    re.IGNORECASE
+)
+
+
+class Rule:
+    """A parsed alert condition, `text` is its normalized form and identifies it"""
+    __slots__ = ("ticker", "lhs", "kind", "rhs", "text")
+
+    def __init__(self, ticker, lhs, kind, rhs):
+        self.ticker = ticker
+        self.lhs = lhs
+        self.kind = kind
+        self.rhs = rhs
+        rhs_text = rhs if isinstance(rhs, str) else f"{rhs:g}"
+        scope = f"{ticker}: " if ticker else ""
+        self.text = f"{scope}{lhs} {SYMBOLS[kind]} {rhs_text}"
+
+
+def _feature(name: str) -> str:
+    feature = ALIASES.get(name.upper())
+    if feature is None:
+        raise ValueError(f"Indicador desconocido: {name}")
+    return feature
+
+
+def parse_rule(text: str) -> Rule:
+    """
+    Parses "RSI < 30", "precio cruza arriba SMA200", "MACD cruza abajo señal"
+    or "AAPL: ATR > 5". Without a ticker the rule applies to every ticker.
+    """
+    match = _RULE.match(text)
+    if match is None:
+        raise ValueError(f"No se pudo interpretar la regla: {text}")
+
+    lhs = _feature(match["lhs"])
+    if match["op"]:
+        kind = OPERATORS[match["op"]]
+    else:
+        kind = CROSSES[match["cross"].upper()]
+
+    try:
+        rhs = float(match["rhs"])
+    except ValueError:
+        rhs = _feature(match["rhs"])
+
+    ticker = match["ticker"].upper() if match["ticker"] else None
+    return Rule(ticker, lhs, kind, rhs)
+
+
+class Alert:
+    __slots__ = ("ticker", "rule", "value", "timestamp")
+
+    def __init__(self, ticker, rule, value, timestamp):
+        self.ticker = ticker
+        self.rule = rule
+        self.value = value
+        self.timestamp = timestamp
+
+    def __str__(self):
+        return f"{self.ticker}: {self.rule} ({self.value:.2f})"
+
+
+class AlertEngine:
+    """
+    Rules are compiled once into arrays and evaluated only for the tickers whose
+    last bar changed. Rules for every ticker are laid out in contiguous blocks of
+    the same indicator and operator, so a block is a single broadcast comparison
+    against its thresholds. Rules for one ticker are evaluated only for that
+    ticker. An alert fires when its condition goes from false to true: a
+    condition that stays true, or a cross during the bar it happened, is
+    notified once.
+    """
+
+    def __init__(self):
+        self.rules = []
+        self._codes = {}         # ticker -> row in the state arrays
+        self._fingerprints = {}  # ticker -> (timestamp, price) last evaluated
+        self._compile()
+        self._global_active = np.zeros((0, len(self._global)), dtype=bool)
+        self._scoped_active = np.zeros(len(self._scoped), dtype=bool)
+
+    def set_rules(self, rules: list):
+        seen = set()
+        rules = [r for r in rules if not (r.text in seen or seen.add(r.text))]
+        old_global = {rule.text: i for i, rule in enumerate(self._global)}
+        old_scoped = {rule.text: i for i, rule in enumerate(self._scoped)}
+        global_active, scoped_active = self._global_active, self._scoped_active
+
+        self.rules = rules
+        self._compile()
+        # New rules are checked against every ticker on the next cycle
+        self._fingerprints.clear()
+
+        # Keep which conditions were already true so editing rules doesn't renotify
+        positions = np.array([old_global.get(r.text, -1) for r in self._global], dtype=np.intp)
+        kept = positions >= 0
+        self._global_active = np.zeros((len(global_active), len(self._global)), dtype=bool)
+        self._global_active[:, kept] = global_active[:, positions[kept]]
+
+        positions = np.array([old_scoped.get(r.text, -1) for r in self._scoped], dtype=np.intp)
+        kept = positions >= 0
+        self._scoped_active = np.zeros(len(self._scoped), dtype=bool)
+        self._scoped_active[kept] = scoped_active[positions[kept]]
+
+    def add_rule(self, rule: Rule) -> bool:
+        if any(r.text == rule.text for r in self.rules):
+            return False
+        self.set_rules(self.rules + [rule])
+        return True
+
+    def remove_rule(self, text: str):
+        self.set_rules([r for r in self.rules if r.text != text])
+
+    def _code(self, ticker: str) -> int:
+        return self._codes.setdefault(ticker, len(self._codes))
+
+    def _compile(self):
+        index = {name: i for i, name in enumerate(FEATURES)}
+
+        # Rules for every ticker, sorted so each (indicator, operator) block against
+        # constants is contiguous; comparisons between indicators go last
+        def block(rule):
+            return (isinstance(rule.rhs, str), index[rule.lhs], rule.kind)
+
+        self._global = sorted((r for r in self.rules if r.ticker is None), key=block)
+        self._blocks = []
+        start = 0
+        for end in range(1, len(self._global) + 1):
+            if end < len(self._global) and block(self._global[end]) == block(self._global[start]):
+                continue
+            first = self._global[start]
+            if isinstance(first.rhs, str):
+                self._pairs_start = start
+                break
+            thresholds = np.array([r.rhs for r in self._global[start:end]], dtype=np.float64)
+            self._blocks.append((start, end, index[first.lhs], first.kind, thresholds))
+            start = end
+        else:
+            self._pairs_start = len(self._global)
+
+        self._global_lhs = np.array([index[r.lhs] for r in self._global], dtype=np.intp)
+        pairs = self._global[self._pairs_start:]
+        self._pair_lhs = np.array([index[r.lhs] for r in pairs], dtype=np.intp)
+        self._pair_rhs = np.array([index[r.rhs] for r in pairs], dtype=np.intp)
+        self._pair_kind = np.array([r.kind for r in pairs], dtype=np.int8)
+
+        # Rules for a single ticker, evaluated as flat (ticker, rule) pairs
+        self._scoped = [r for r in self.rules if r.ticker is not None]
+        self._scoped_by_code = {}
+        for i, rule in enumerate(self._scoped):
+            self._scoped_by_code.setdefault(self._code(rule.ticker), []).append(i)
+        self._scoped_by_code = {c: np.array(v, dtype=np.intp) for c, v in self._scoped_by_code.items()}
+        self._scoped_lhs = np.array([index[r.lhs] for r in self._scoped], dtype=np.intp)
+        self._scoped_kind = np.array([r.kind for r in self._scoped], dtype=np.int8)
+        is_feature = np.array([isinstance(r.rhs, str) for r in self._scoped], dtype=bool)
+        self._scoped_rhs_is_feature = is_feature
+        self._scoped_rhs = np.array([index[r.rhs] if isinstance(r.rhs, str) else 0 for r in self._scoped], dtype=np.intp)
+        self._scoped_const = np.array([np.nan if isinstance(r.rhs, str) else r.rhs for r in self._scoped], dtype=np.float64)
+
+    def evaluate(self, rows: dict) -> list:
+        """
+        rows: {ticker: row with "valores" (2 x len(FEATURES)), "timestamp" and "price"}.
+        Tickers whose last bar didn't change since the previous call are skipped.
+        Returns the alerts that fired.
+        """
+        changed = []
+        for ticker, row in rows.items():
+            if row is None or row.get("valores") is None:
+                continue
+            fingerprint = (row["timestamp"], row["price"])
+            if self._fingerprints.get(ticker) == fingerprint:
+                continue
+            self._fingerprints[ticker] = fingerprint
+            changed.append(ticker)
+
+        if not changed or not self.rules:
+            return []
+
+        values = np.stack([rows[t]["valores"] for t in changed])  # T x 2 x F
+        codes = np.array([self._code(t) for t in changed], dtype=np.intp)
+
+        alerts = []
+        with np.errstate(invalid="ignore"):
+            if self._global:
+                fired_rows, fired_cols = np.nonzero(self._evaluate_global(values, codes))
+                current = values[fired_rows, 1, self._global_lhs[fired_cols]]
+                alerts += self._alerts(changed, rows, self._global, fired_rows, fired_cols, current)
+            if self._scoped:
+                fired_rows, fired_cols = self._evaluate_scoped(values, codes)
+                current = values[fired_rows, 1, self._scoped_lhs[fired_cols]]
+                alerts += self._alerts(changed, rows, self._scoped, fired_rows, fired_cols, current)
+        return alerts
+
+    @staticmethod
+    def _alerts(changed, rows, rules, fired_rows, fired_cols, current):
+        return [
+            Alert(changed[row], rules[col].text, value, rows[changed[row]]["timestamp"])
+            for row, col, value in zip(fired_rows.tolist(), fired_cols.tolist(), current.tolist())
+        ]
+
+    def _evaluate_global(self, values, codes):
+        result = np.empty((len(codes), len(self._global)), dtype=bool)
+        for start, end, feature, kind, thresholds in self._blocks:
+            result[:, start:end] = _compare(
+                kind, values[:, 1, feature, None], thresholds,
+                values[:, 0, feature, None], thresholds
+            )
+        if self._pairs_start < len(self._global):
+            result[:, self._pairs_start:] = _compare(
+                self._pair_kind,
+                values[:, 1, self._pair_lhs], values[:, 1, self._pair_rhs],
+                values[:, 0, self._pair_lhs], values[:, 0, self._pair_rhs]
+            )
+
+        if len(self._global_active) < len(self._codes):
+            grown = np.zeros((len(self._codes), len(self._global)), dtype=bool)
+            grown[:len(self._global_active)] = self._global_active
+            self._global_active = grown
+        fired = result & ~self._global_active[codes]
+        self._global_active[codes] = result
+        return fired
+
+    def _evaluate_scoped(self, values, codes):
+        rows, cols = [], []
+        for row, code in enumerate(codes):
+            rules = self._scoped_by_code.get(code)
+            if rules is not None:
+                rows.append(np.full(len(rules), row, dtype=np.intp))
+                cols.append(rules)
+        if not rows:
+            return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp)
+        rows, cols = np.concatenate(rows), np.concatenate(cols)
+
+        lhs = self._scoped_lhs[cols]
+        rhs = self._scoped_rhs[cols]
+        is_feature = self._scoped_rhs_is_feature[cols]
+        const = self._scoped_const[cols]
+        result = _compare(
+            self._scoped_kind[cols],
+            values[rows, 1, lhs], np.where(is_feature, values[rows, 1, rhs], const),
+            values[rows, 0, lhs], np.where(is_feature, values[rows, 0, rhs], const)
+        )
+        fired = result & ~self._scoped_active[cols]
+        self._scoped_active[cols] = result
+        return rows[fired], cols[fired]
+
+
+def _compare(kind, a, b, prev_a, prev_b):
+    """Evaluates an operator, `kind` can be a scalar or an array matching the operands"""
+    if np.isscalar(kind) or np.ndim(kind) == 0:
+        if kind == LT:
+            return a < b
+        if kind == LE:
+            return a <= b
+        if kind == GT:
+            return a > b
+        if kind == GE:
+            return a >= b
+        if kind == CROSS_UP:
+            return (prev_a <= prev_b) & (a > b)
+        return (prev_a >= prev_b) & (a < b)
+
+    return np.select(
+        [kind == LT, kind == LE, kind == GT, kind == GE, kind == CROSS_UP],
+        [a < b, a <= b, a > b, a >= b, (prev_a <= prev_b) & (a > b)],
+        (prev_a >= prev_b) & (a < b)
+    )
@@ -0,0 +1,550 @@
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import os
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, unquote, urlsplit
+
+import db
+import indicadores
+import memory
+import summaries
+from backoff import FetchBlocked
+from bars import resample
+from symbols import is_valid_symbol
+from tasks import fetch_news, load_or_download
+
+# Local JSON API over the same price store, indicator cache and summaries as the window:
+#
+#   python api.py --port 8766
+#   DASHBOARD_API_PORT=8766 python main.py      (served from inside the app)
+#
+#   GET /bars/AAPL?interval=1d&limit=300
+#   GET /indicators/AAPL?interval=1wk
+#   GET /news/AAPL
+#   GET /summary/AAPL
+#   GET /metrics
+
+HOST = os.getenv("DASHBOARD_API_HOST", "127.0.0.1")
+PORT = int(os.getenv("DASHBOARD_API_PORT", "0"))
+
+# Stored intervals are read as they are, coarser ones are resampled from the daily bars
+INTERVALS = ("5m", "1h", "1d", "1wk", "1mo")
+
+# Seconds a response is served again without recomputing it
+TTL = {
+    "bars": 30,
+    "indicators": 30,
+    "news": 10 * 60,
+    "summary": 10 * 60,
+}
+
+# Blocking work (downloads, pyarrow, the summarizer) runs on these threads
+WORKERS = 8
+
+# Seconds between cache budget checks when the API runs on its own, inside the app the window does it
+MEMORY_CHECK_INTERVAL = 5
+
+# Limits of a request head, anything larger is answered with 400
+MAX_HEADER_BYTES = 16 * 1024
+
+# Upper bounds of the latency histogram, in seconds
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+REASONS = {
+    200: "OK", 304: "Not Modified", 400: "Bad Request", 404: "Not Found",
+    405: "Method Not Allowed", 500: "Internal Server Error", 503: "Service Unavailable",
+}
+
+
+class ApiError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class Response:
+    __slots__ = ("status", "body", "etag", "content_type", "expires")
+
+    def __init__(self, status: int, body: bytes, content_type: str = "application/json", ttl: float = 0):
+        self.status = status
+        self.body = body
+        self.content_type = content_type
+        self.etag = f'"{hashlib.blake2b(body, digest_size=12).hexdigest()}"'
+        self.expires = time.monotonic() + ttl
+
+
+def _json(status: int, payload, ttl: float = 0) -> Response:
+    # NaN (indicator warm-up, missing bars) isn't valid JSON, it goes out as null
+    return Response(status, json.dumps(_finite(payload), ensure_ascii=False).encode(), ttl=ttl)
+
+
+def _finite(value):
+    if isinstance(value, float):
+        return value if math.isfinite(value) else None
+    if isinstance(value, dict):
+        return {k: _finite(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_finite(v) for v in value]
+    return value
+
+
+# ---------- Metrics ----------
+
+class Metrics:
+    """Counters and a latency histogram, rendered in the Prometheus text format"""
+
+    def __init__(self):
+        self.requests = defaultdict(int)     # (endpoint, status) -> count
+        self.latency = defaultdict(lambda: [0] * (len(BUCKETS) + 1))
+        self.latency_sum = defaultdict(float)
+        self.cache_hits = defaultdict(int)
+        self.coalesced = defaultdict(int)
+        self.computed = defaultdict(int)
+        self.not_modified = 0
+        self.in_flight = 0
+        self.connections = 0
+
+    def observe(self, endpoint: str, status: int, seconds: float):
+        self.requests[(endpoint, status)] += 1
+        counts = self.latency[endpoint]
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                counts[i] += 1
+                break
+        else:
+            counts[-1] += 1
+        self.latency_sum[endpoint] += seconds
+
+    def render(self, cache_bytes: int) -> str:
+        lines = [
+            "# HELP dashboard_api_requests_total Requests answered, by endpoint and status.",
+            "# TYPE dashboard_api_requests_total counter",
+        ]
+        for (endpoint, status), count in sorted(self.requests.items()):
+            lines.append(f'dashboard_api_requests_total{{endpoint="{endpoint}",status="{status}"}} {count}')
+
+        lines += [
+            "# HELP dashboard_api_request_seconds Time to answer a request.",
+            "# TYPE dashboard_api_request_seconds histogram",
+        ]
+        for endpoint, counts in sorted(self.latency.items()):
+            cumulative = 0
+            for bound, count in zip(BUCKETS + ("+Inf",), counts):
+                cumulative += count
+                lines.append(f'dashboard_api_request_seconds_bucket{{endpoint="{endpoint}",le="{bound}"}} {cumulative}')
+            lines.append(f'dashboard_api_request_seconds_sum{{endpoint="{endpoint}"}} {self.latency_sum[endpoint]:.6f}')
+            lines.append(f'dashboard_api_request_seconds_count{{endpoint="{endpoint}"}} {cumulative}')
+
+        for name, help_text, values in (
+            ("cache_hits_total", "Responses served from the response cache.", self.cache_hits),
+            ("coalesced_total", "Requests that waited for an identical one already running.", self.coalesced),
+            ("computed_total", "Responses computed from the stores.", self.computed),
+        ):
+            lines += [f"# HELP dashboard_api_{name} {help_text}", f"# TYPE dashboard_api_{name} counter"]
+            for endpoint, count in sorted(values.items()):
+                lines.append(f'dashboard_api_{name}{{endpoint="{endpoint}"}} {count}')
+
+        lines += [
+            "# HELP dashboard_api_not_modified_total Requests answered 304 through If-None-Match.",
+            "# TYPE dashboard_api_not_modified_total counter",
+            f"dashboard_api_not_modified_total {self.not_modified}",
+            "# HELP dashboard_api_in_flight Computations running.",
+            "# TYPE dashboard_api_in_flight gauge",
+            f"dashboard_api_in_flight {self.in_flight}",
+            "# HELP dashboard_api_connections Open connections.",
+            "# TYPE dashboard_api_connections gauge",
+            f"dashboard_api_connections {self.connections}",
+            "# HELP dashboard_api_cache_bytes Bytes held by the response cache.",
+            "# TYPE dashboard_api_cache_bytes gauge",
+            f"dashboard_api_cache_bytes {cache_bytes}",
+        ]
+        return "\n".join(lines) + "\n"
+
+
+# ---------- Response cache ----------
+
+class ResponseCache:
+    """
+    Encoded responses by request key, least recently used first.
+    Registered in the memory budget, trim may run on any thread.
+    """
+
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key) -> Response | None:
+        with self._lock:
+            response = self._entries.get(key)
+            if response is None:
+                return None
+            if response.expires < time.monotonic():
+                self._drop(key)
+                return None
+            self._entries.move_to_end(key)
+            return response
+
+    def put(self, key, response: Response):
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = response
+            self._bytes += len(response.body)
+
+    def _drop(self, key):
+        self._bytes -= len(self._entries.pop(key).body)
+
+    def nbytes(self) -> int:
+        return self._bytes
+
+    def trim(self, target: int):
+        with self._lock:
+            while self._entries and self._bytes > target:
+                self._drop(next(iter(self._entries)))
+
+
+# ---------- Endpoints ----------
+
+def _ticker(value: str) -> str:
+    ticker = unquote(value).strip().upper()
+    if not is_valid_symbol(ticker):
+        raise ApiError(400, f"Ticker inválido: {ticker}")
+    return ticker
+
+
+def _interval(query: dict) -> str:
+    interval = query.get("interval", ["1d"])[0]
+    if interval not in INTERVALS:
+        raise ApiError(400, f"Intervalo inválido: {interval}, se espera uno de {', '.join(INTERVALS)}")
+    return interval
+
+
+def _bars(ticker: str, interval: str):
+    source = interval if interval in ("5m", "1h", "1d") else "1d"
+    bars = load_or_download(ticker, source)
+    if bars is None or bars.empty:
+        raise ApiError(404, f"No se encontraron datos para {ticker}.")
+    return bars if source == interval else resample(bars, interval)
+
+
+def get_bars(ticker: str, query: dict) -> Response:
+    interval = _interval(query)
+    bars = _bars(ticker, interval)
+    try:
+        limit = int(query.get("limit", ["0"])[0])
+    except ValueError:
+        raise ApiError(400, "limit debe ser un entero")
+    if limit > 0:
+        bars = bars[-limit:]
+    return _json(200, {
+        "ticker": ticker,
+        "interval": interval,
+        "timezone": bars.tz,
+        # UTC nanoseconds, like the store
+        "timestamp": bars.timestamps.tolist(),
+        "open": bars.open.tolist(),
+        "high": bars.high.tolist(),
+        "low": bars.low.tolist(),
+        "close": bars.close.tolist(),
+        "volume": bars.volume.tolist(),
+    }, TTL["bars"])
+
+
+def _indicators(ticker: str, interval: str) -> dict:
+    bars = _bars(ticker, interval)
+    if len(bars) < 2:
+        raise ApiError(404, f"Muy pocas barras para calcular indicadores de {ticker}.")
+    # Same memoized series the chart and the indicator tiles use
+    series = indicadores.series_indicadores(ticker, interval, bars)
+    return indicadores.calcular_indicadores(bars, series)
+
+
+def get_indicators(ticker: str, query: dict) -> Response:
+    interval = _interval(query)
+    datos = _indicators(ticker, interval)
+    # Tuples end with (estado, info), the values before them depend on the indicator
+    return _json(200, {
+        "ticker": ticker,
+        "interval": interval,
+        "indicators": {
+            name: {"values": list(data[:-2]), "state": data[-2], "info": data[-1]}
+            for name, data in datos.items()
+        },
+    }, TTL["indicators"])
+
+
+def get_news(ticker: str, query: dict) -> Response:
+    return _json(200, {"ticker": ticker, "news": fetch_news(ticker)}, TTL["news"])
+
+
+def get_summary(ticker: str, query: dict) -> Response:
+    cached = db.load_summaries([ticker], summaries.MAX_AGE).get(ticker)
+    if cached is not None:
+        return _json(200, {"ticker": ticker, "summary": cached, "backend": "cache"}, TTL["summary"])
+
+    try:
+        news = fetch_news(ticker)
+    except Exception:
+        news = []
+    try:
+        datos = _indicators(ticker, "1d")
+    except ApiError:
+        datos = {}
+    if not news and not datos:
+        raise ApiError(404, f"No hay noticias ni indicadores para resumir {ticker}.")
+
+    summary, used = summaries.summarize(summaries.backend(), ticker, news, datos)
+    # Like the window, fallback summaries are served but not kept
+    if used != summaries.FALLBACK.name or summaries.BACKEND == used:
+        db.save_summary(ticker, summary)
+    return _json(200, {"ticker": ticker, "summary": summary, "backend": used}, TTL["summary"])
+
+
+ENDPOINTS = {
+    "bars": get_bars,
+    "indicators": get_indicators,
+    "news": get_news,
+    "summary": get_summary,
+}
+
+
+# ---------- Server ----------
+
+class ApiServer:
+    """
+    HTTP/1.1 server on asyncio streams, with keep-alive.
+    Identical requests running at the same time share one computation, answers are
+    cached for their endpoint's TTL and carry an ETag so unchanged data costs a 304.
+    """
+
+    def __init__(self, host: str = HOST, port: int = PORT, workers: int = WORKERS):
+        self.host = host
+        self.port = port
+        self.metrics = Metrics()
+        self.cache = ResponseCache()
+        self._pending = {}   # request key -> future of the response being computed
+        self._executor = ThreadPoolExecutor(workers, thread_name_prefix="api")
+        self._server = None
+        self._loop = None
+        memory.register("API", self.cache.nbytes, self.cache.trim)
+
+    async def start(self):
+        self._loop = asyncio.get_running_loop()
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def serve_forever(self):
+        if self._server is None:
+            await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    def stop(self):
+        """
+        Stops accepting connections and waits for the requests being computed, so
+        their database writes are queued before the app shuts the writer down.
+        Called from another thread than the server's loop.
+        """
+        if self._server is not None:
+            self._loop.call_soon_threadsafe(self._server.close)
+        self._executor.shutdown(wait=True)
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.metrics.connections += 1
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    break
+                except asyncio.LimitOverrunError:
+                    await self._write(writer, _json(400, {"error": "Encabezado demasiado largo"}), False)
+                    break
+                if len(head) > MAX_HEADER_BYTES:
+                    await self._write(writer, _json(400, {"error": "Encabezado demasiado largo"}), False)
+                    break
+
+                method, target, version, headers = self._parse(head)
+                keep_alive = (
+                    headers.get("connection", "").lower() != "close"
+                    if version == "HTTP/1.1" else headers.get("connection", "").lower() == "keep-alive"
+                )
+
+                start = time.perf_counter()
+                endpoint, response = await self._respond(method, target)
+                if response.status == 200 and response.etag in headers.get("if-none-match", ""):
+                    self.metrics.not_modified += 1
+                    response = self._not_modified(response)
+                self.metrics.observe(endpoint, response.status, time.perf_counter() - start)
+
+                await self._write(writer, response, keep_alive, head_only=method == "HEAD")
+                if not keep_alive:
+                    break
+        finally:
+            self.metrics.connections -= 1
+            writer.close()
+
+    @staticmethod
+    def _not_modified(response: Response) -> Response:
+        not_modified = Response(304, b"", response.content_type)
+        not_modified.etag = response.etag
+        not_modified.expires = response.expires
+        return not_modified
+
+    @staticmethod
+    def _parse(head: bytes):
+        lines = head.decode("latin-1").split("\r\n")
+        parts = lines[0].split()
+        method, target, version = (parts + ["", "", ""])[:3]
+        headers = {}
+        for line in lines[1:]:
+            name, _, value = line.partition(":")
+            if name:
+                headers[name.strip().lower()] = value.strip()
+        return method, target, version, headers
+
+    async def _respond(self, method: str, target: str):
+        """(endpoint name for the metrics, response)"""
+        if method not in ("GET", "HEAD"):
+            return "other", _json(405, {"error": f"Método no soportado: {method}"})
+
+        url = urlsplit(target)
+        parts = [p for p in url.path.split("/") if p]
+        if parts == ["metrics"]:
+            body = self.metrics.render(self.cache.nbytes()).encode()
+            return "metrics", Response(200, body, "text/plain; version=0.0.4")
+        if len(parts) != 2 or parts[0] not in ENDPOINTS:
+            return "other", _json(404, {"error": f"Ruta desconocida: {url.path}", "endpoints": [
+                "/bars/{ticker}", "/indicators/{ticker}", "/news/{ticker}", "/summary/{ticker}", "/metrics"
+            ]})
+
+        endpoint = parts[0]
+        try:
+            ticker = _ticker(parts[1])
+        except ApiError as e:
+            return endpoint, _json(e.status, {"error": str(e)})
+        query = parse_qs(url.query)
+        # Parameters in a fixed order, so the same query always hits the same entry
+        key = (endpoint, ticker, tuple(sorted((k, tuple(v)) for k, v in query.items())))
+
+        response = self.cache.get(key)
+        if response is not None:
+            self.metrics.cache_hits[endpoint] += 1
+            return endpoint, response
+
+        pending = self._pending.get(key)
+        if pending is not None:
+            self.metrics.coalesced[endpoint] += 1
+            return endpoint, await asyncio.shield(pending)
+
+        future = asyncio.get_running_loop().create_future()
+        self._pending[key] = future
+        self.metrics.in_flight += 1
+        response = None
+        try:
+            response = await self._compute(endpoint, ticker, query)
+            if response.status == 200:
+                self.cache.put(key, response)
+        finally:
+            self.metrics.in_flight -= 1
+            del self._pending[key]
+            # Waiting requests get the same answer, or fail with this one
+            if response is None:
+                future.cancel()
+            else:
+                future.set_result(response)
+        self.metrics.computed[endpoint] += 1
+        return endpoint, response
+
+    async def _compute(self, endpoint: str, ticker: str, query: dict) -> Response:
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(self._executor, ENDPOINTS[endpoint], ticker, query)
+        except ApiError as e:
+            return _json(e.status, {"error": str(e)})
+        except FetchBlocked as e:
+            return _json(503, {"error": str(e)})
+        except Exception as e:
+            return _json(500, {"error": str(e)})
+
+    @staticmethod
+    async def _write(writer: asyncio.StreamWriter, response: Response, keep_alive: bool, head_only: bool = False):
+        headers = [
+            f"HTTP/1.1 {response.status} {REASONS.get(response.status, '')}",
+            f"Content-Type: {response.content_type}",
+            f"Content-Length: {len(response.body)}",
+            f"Connection: {'keep-alive' if keep_alive else 'close'}",
+        ]
+        if response.status in (200, 304) and response.content_type == "application/json":
+            headers.append(f"ETag: {response.etag}")
+            headers.append(f"Cache-Control: max-age={max(0, int(response.expires - time.monotonic()))}")
+        writer.write(("\r\n".join(headers) + "\r\n\r\n").encode("latin-1"))
+        if not head_only:
+            writer.write(response.body)
+        try:
+            await writer.drain()
+        except ConnectionError:
+            pass
+
+
+def start_in_thread(host: str = HOST, port: int = PORT) -> ApiServer:
+    """Runs the server on its own event loop in a daemon thread, for the app to embed it"""
+    server = ApiServer(host, port)
+    started = threading.Event()
+
+    def run():
+        loop = asyncio.new_event_loop()
+        loop.run_until_complete(server.start())
+        started.set()
+        try:
+            loop.run_until_complete(server.serve_forever())
+        except asyncio.CancelledError:
+            pass  # stop() closed the server
+
+    threading.Thread(target=run, name="api-server", daemon=True).start()
+    started.wait(5)
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="API JSON local con precios, indicadores, noticias y resúmenes")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT or 8766)
+    parser.add_argument("--workers", type=int, default=WORKERS, help="hilos para descargas y cálculos")
+    args = parser.parse_args()
+
+    db.init_db()
+    server = ApiServer(args.host, args.port, args.workers)
+
+    async def enforce_memory():
+        # Without the app no registered cache backs a Qt model, the loop thread can trim them
+        while True:
+            await asyncio.sleep(MEMORY_CHECK_INTERVAL)
+            memory.enforce()
+
+    async def run():
+        await server.start()
+        print(f"API en http://{args.host}:{server.port}/")
+        checks = asyncio.create_task(enforce_memory())
+        try:
+            await server.serve_forever()
+        finally:
+            checks.cancel()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        db.shutdown()
+
+
+if __name__ == "__main__":
+    main()
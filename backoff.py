@@ -0,0 +1,89 @@
+import threading
+import time
+
+# Symbols that came back without any daily data are not downloaded again for a while
+NEGATIVE_TTL = 60 * 60
+
+# Wait after the first failure of an endpoint, doubled on each consecutive failure
+BASE_DELAY = 5
+MAX_DELAY = 15 * 60
+
+# A probe that never reports back (no success nor failure recorded) frees the breaker after this
+PROBE_TIMEOUT = 60
+
+
+class FetchBlocked(Exception):
+    """Raised instead of hitting the network for a symbol that is known bad or backing off"""
+
+
+def _format_wait(seconds: float) -> str:
+    if seconds >= 60:
+        return f"{int(seconds // 60) + 1} min"
+    return f"{int(seconds) + 1} s"
+
+
+class FetchGuard:
+    """
+    Negative cache and per ticker/endpoint circuit breaker, shared by every task.
+    After the cooldown the breaker is half open: the first request goes through as a
+    probe and the rest are still blocked until it reports back. Success closes the
+    breaker, another failure doubles the wait.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._missing = {}    # ticker -> expiry
+        self._failures = {}   # (ticker, endpoint) -> (consecutive failures, retry at, probing)
+
+    def check(self, ticker: str, endpoint: str):
+        """Raises FetchBlocked if the request shouldn't go out now"""
+        now = time.monotonic()
+        with self._lock:
+            expiry = self._missing.get(ticker)
+            if expiry is not None:
+                if now < expiry:
+                    raise FetchBlocked(
+                        f"No se encontraron datos para {ticker} "
+                        f"(se reintentará en {_format_wait(expiry - now)})."
+                    )
+                del self._missing[ticker]
+
+            key = (ticker, endpoint)
+            failures, retry_at, probing = self._failures.get(key, (0, 0, False))
+            if not failures:
+                return
+            if now < retry_at:
+                if probing:
+                    raise FetchBlocked(f"Descargas de {ticker} en pausa, se está probando la conexión.")
+                raise FetchBlocked(
+                    f"Descargas de {ticker} en pausa tras {failures} "
+                    f"{'error' if failures == 1 else 'errores'} "
+                    f"(se reintentará en {_format_wait(retry_at - now)})."
+                )
+            # This caller is the probe, the others wait for its result
+            self._failures[key] = (failures, now + PROBE_TIMEOUT, True)
+
+    def record_missing(self, ticker: str):
+        with self._lock:
+            self._missing[ticker] = time.monotonic() + NEGATIVE_TTL
+
+    def record_failure(self, ticker: str, endpoint: str):
+        with self._lock:
+            failures = self._failures.get((ticker, endpoint), (0, 0, False))[0] + 1
+            delay = min(BASE_DELAY * 2 ** (failures - 1), MAX_DELAY)
+            self._failures[(ticker, endpoint)] = (failures, time.monotonic() + delay, False)
+
+    def record_success(self, ticker: str, endpoint: str):
+        with self._lock:
+            self._failures.pop((ticker, endpoint), None)
+
+    def status(self) -> tuple[int, int]:
+        """(symbols in the negative cache, endpoints currently backing off)"""
+        now = time.monotonic()
+        with self._lock:
+            missing = sum(1 for expiry in self._missing.values() if now < expiry)
+            backing_off = sum(1 for _, retry_at, _ in self._failures.values() if now < retry_at)
+        return missing, backing_off
+
+
+guard = FetchGuard()
@@ -0,0 +1,158 @@
+import sys
+import time
+
+import numpy as np
+
+import indicadores
+import storage
+from indicadores import ESTADOS, NINGUNO, GOOD, NEUTRAL, BAD
+
+# Backtest of the indicator states over the stored history.
+# Each ticker is a column of a (bars x tickers) matrix, right-aligned on its own
+# calendar so rolling windows never span another market's holidays.
+# The same rules from indicadores are applied to every bar at once.
+
+HORIZONS = (1, 5, 20)
+
+# Tickers processed per block, keeps the temporaries of the rolling windows bounded
+CHUNK_SIZE = 256
+
+RULES = tuple(indicador.nombre for indicador in indicadores.habilitados())
+
+
+def build_matrix(series_list):
+    """Stacks BarSeries into right-aligned (T x N) high/low/close matrices, padded with NaN"""
+    length = max(len(bars) for bars in series_list)
+    shape = (length, len(series_list))
+    # Column-major so the cumulative sums along time run over contiguous memory
+    high = np.full(shape, np.nan, order="F")
+    low = np.full(shape, np.nan, order="F")
+    close = np.full(shape, np.nan, order="F")
+    for j, bars in enumerate(series_list):
+        n = len(bars)
+        high[length - n:, j] = bars.high
+        low[length - n:, j] = bars.low
+        close[length - n:, j] = bars.close
+    return high, low, close
+
+
+def rule_codes(high, low, close):
+    """State code of every rule at every bar, same shape as close"""
+    # The same kernels as the window, shared intermediates are computed once for the block
+    ctx = indicadores.Contexto(high, low, close)
+    codes = {}
+    for indicador in indicadores.habilitados():
+        series = indicador.kernel(ctx)
+        # A rule only counts once its inputs are out of the warm-up period
+        codes[indicador.nombre] = np.where(indicador.valido(series), indicador.regla(series, close), -1)
+    return codes
+
+
+def forward_returns(close, horizon):
+    out = np.full(close.shape, np.nan)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out[:-horizon] = close[horizon:] / close[:-horizon] - 1
+    return out
+
+
+def run(series_list, horizons=HORIZONS, chunk_size=CHUNK_SIZE):
+    """
+    Returns {rule: {estado: {"n", "up_rate", "hit_rate", "mean_return"}}}
+    with one value per horizon for the rate/return entries.
+    hit_rate: good -> price went up, bad -> price went down, others have no direction.
+    """
+    # counts[rule][horizon] = (n, ups, return sum) per state code
+    totals = {
+        rule: {h: np.zeros((3, len(ESTADOS))) for h in horizons}
+        for rule in RULES
+    }
+
+    for start in range(0, len(series_list), chunk_size):
+        high, low, close = build_matrix(series_list[start:start + chunk_size])
+        codes = rule_codes(high, low, close)
+
+        for h in horizons:
+            fwd = forward_returns(close, h)
+            finite = np.isfinite(fwd)
+            ret = np.where(finite, fwd, 0.0).ravel(order="K")
+            up = (ret > 0).ravel(order="K")
+            bins = len(ESTADOS) + 1
+            for rule, code in codes.items():
+                # Invalid bars go to an extra bin that is dropped
+                idx = np.where(finite & (code >= 0), code, len(ESTADOS)).ravel(order="K")
+                # One integer pass counts bars and up moves per state
+                counts = np.bincount(idx * 2 + up, minlength=2 * bins).reshape(bins, 2)
+                totals[rule][h] += np.vstack([
+                    counts.sum(axis=1),
+                    counts[:, 1],
+                    np.bincount(idx, weights=ret, minlength=bins),
+                ])[:, :len(ESTADOS)]
+
+    results = {}
+    for rule in RULES:
+        results[rule] = {}
+        for code, estado in enumerate(ESTADOS):
+            n = int(totals[rule][horizons[0]][0, code])
+            if n == 0:
+                continue
+            stats = {"n": n, "up_rate": {}, "hit_rate": {}, "mean_return": {}}
+            for h in horizons:
+                count, ups, ret_sum = totals[rule][h][:, code]
+                up_rate = ups / count if count else np.nan
+                stats["up_rate"][h] = up_rate
+                stats["mean_return"][h] = ret_sum / count if count else np.nan
+                if code == GOOD:
+                    stats["hit_rate"][h] = up_rate
+                elif code == BAD:
+                    stats["hit_rate"][h] = 1 - up_rate
+                else:
+                    stats["hit_rate"][h] = np.nan
+            results[rule][estado] = stats
+    return results
+
+
+def load_series(tickers=None, interval="1d"):
+    """Stored series for the tickers (all stored tickers by default), whatever their age"""
+    tickers = tickers or storage.stored_tickers(interval)
+    series_list = []
+    for ticker in tickers:
+        bars = storage.load_bars(ticker, interval, max_age=0)
+        if bars is not None and len(bars) > max(HORIZONS):
+            series_list.append(bars)
+    return series_list
+
+
+def print_report(results, horizons=HORIZONS):
+    header = f"{'Indicador':<12}{'Estado':<9}{'N':>10}"
+    for h in horizons:
+        header += f"{f'hit {h}b':>10}{f'ret {h}b':>10}"
+    print(header)
+    print("-" * len(header))
+    for rule, by_state in results.items():
+        for estado, stats in by_state.items():
+            line = f"{rule:<12}{estado:<9}{stats['n']:>10}"
+            for h in horizons:
+                hit = stats["hit_rate"][h]
+                hit_text = "-" if np.isnan(hit) else f"{hit:.1%}"
+                line += f"{hit_text:>10}{stats['mean_return'][h]:>10.2%}"
+            print(line)
+
+
+def main():
+    tickers = [t.upper() for t in sys.argv[1:]]
+    start = time.perf_counter()
+    series_list = load_series(tickers)
+    if not series_list:
+        print("No hay series almacenadas para el backtest.")
+        return
+
+    results = run(series_list)
+    elapsed = time.perf_counter() - start
+
+    bars = sum(len(s) for s in series_list)
+    print_report(results)
+    print(f"\n{len(series_list)} tickers, {bars} barras en {elapsed:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
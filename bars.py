@@ -0,0 +1,243 @@
+import numpy as np
+import pandas as pd
+
+FIELDS = ("open", "high", "low", "close", "volume")
+
+NS_PER_DAY = 86_400_000_000_000
+
+# Timeframes that can be derived locally, finest first
+TIMEFRAMES = ("5m", "1h", "1d", "1wk", "1mo")
+
+# Stored and downloaded closes of the same bar differing by more than this mean
+# the history was adjusted in between (split or dividend)
+ADJUSTMENT_TOLERANCE = 1e-3
+
+
+class BarSeries:
+    """
+    OHLCV bars backed by contiguous NumPy arrays.
+    timestamps: int64 nanoseconds since epoch (UTC)
+    open, high, low, close, volume: float64
+    tz: original time zone of the series ("" for naive daily bars)
+    """
+    __slots__ = ("timestamps", "open", "high", "low", "close", "volume", "tz")
+
+    def __init__(self, timestamps, open, high, low, close, volume, tz: str = ""):
+        self.timestamps = timestamps
+        self.open = open
+        self.high = high
+        self.low = low
+        self.close = close
+        self.volume = volume
+        self.tz = tz
+
+    @classmethod
+    def from_download(cls, df: pd.DataFrame, ticker: str | None = None) -> "BarSeries":
+        """
+        Converts a yf.download result (MultiIndex columns) into a normalized BarSeries.
+        For a download of several tickers pass the one to extract.
+        """
+        if isinstance(df.columns, pd.MultiIndex):
+            if ticker is None:
+                df = df.droplevel(1, axis=1)
+            else:
+                # The empty rows other exchanges leave on this ticker are dropped by normalize
+                df = df.xs(ticker, axis=1, level=1)
+
+        index = pd.DatetimeIndex(df.index)
+        tz = str(index.tz) if index.tz is not None else ""
+        if index.tz is not None:
+            index = index.tz_convert("UTC").tz_localize(None)
+
+        def column(name):
+            if name not in df.columns:
+                return np.full(len(df), np.nan)
+            return df[name].to_numpy(dtype=np.float64)
+
+        return normalize(cls(
+            index.as_unit("ns").asi8,
+            column("Open"), column("High"), column("Low"), column("Close"), column("Volume"),
+            tz
+        ))
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    def __getitem__(self, key: slice) -> "BarSeries":
+        """Slices all columns at once, returning views"""
+        return BarSeries(
+            self.timestamps[key],
+            self.open[key], self.high[key], self.low[key], self.close[key], self.volume[key],
+            self.tz
+        )
+
+    @property
+    def empty(self) -> bool:
+        return len(self.timestamps) == 0
+
+    @property
+    def nbytes(self) -> int:
+        return self.timestamps.nbytes + sum(getattr(self, f).nbytes for f in FIELDS)
+
+    def last_timestamp(self) -> int:
+        return int(self.timestamps[-1])
+
+    def dates(self) -> pd.DatetimeIndex:
+        """Timestamps as a DatetimeIndex in the series' own time zone"""
+        index = pd.DatetimeIndex(self.timestamps.view("datetime64[ns]"))
+        if self.tz:
+            index = index.tz_localize("UTC").tz_convert(self.tz)
+        return index
+
+    def local_timestamps(self) -> np.ndarray:
+        """Nanoseconds in the series' own time zone, used to bucket bars by day/week/month"""
+        if not self.tz:
+            return self.timestamps
+        return self.dates().tz_localize(None).as_unit("ns").asi8
+
+    def last_days(self, days: int) -> "BarSeries":
+        """Bars within the last `days` calendar days of the series"""
+        start = self.timestamps[-1] - days * NS_PER_DAY
+        return self[int(np.searchsorted(self.timestamps, start)):]
+
+    def year_to_date(self) -> "BarSeries":
+        """Bars from the start of the last bar's calendar year"""
+        years = self.dates().year.to_numpy()
+        return self[int(np.searchsorted(years, years[-1])):]
+
+
+def normalize(bars: BarSeries) -> BarSeries:
+    """
+    Cleans a downloaded series once, before it is stored, so consumers can rely on
+    sorted unique timestamps, finite prices and contiguous float64 arrays:
+    - repeated timestamps keep the last bar
+    - bars without any price, or before the first close, are dropped
+    - non-positive prices count as missing
+    - a missing close takes the previous one. These gap bars get open = high = low = close
+      and zero volume, which is how they can be told apart
+    - a missing open takes the close, high and low are widened to contain both
+    - missing volume is zero
+    """
+    order = np.argsort(bars.timestamps, kind="stable")
+    timestamps = np.asarray(bars.timestamps, dtype=np.int64)[order]
+    prices = np.array([getattr(bars, name) for name in FIELDS[:4]], dtype=np.float64)[:, order]
+    volume = np.asarray(bars.volume, dtype=np.float64)[order]
+
+    with np.errstate(invalid="ignore"):
+        prices[prices <= 0] = np.nan
+    valid = np.isfinite(prices)
+
+    # Last of each run of equal timestamps, only bars with some price
+    keep = np.r_[timestamps[1:] != timestamps[:-1], True] & valid.any(axis=0)
+    has_close = valid[3] & keep
+    if not has_close.any():
+        return BarSeries(timestamps[:0], *(np.empty(0) for _ in FIELDS), tz=bars.tz)
+    keep[:int(np.argmax(has_close))] = False
+
+    timestamps, prices, volume, has_close = timestamps[keep], prices[:, keep], volume[keep], has_close[keep]
+    open_, high, low, close = prices
+
+    # Forward fill through the index of the last bar with a close
+    last = np.maximum.accumulate(np.where(has_close, np.arange(len(close)), 0))
+    close = close[last]
+    gap = ~has_close
+    open_ = np.where(gap | ~np.isfinite(open_), close, open_)
+    high = np.where(gap, close, np.fmax(high, np.maximum(open_, close)))
+    low = np.where(gap, close, np.fmin(low, np.minimum(open_, close)))
+    volume = np.where(gap | ~np.isfinite(volume), 0.0, volume)
+
+    return BarSeries(
+        np.ascontiguousarray(timestamps), np.ascontiguousarray(open_), high, low,
+        np.ascontiguousarray(close), volume, bars.tz
+    )
+
+
+def merge(old: BarSeries, new: BarSeries) -> BarSeries:
+    """
+    Replaces the tail of `old` from the first bar of `new` onwards.
+    Downloads come split and dividend adjusted, so when the closes both share
+    (except old's last bar, which may have been an unfinished day) disagree, the
+    older bars are rescaled to the new basis instead of leaving a jump.
+    """
+    if new.empty:
+        return old
+    cut = int(np.searchsorted(old.timestamps, new.timestamps[0]))
+
+    shared, old_idx, new_idx = np.intersect1d(old.timestamps[cut:-1], new.timestamps, return_indices=True)
+    ratio = float(np.median(new.close[new_idx] / old.close[cut:-1][old_idx])) if len(shared) else 1.0
+    if abs(ratio - 1) > ADJUSTMENT_TOLERANCE:
+        head = [getattr(old, name)[:cut] * ratio for name in FIELDS[:4]] + [old.volume[:cut] / ratio]
+    else:
+        head = [getattr(old, name)[:cut] for name in FIELDS]
+
+    return BarSeries(
+        np.concatenate((old.timestamps[:cut], new.timestamps)),
+        *(np.concatenate((part, getattr(new, name))) for part, name in zip(head, FIELDS)),
+        tz=old.tz or new.tz
+    )
+
+
+def _bucket_keys(local: np.ndarray, timeframe: str) -> np.ndarray:
+    if timeframe == "1h":
+        return local // 3_600_000_000_000
+    days = local // NS_PER_DAY
+    if timeframe == "1d":
+        return days
+    if timeframe == "1wk":
+        # 1970-01-01 was a Thursday, shift so weeks start on Monday
+        return (days + 3) // 7
+    if timeframe == "1mo":
+        return local.view("datetime64[ns]").astype("datetime64[M]").astype(np.int64)
+    raise ValueError(f"Temporalidad no soportada: {timeframe}")
+
+
+def resample(bars: BarSeries, timeframe: str) -> BarSeries:
+    """
+    Aggregates bars into a coarser timeframe (1h, 1d, 1wk, 1mo).
+    Each new bar keeps the timestamp of the first bar in its bucket.
+    """
+    if bars.empty:
+        return bars
+
+    keys = _bucket_keys(bars.local_timestamps(), timeframe)
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    ends = np.r_[starts[1:], len(keys)] - 1
+
+    return BarSeries(
+        bars.timestamps[starts],
+        bars.open[starts],
+        np.maximum.reduceat(bars.high, starts),
+        np.minimum.reduceat(bars.low, starts),
+        bars.close[ends],
+        np.add.reduceat(bars.volume, starts),
+        bars.tz
+    )
+
+
+def join_keys(bars: BarSeries, interval: str) -> np.ndarray:
+    """
+    Keys used to line up series from different markets: the UTC timestamp for
+    intraday bars, the local day/week/month bucket for coarser ones, so a crypto
+    daily bar at 00:00 UTC meets the equity bar of the same date.
+    """
+    if is_finer(interval, "1h"):
+        return bars.timestamps
+    return _bucket_keys(bars.local_timestamps(), interval)
+
+
+def align(target_keys: np.ndarray, keys: np.ndarray, values: np.ndarray) -> np.ndarray:
+    """
+    As-of join: for each target key the last value at or before it, NaN before
+    the first one. Both key arrays must be sorted.
+    """
+    if len(keys) == 0:
+        return np.full(len(target_keys), np.nan)
+    idx = np.searchsorted(keys, target_keys, side="right") - 1
+    aligned = values[np.maximum(idx, 0)]
+    aligned[idx < 0] = np.nan
+    return aligned
+
+
+def is_finer(source: str, target: str) -> bool:
+    """True if a series in `source` can be resampled into `target`"""
+    return TIMEFRAMES.index(source) <= TIMEFRAMES.index(target)
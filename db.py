@@ -1,4 +1,10 @@
-from sqlalchemy import create_engine, Column, Integer, String
+import atexit
+import queue
+import threading
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, event, Column, Integer, String, Text, DateTime, inspect, text
+from sqlalchemy.dialects.sqlite import insert
 from sqlalchemy.orm import declarative_base, sessionmaker
 
 Base = declarative_base()
@@ -8,9 +14,216 @@ class TickerHistory(Base):
 
   id = Column(Integer, primary_key=True)
   ticker = Column(String, unique=True, nullable=False)
+  last_accessed = Column(DateTime, nullable=False, default=datetime.now, index=True)
+
+class SymbolName(Base):
+  __tablename__ = "symbol_names"
+
+  symbol = Column(String, primary_key=True)
+  name = Column(String, nullable=False)
+
+class AlertRule(Base):
+  __tablename__ = "alert_rules"
+
+  rule = Column(String, primary_key=True)
+
+class Summary(Base):
+  __tablename__ = "summaries"
+
+  ticker = Column(String, primary_key=True)
+  text = Column(Text, nullable=False)
+  created_at = Column(DateTime, nullable=False, default=datetime.now)
 
 engine = create_engine("sqlite:///history.db", echo=False)
 SessionLocal = sessionmaker(bind=engine)
 
+# Max queued writes committed together in one transaction
+WRITE_BATCH_SIZE = 256
+
+@event.listens_for(engine, "connect")
+def _set_pragmas(dbapi_connection, _):
+  cursor = dbapi_connection.cursor()
+  # WAL lets worker threads read while the writer commits
+  cursor.execute("PRAGMA journal_mode=WAL")
+  # In WAL mode NORMAL only syncs on checkpoints, the database can't get corrupted
+  cursor.execute("PRAGMA synchronous=NORMAL")
+  cursor.execute("PRAGMA cache_size=-8000")  # KiB
+  cursor.execute("PRAGMA busy_timeout=5000")
+  cursor.execute("PRAGMA temp_store=MEMORY")
+  cursor.close()
+
+class _Writer(threading.Thread):
+  """
+  Owns every write to the database. Jobs are callables that receive a session,
+  whatever is queued when the thread wakes up is committed in one transaction.
+  """
+  _STOP = object()
+
+  def __init__(self):
+    super().__init__(name="db-writer", daemon=True)
+    self.jobs = queue.Queue()
+
+  def run(self):
+    while True:
+      batch = [self.jobs.get()]
+      while len(batch) < WRITE_BATCH_SIZE:
+        try:
+          batch.append(self.jobs.get_nowait())
+        except queue.Empty:
+          break
+
+      stop = self._STOP in batch
+      self._commit([job for job in batch if job is not self._STOP])
+      for _ in batch:
+        self.jobs.task_done()
+      if stop:
+        return
+
+  @staticmethod
+  def _commit(jobs):
+    if not jobs:
+      return
+    try:
+      with SessionLocal() as session:
+        for job in jobs:
+          job(session)
+        session.commit()
+    except Exception as e:
+      if len(jobs) == 1:
+        print(f"Error al escribir en la base de datos: {e}")
+        return
+      # Retry one by one so a bad job doesn't drop the rest of the batch
+      for job in jobs:
+        _Writer._commit([job])
+
+_writer = None
+# Held while queuing, so no job lands behind the stop marker of a writer shutting down
+_writer_lock = threading.Lock()
+
 def init_db():
+  global _writer
   Base.metadata.create_all(engine)
+  _migrate()
+  if _writer is None:
+    _writer = _Writer()
+    _writer.start()
+    atexit.register(shutdown)
+
+def submit(job):
+  """
+  Queues a write, job(session) runs on the writer thread. Never blocks while the
+  writer runs; before init_db or after shutdown the job is committed right here.
+  """
+  with _writer_lock:
+    if _writer is not None:
+      _writer.jobs.put(job)
+      return
+  _Writer._commit([job])
+
+def flush():
+  """Waits until every queued write is committed"""
+  writer = _writer
+  if writer is not None:
+    writer.jobs.join()
+
+def shutdown():
+  """Commits pending writes and stops the writer thread"""
+  global _writer
+  with _writer_lock:
+    writer, _writer = _writer, None
+    if writer is None:
+      return
+    writer.jobs.put(_Writer._STOP)
+  writer.join()
+
+def _migrate():
+  """Adds last_accessed to databases created before it existed"""
+  columns = [c["name"] for c in inspect(engine).get_columns(TickerHistory.__tablename__)]
+  if "last_accessed" in columns:
+    return
+
+  with engine.begin() as conn:
+    conn.execute(text("ALTER TABLE ticker_history ADD COLUMN last_accessed DATETIME"))
+    # The old save order put the most recent ticker first (lowest id)
+    now = datetime.now()
+    rows = conn.execute(text("SELECT id FROM ticker_history ORDER BY id")).all()
+    for offset, (row_id,) in enumerate(rows):
+      conn.execute(
+        text("UPDATE ticker_history SET last_accessed = :ts WHERE id = :id"),
+        {"ts": now - timedelta(seconds=offset), "id": row_id}
+      )
+    conn.execute(text(
+      "CREATE INDEX IF NOT EXISTS ix_ticker_history_last_accessed ON ticker_history (last_accessed)"
+    ))
+
+def touch_ticker(ticker: str):
+  """Inserts the ticker or refreshes its last access time"""
+  now = datetime.now()
+
+  def job(session):
+    stmt = insert(TickerHistory).values(ticker=ticker, last_accessed=now)
+    stmt = stmt.on_conflict_do_update(index_elements=["ticker"], set_={"last_accessed": now})
+    session.execute(stmt)
+
+  submit(job)
+
+def load_history(limit: int, before: datetime | None = None):
+  """
+  One page of (ticker, last_accessed) ordered from most to least recent.
+  Pass the last_accessed of the previous page's last row as `before` to get the next one.
+  """
+  with SessionLocal() as session:
+    query = session.query(TickerHistory.ticker, TickerHistory.last_accessed)
+    if before is not None:
+      query = query.filter(TickerHistory.last_accessed < before)
+    rows = query.order_by(TickerHistory.last_accessed.desc()).limit(limit).all()
+  return [(row.ticker, row.last_accessed) for row in rows]
+
+def clear_history():
+  submit(lambda session: session.query(TickerHistory).delete())
+
+def save_symbol_name(symbol: str, name: str):
+  """Remembers the name get_info returned for a symbol"""
+  def job(session):
+    stmt = insert(SymbolName).values(symbol=symbol, name=name)
+    stmt = stmt.on_conflict_do_update(index_elements=["symbol"], set_={"name": name})
+    session.execute(stmt)
+
+  submit(job)
+
+def load_symbol_names():
+  """(symbol, name) pairs learned so far, plus searched tickers without a name"""
+  with SessionLocal() as session:
+    names = dict(session.query(SymbolName.symbol, SymbolName.name).all())
+    for (ticker,) in session.query(TickerHistory.ticker):
+      names.setdefault(ticker, "")
+  return list(names.items())
+
+def save_alert_rule(rule: str):
+  submit(lambda session: session.execute(insert(AlertRule).values(rule=rule).on_conflict_do_nothing()))
+
+def delete_alert_rule(rule: str):
+  submit(lambda session: session.query(AlertRule).filter(AlertRule.rule == rule).delete())
+
+def load_alert_rules():
+  with SessionLocal() as session:
+    return [row.rule for row in session.query(AlertRule.rule)]
+
+def save_summary(ticker: str, summary: str):
+  now = datetime.now()
+
+  def job(session):
+    stmt = insert(Summary).values(ticker=ticker, text=summary, created_at=now)
+    stmt = stmt.on_conflict_do_update(index_elements=["ticker"], set_={"text": summary, "created_at": now})
+    session.execute(stmt)
+
+  submit(job)
+
+def load_summaries(tickers, max_age: float):
+  """{ticker: summary} for the given tickers with a summary younger than max_age seconds"""
+  since = datetime.now() - timedelta(seconds=max_age)
+  with SessionLocal() as session:
+    rows = session.query(Summary.ticker, Summary.text).filter(
+      Summary.ticker.in_(list(tickers)), Summary.created_at >= since
+    ).all()
+  return {row.ticker: row.text for row in rows}
@@ -1,173 +1,425 @@
-import pandas as pd
+import os
+import threading
+from collections import OrderedDict
+
 import numpy as np
 import yfinance as yf
 
-def promedio_movil(data, periodo):
-    promedio = data.rolling(window=periodo).mean()
-
-    #si el precio de cierrre es aproximadamente igual al promedio movil
-    if abs(data.iloc[-1].item() - promedio.iloc[-1].item()) < 0.01 * promedio.iloc[-1].item():
-        estado = "neutral"
-        info = "Neutral"
-    elif data.iloc[-1].item() > promedio.iloc[-1].item():
-        estado = "good"
-        info = "Bueno"
-    else:
-        estado = "bad"
-        info = "Malo"
-
-    return promedio.iloc[-1].item(), estado, info
-
-def macd(data, periodo_corto=12, periodo_largo=26, periodo_signal=9):
-    ema_corto = data.ewm(span=periodo_corto, adjust=False).mean()
-    ema_largo = data.ewm(span=periodo_largo, adjust=False).mean()
-    macd_line = ema_corto - ema_largo
-    signal_line = macd_line.ewm(span=periodo_signal, adjust=False).mean()
-    histograma = macd_line - signal_line
-
-    #Histograma aproximada a cero
-    if abs(histograma.iloc[-1].item()) < 0.01 * abs(macd_line.iloc[-1].item()):
-        estado = "neutral"
-        info = "Neutral"
-    #linea MACD por encima de la linea de señal
-    elif macd_line.iloc[-1].item() > signal_line.iloc[-1].item():
-        estado = "good"
-        info = "Bueno"
-    else:
-        estado = "bad"
-        info = "Malo" 
-
-    return macd_line.iloc[-1].item(), signal_line.iloc[-1].item(), histograma.iloc[-1].item(), estado, info
-
-def oscilador_estocastico(data, periodo=14):
-    low_min = data['Low'].rolling(window=periodo).min()
-    high_max = data['High'].rolling(window=periodo).max()
-    k_percent = 100 * ((data['Close'] - low_min) / (high_max - low_min))
-    d_percent = k_percent.rolling(window=3).mean()
-    
-    K_val = k_percent.iloc[-1].item()
-    D_val = d_percent.iloc[-1].item()
-    
-    K_prev = k_percent.iloc[-2].item()
-    D_prev = d_percent.iloc[-2].item()
-
-    if K_val > D_val and K_prev <= D_prev:
-        if K_val > 80:
-            estado = "bad"
-            info = "Malo"
-        else:
-            estado = "good"
-            info = "Bueno"
-    elif K_val < D_val and K_prev >= D_prev:
-        if K_val < 20:
-            estado = "neutral"
-            info = "Neutral"
-        else:
-            estado = "bad"
-            info = "Malo"
-    elif K_val > 80:
-        estado = "bad"
-        info = "Malo"
-    elif K_val < 20:
-        estado = "good"
-        info = "Bueno"
-    else:
-        estado = "ninguno"
-        info = "Ninguno"
-
-    return k_percent.iloc[-1].item(), d_percent.iloc[-1].item(), estado, info
-
-def rsi(data, periodo=14):
-    delta = data.diff()
-    gain = (delta.where(delta > 0, 0)).rolling(window=periodo).mean()
-    loss = (-delta.where(delta < 0, 0)).rolling(window=periodo).mean()
-    rs = gain / loss
-    rsi = 100 - (100 / (1 + rs))
-
-    #rsi < 30 sobreventa
-    if rsi.iloc[-1].item() < 30:
-        estado = "good"     
-        info = "Sobreventa"
-    #rsi > 70 sobrecompra
-    elif rsi.iloc[-1].item() > 70:
-        estado = "bad"
-        info = "Sobrecompra"
-    else:
-        estado = "ninguno"
-        info = "Normal"
-
-    return rsi.iloc[-1].item(), estado, info
-
-def volatilidad(data, periodo=30):
-    log_returns = np.log(data / data.shift(1))
-    volatilidad = log_returns.rolling(window=periodo).std() * np.sqrt(252)
-    
-    #volatibilidad baja
-    if volatilidad.iloc[-1].item() < 0.15:
-        estado = "ninguno"
-        info = "Baja volatilidad"
-    #volatibilidad alta
-    elif volatilidad.iloc[-1].item() > 0.30:
-        estado = "bad"
-        info = "Alta volatilidad"
-    else:
-        estado = "neutral"
-        info = "Neutral"
-
-    return volatilidad.iloc[-1].item(), estado, info
-
-def atr(data_high, data_low, data_close, periodo=14):
+from bars import BarSeries
+import memory
+
+# Las funciones reciben arrays de NumPy (las columnas de un BarSeries).
+# Las ventanas replican a pandas: las primeras (periodo - 1) posiciones son NaN.
+# Con arrays 2-D el tiempo es el eje 0 y cada columna es un ticker; se respeta
+# el orden en memoria de la entrada (el backtest usa orden de columnas).
+
+def _rolling_sum(x, n):
+    valid = ~np.isnan(x)
+    cs = np.cumsum(np.where(valid, x, 0.0), axis=0)
+    cnt = np.cumsum(valid, axis=0)
+    out = np.full_like(x, np.nan, dtype=np.float64)
+    if len(x) < n:
+        return out
+    s = cs[n - 1:].copy(order="K")
+    s[1:] -= cs[:-n]
+    c = cnt[n - 1:].copy(order="K")
+    c[1:] -= cnt[:-n]
+    out[n - 1:] = np.where(c == n, s, np.nan)
+    return out
+
+def _rolling_mean(x, n):
+    return _rolling_sum(x, n) / n
+
+def _rolling_std(x, n):
+    # desviacion estandar muestral (ddof=1), igual que pandas
+    s = _rolling_sum(x, n)
+    s2 = _rolling_sum(x * x, n)
+    var = (s2 - s * s / n) / (n - 1)
+    return np.sqrt(np.maximum(var, 0.0))
+
+def _rolling_extreme(x, n, ufunc):
+    # minimo/maximo movil (np.minimum / np.maximum) acumulando ventanas desplazadas
+    out = np.full_like(x, np.nan, dtype=np.float64)
+    if len(x) < n:
+        return out
+    acc = x[n - 1:].copy(order="K")
+    for k in range(1, n):
+        ufunc(acc, x[n - 1 - k:len(x) - k], out=acc)
+    out[n - 1:] = acc
+    return out
+
+def _ewm(x, span):
+    # equivalente a pandas ewm(span, adjust=False).mean()
+    alpha = 2.0 / (span + 1.0)
+    if x.ndim == 1:
+        return np.array(_ewm_1d(x.tolist(), alpha))
+    # el bucle recorre filas, se trabaja en orden C y se devuelve en el orden original
+    xc = np.ascontiguousarray(x, dtype=np.float64)
+    out = np.empty(xc.shape)
+    prev = xc[0]
+    out[0] = prev
+    for t in range(1, len(xc)):
+        cur = xc[t]
+        prev = np.where(np.isnan(prev), cur, np.where(np.isnan(cur), prev, prev + alpha * (cur - prev)))
+        out[t] = prev
+    return out if x.flags.c_contiguous else np.asfortranarray(out)
+
+def _ewm_1d(values, alpha):
+    # bucle con floats de Python, mucho mas rapido que indexar el array
+    out = []
+    prev = values[0]
+    for cur in values:
+        if prev != prev:
+            prev = cur
+        elif cur == cur:
+            prev = prev + alpha * (cur - prev)
+        out.append(prev)
+    return out
+
+def _shift(x):
+    out = np.empty_like(x, dtype=np.float64)
+    out[0] = np.nan
+    out[1:] = x[:-1]
+    return out
+
+# ---------- Reglas ----------
+# Vectorizadas: aceptan escalares o arrays y devuelven codigos de estado.
+# Se usan tanto para el ultimo valor como para el backtest sobre todo el historico.
+
+NINGUNO, GOOD, NEUTRAL, BAD = 0, 1, 2, 3
+ESTADOS = ("ninguno", "good", "neutral", "bad")
+
+def regla_promedio_movil(precio, promedio):
+    return np.select(
+        [
+            #si el precio de cierrre es aproximadamente igual al promedio movil
+            np.abs(precio - promedio) < 0.01 * promedio,
+            precio > promedio,
+        ],
+        [NEUTRAL, GOOD],
+        BAD
+    ).astype(np.int8)
+
+def regla_macd(macd_val, signal_val, hist_val):
+    return np.select(
+        [
+            #Histograma aproximada a cero
+            np.abs(hist_val) < 0.01 * np.abs(macd_val),
+            #linea MACD por encima de la linea de señal
+            macd_val > signal_val,
+        ],
+        [NEUTRAL, GOOD],
+        BAD
+    ).astype(np.int8)
+
+def regla_estocastico(K_val, D_val, K_prev, D_prev):
+    cruce_alcista = (K_val > D_val) & (K_prev <= D_prev)
+    cruce_bajista = (K_val < D_val) & (K_prev >= D_prev)
+    return np.select(
+        [
+            cruce_alcista & (K_val > 80),
+            cruce_alcista,
+            cruce_bajista & (K_val < 20),
+            cruce_bajista,
+            K_val > 80,
+            K_val < 20,
+        ],
+        [BAD, GOOD, NEUTRAL, BAD, BAD, GOOD],
+        NINGUNO
+    ).astype(np.int8)
+
+def regla_rsi(rsi_val):
+    #rsi < 30 sobreventa, rsi > 70 sobrecompra
+    return np.select([rsi_val < 30, rsi_val > 70], [GOOD, BAD], NINGUNO).astype(np.int8)
+
+def regla_volatilidad(vol_val):
+    return np.select([vol_val < 0.15, vol_val > 0.30], [NINGUNO, BAD], NEUTRAL).astype(np.int8)
+
+def regla_atr(atr_val):
+    return np.select([atr_val < 1, atr_val > 5], [NINGUNO, BAD], NEUTRAL).astype(np.int8)
+
+# ---------- Estados ----------
+# Texto de cada codigo de estado, por familia de indicador
+
+INFO_TENDENCIA = {GOOD: "Bueno", NEUTRAL: "Neutral", BAD: "Malo", NINGUNO: "Ninguno"}
+INFO_RSI = {GOOD: "Sobreventa", BAD: "Sobrecompra", NINGUNO: "Normal"}
+INFO_VOLATILIDAD = {NINGUNO: "Baja volatilidad", BAD: "Alta volatilidad", NEUTRAL: "Neutral"}
+
+# ---------- Registro ----------
+# Cada indicador declara sus series, su calentamiento, un kernel vectorizado y
+# una regla de estado. El motor calcula solo los habilitados y los intermedios
+# comunes (medias, EMAs, true range...) se calculan una vez por serie de barras.
+
+class Contexto:
+    """Columnas de las barras y los intermedios que comparten los kernels, memoizados"""
+
+    def __init__(self, high, low, close):
+        self.high = high
+        self.low = low
+        self.close = close
+        self._memo = {}
+
+    def _get(self, key, calcular):
+        if key not in self._memo:
+            self._memo[key] = calcular()
+        return self._memo[key]
+
+    def previo(self):
+        return self._get("previo", lambda: _shift(self.close))
+
+    def sma(self, n):
+        return self._get(("sma", n), lambda: _rolling_mean(self.close, n))
+
+    def ema(self, span):
+        return self._get(("ema", span), lambda: _ewm(self.close, span))
+
+    def minimo(self, n):
+        return self._get(("minimo", n), lambda: _rolling_extreme(self.low, n, np.minimum))
+
+    def maximo(self, n):
+        return self._get(("maximo", n), lambda: _rolling_extreme(self.high, n, np.maximum))
+
+    def true_range(self):
+        def calcular():
+            previo = self.previo()
+            tr = np.fmax(self.high - self.low, np.abs(self.high - previo))
+            return np.fmax(tr, np.abs(self.low - previo))
+        return self._get("true_range", calcular)
+
+
+class Indicador:
+    """
+    Entrada del registro.
+    series: nombres de las series que produce el kernel, las primeras `valores` van en el resultado
+    calentamiento: barras necesarias para que el ultimo valor no dependa del inicio de la historia
+    kernel(ctx) -> {serie: array}, regla(series, close) -> codigos de estado por barra
+    usa_previo: la regla mira tambien la barra anterior
+    """
+
+    def __init__(self, nombre, descripcion, series, calentamiento, kernel, regla, info,
+                 formato=None, valores=None, corto=None, usa_previo=False):
+        self.nombre = nombre
+        self.descripcion = descripcion
+        self.series = tuple(series)
+        self.valores = tuple(valores or series)
+        self.calentamiento = calentamiento
+        self.kernel = kernel
+        self.regla = regla
+        self.info = info
+        self.formato = formato or (lambda valor: f"{valor:.2f}")
+        self.corto = corto or nombre
+        self.usa_previo = usa_previo
+
+    def mostrar(self, datos) -> str:
+        """Texto del valor en la tarjeta, datos es la tupla de calcular_indicadores"""
+        return self.formato(*datos[:len(self.valores)])
+
+    def valido(self, series):
+        """Barras fuera del calentamiento, donde la regla tiene sus entradas"""
+        valido = np.logical_and.reduce([np.isfinite(series[name]) for name in self.series])
+        if self.usa_previo:
+            previo = np.zeros_like(valido)
+            previo[1:] = valido[:-1]
+            valido &= previo
+        return valido
+
+
+def _convergencia(span, tolerancia=1e-4):
+    """Barras hasta que el peso del valor inicial en una EMA cae debajo de la tolerancia"""
+    return int(np.ceil(np.log(tolerancia) / np.log(1 - 2.0 / (span + 1))))
+
+
+REGISTRO = {}
+
+def registrar(indicador: Indicador) -> Indicador:
+    REGISTRO[indicador.nombre] = indicador
+    return indicador
+
+for _n in (10, 50, 200):
+    registrar(Indicador(
+        f"SMA{_n}", f"Media móvil simple de {_n} periodos",
+        [f"SMA{_n}"], _n,
+        kernel=lambda ctx, n=_n: {f"SMA{n}": ctx.sma(n)},
+        regla=lambda s, close, n=_n: regla_promedio_movil(close, s[f"SMA{n}"]),
+        info=INFO_TENDENCIA,
+    ))
+
+def _kernel_macd(ctx):
+    macd_line = ctx.ema(12) - ctx.ema(26)
+    signal_line = _ewm(macd_line, 9)
+    return {"MACD": macd_line, "MACD_signal": signal_line, "MACD_hist": macd_line - signal_line}
+
+registrar(Indicador(
+    "MACD", "MACD 12/26/9, línea y señal", ["MACD", "MACD_signal", "MACD_hist"],
+    _convergencia(26) + _convergencia(9),
+    kernel=_kernel_macd,
+    regla=lambda s, close: regla_macd(s["MACD"], s["MACD_signal"], s["MACD_hist"]),
+    info=INFO_TENDENCIA,
+    formato=lambda macd_line, signal_line, _: f"L: {macd_line:.2f} S: {signal_line:.2f}",
+))
+
+def _kernel_estocastico(ctx, periodo=14):
+    low_min, high_max = ctx.minimo(periodo), ctx.maximo(periodo)
+    # Una ventana plana (símbolo suspendido, huecos rellenados) da NaN, sin advertencia
+    with np.errstate(divide='ignore', invalid='ignore'):
+        k_percent = 100 * ((ctx.close - low_min) / (high_max - low_min))
+    return {"%K": k_percent, "%D": _rolling_mean(k_percent, 3)}
+
+registrar(Indicador(
+    "Estocastico", "Oscilador estocástico 14, %K y %D", ["%K", "%D"], 14 + 2 + 1,
+    kernel=_kernel_estocastico,
+    regla=lambda s, close: regla_estocastico(s["%K"], s["%D"], _shift(s["%K"]), _shift(s["%D"])),
+    info=INFO_TENDENCIA,
+    formato=lambda k, d: f"%K: {k:.2f} %D: {d:.2f}",
+    corto="Est.",
+    usa_previo=True,
+))
+
+def _kernel_rsi(ctx, periodo=14):
+    delta = ctx.close - ctx.previo()
+    gain = _rolling_mean(np.where(delta > 0, delta, 0.0), periodo)
+    loss = _rolling_mean(np.where(delta < 0, -delta, 0.0), periodo)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rsi = 100 - (100 / (1 + gain / loss))
+    return {"RSI": np.where((loss == 0) & (gain == 0), 50.0, rsi)}
+
+registrar(Indicador(
+    "RSI", "Índice de fuerza relativa de 14 periodos", ["RSI"], 14 + 1,
+    kernel=_kernel_rsi,
+    regla=lambda s, close: regla_rsi(s["RSI"]),
+    info=INFO_RSI,
+))
+
+def _kernel_volatilidad(ctx, periodo=30):
+    log_returns = np.log(ctx.close / ctx.previo())
+    return {"Volatilidad": _rolling_std(log_returns, periodo) * np.sqrt(252)}
+
+registrar(Indicador(
+    "Volatilidad", "Volatilidad anualizada de 30 periodos", ["Volatilidad"], 30 + 1,
+    kernel=_kernel_volatilidad,
+    regla=lambda s, close: regla_volatilidad(s["Volatilidad"]),
+    info=INFO_VOLATILIDAD,
+    corto="Vol.",
+))
+
+registrar(Indicador(
+    "ATR14", "Rango verdadero promedio de 14 periodos", ["ATR14"], 14 + 1,
+    kernel=lambda ctx: {"ATR14": _rolling_mean(ctx.true_range(), 14)},
+    regla=lambda s, close: regla_atr(s["ATR14"]),
+    info=INFO_VOLATILIDAD,
+    corto="ATR",
+))
+
+# Indicadores calculados, separados por coma (por defecto todos los registrados)
+HABILITADOS = [
+    nombre.strip() for nombre in os.getenv("DASHBOARD_INDICADORES", ",".join(REGISTRO)).split(",")
+    if nombre.strip()
+]
+for _nombre in HABILITADOS:
+    if _nombre not in REGISTRO:
+        raise ValueError(
+            f"Indicador desconocido en DASHBOARD_INDICADORES: {_nombre}. "
+            f"Disponibles: {', '.join(REGISTRO)}"
+        )
+
+def habilitados() -> list:
+    return [REGISTRO[nombre] for nombre in HABILITADOS if nombre in REGISTRO]
+
+def calentamiento() -> int:
+    """Barras que necesita el indicador habilitado mas exigente"""
+    return max((indicador.calentamiento for indicador in habilitados()), default=0)
+
+def mostrar(nombre: str, datos) -> str:
+    indicador = REGISTRO.get(nombre)
+    return indicador.mostrar(datos) if indicador is not None else f"{datos[0]:.2f}"
+
+# ---------- Conjunto completo ----------
+
+def calcular_series(bars: BarSeries, indicadores=None):
+    """Series completas de los indicadores habilitados, alineadas con bars.timestamps"""
+    ctx = Contexto(bars.high, bars.low, bars.close)
+    series = {}
+    for indicador in indicadores or habilitados():
+        series.update(indicador.kernel(ctx))
+    # Se comparten entre hilos a traves del cache, no deben modificarse
+    for values in series.values():
+        values.setflags(write=False)
+    return series
+
+def calcular_indicadores(bars: BarSeries, series=None):
     """
-    Calcula el Average True Range (ATR) para medir la volatilidad real del activo.
-    data: DataFrame con columnas ['High', 'Low', 'Close']
-    periodo: ventana de cálculo (por defecto 14)
+    Calcula los indicadores habilitados sobre un BarSeries: {nombre: (valores..., estado, info)}.
+    Si se pasan las series ya calculadas solo se clasifican los ultimos valores.
     """
+    if series is None:
+        series = calcular_series(bars)
+
+    resultados = {}
+    for indicador in habilitados():
+        if any(name not in series for name in indicador.series):
+            continue
+        # La regla es vectorizada, con las dos ultimas barras alcanza
+        ultimas = {name: series[name][-2:] for name in indicador.series}
+        codigo = int(np.asarray(indicador.regla(ultimas, bars.close[-2:]))[-1])
+        valores = tuple(float(series[name][-1]) for name in indicador.valores)
+        resultados[indicador.nombre] = (*valores, ESTADOS[codigo], indicador.info[codigo])
+    return resultados
+
+# ---------- Cache de series ----------
 
-    high = data_high
-    low = data_low
-    close = data_close
+SERIES_CACHE_SIZE = 64
 
-    # True Range (TR)
-    tr1 = high - low
-    tr2 = (high - close.shift()).abs()
-    tr3 = (low - close.shift()).abs()
-    tr = pd.concat([tr1, tr2, tr3], axis=1).max(axis=1)
+_series_cache = OrderedDict()
+_series_bytes = 0
+_series_lock = threading.Lock()
 
-    atr = tr.rolling(window=periodo).mean()
+def _nbytes(series):
+    return sum(values.nbytes for values in series.values())
 
-    last_atr = atr.iloc[-1].item()
+def _series_cache_bytes():
+    return _series_bytes
 
-    if last_atr < 1:
-        estado = "ninguno"
-        info = "Baja volatilidad"
-    elif last_atr > 5:
-        estado = "bad"
-        info = "Alta volatilidad"
-    else:
-        estado = "neutral"
-        info = "Neutral"
+def _trim_series_cache(target):
+    """Descarta las series menos usadas hasta ocupar como mucho `target` bytes"""
+    global _series_bytes
+    with _series_lock:
+        while _series_cache and _series_bytes > target:
+            _, series = _series_cache.popitem(last=False)
+            _series_bytes -= _nbytes(series)
+
+memory.register("Series de indicadores", _series_cache_bytes, _trim_series_cache)
+
+def series_indicadores(ticker: str, interval: str, bars: BarSeries):
+    """
+    Series completas memoizadas por (ticker, intervalo, ultima barra).
+    El cierre de la ultima barra forma parte de la clave porque una barra
+    intradia en curso cambia sin cambiar su timestamp.
+    """
+    key = (ticker, interval, len(bars), bars.last_timestamp(), float(bars.close[-1]))
+    with _series_lock:
+        series = _series_cache.get(key)
+        if series is not None:
+            _series_cache.move_to_end(key)
+            return series
 
-    return last_atr, estado, info
+    global _series_bytes
+    series = calcular_series(bars)
+    with _series_lock:
+        if key not in _series_cache:
+            _series_cache[key] = series
+            _series_bytes += _nbytes(series)
+        while len(_series_cache) > SERIES_CACHE_SIZE:
+            _, old = _series_cache.popitem(last=False)
+            _series_bytes -= _nbytes(old)
+    # El presupuesto global se aplica desde el hilo de la interfaz, acá puede correr un worker
+    return series
 
 
 def test():
-    data = yf.download("AAPL", period="1y", interval="1d", progress=False)
-    print(data['Close'])
-    PM10, estado_PM10 = promedio_movil(data['Close'], 10)
-    PM50, estado_PM50 = promedio_movil(data['Close'], 50)
-    PM200, estado_PM200 = promedio_movil(data['Close'], 200)
-    MACD_line, Signal_line, Histograma, estado_MACD = macd(data['Close'])
-    K_percent, D_percent, estado_Estocastico = oscilador_estocastico(data) # Pasamos el DataFrame completo
-    RSI_value, estado_RSI = rsi(data['Close'])
-    Volatilidad_value, estado_Volatilidad = volatilidad(data['Close'])
-
-    print(f"Promedio Móvil 10 días: {PM10} -> Estado: {estado_PM10}")
-    print(f"Promedio Móvil 50 días: {PM50} -> Estado: {estado_PM50}")
-    print(f"Promedio Móvil 200 días: {PM200} -> Estado: {estado_PM200}")
-    print(f"MACD: Line={MACD_line:.2f}, Signal={Signal_line:.2f}, Hist={Histograma:.2f} -> Estado: {estado_MACD}")
-    print(f"Oscilador Estocástico: %K={K_percent:.2f}, %D={D_percent:.2f} -> Estado: {estado_Estocastico}")
-    print(f"RSI: {RSI_value:.2f} -> Estado: {estado_RSI}")
-    print(f"Volatilidad Anualizada: {Volatilidad_value:.2f} -> Estado: {estado_Volatilidad}")
+    data = BarSeries.from_download(yf.download("AAPL", period="1y", interval="1d", progress=False))
+    print(data.close)
+    for nombre, datos in calcular_indicadores(data).items():
+        print(f"{REGISTRO[nombre].descripcion}: {mostrar(nombre, datos)} -> Estado: {datos[-2]} ({datos[-1]})")
 
 if __name__ == "__main__":
     test()
\ No newline at end of file
@@ -0,0 +1,155 @@
+import html
+import re
+
+import numpy as np
+
+# Sentences kept per ticker, for the summarizer prompt and the key points view
+TOP_K = 10
+
+# Stories sharing this fraction of their words are syndicated copies of each other
+DUPLICATE_SIMILARITY = 0.8
+
+# A sentence this similar (cosine) to one already picked adds nothing
+REDUNDANT_SIMILARITY = 0.5
+
+# Shorter sentences are usually captions or bylines
+MIN_WORDS = 5
+
+STOPWORDS = frozenset("""
+a about after again all also an and any are as at be been before being but by can could did do does
+for from had has have he her his how i if in into is it its just more most new no not now of on one
+or our out over said says she so some than that the their them then there these they this those to
+up us was we were what when which while who will with would year years you your
+al algo ante como con de del desde donde el ella ellos en entre era es esta este esto fue ha hay la
+las le les lo los mas muy no nos o para pero por que se ser si sin sobre su sus tambien un una uno y ya
+""".split())
+
+_TAG = re.compile(r"<[^>]+>")
+_SPACE = re.compile(r"\s+")
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+(?=[\"'“¿¡(A-ZÁÉÍÓÚÑ])")
+# A period after these doesn't end the sentence: U.S., Inc., Sept. ...
+_ABBREVIATION = re.compile(
+    r"(?:\b(?:[A-Z]\.){1,3}|\b(?:Inc|Corp|Co|Ltd|Mr|Mrs|Ms|Dr|St|Jr|vs|Jan|Feb|Mar|Apr|Jun|Jul|Aug|Sept?|Oct|Nov|Dec)\.)$"
+)
+_WORD = re.compile(r"[a-z0-9áéíóúñü]+(?:'[a-z]+)?")
+
+
+def plain_text(markup: str | None) -> str:
+    """Text of an HTML fragment, like the description field of a story"""
+    if not markup:
+        return ""
+    return _SPACE.sub(" ", html.unescape(_TAG.sub(" ", markup))).strip()
+
+
+def split_sentences(text: str) -> list[str]:
+    sentences = []
+    for piece in _SENTENCE_END.split(text or ""):
+        piece = piece.strip()
+        if not piece:
+            continue
+        if sentences and _ABBREVIATION.search(sentences[-1]):
+            sentences[-1] = f"{sentences[-1]} {piece}"
+        else:
+            sentences.append(piece)
+    return sentences
+
+
+def _words(text: str) -> list[str]:
+    return [w for w in _WORD.findall(text.lower()) if len(w) > 2 and w not in STOPWORDS]
+
+
+def unique_stories(news: list) -> list:
+    """Drops syndicated copies: same title, or nearly the same words as an earlier story"""
+    kept, word_sets, titles = [], [], set()
+    for story in news:
+        title = " ".join(_words(story.get("title") or ""))
+        words = set(_words(f"{story.get('title') or ''} {story.get('summary') or ''}"))
+        if title and title in titles:
+            continue
+        if any(len(words & other) >= DUPLICATE_SIMILARITY * min(len(words), len(other))
+               for other in word_sets if words and other):
+            continue
+        titles.add(title)
+        word_sets.append(words)
+        kept.append(story)
+    return kept
+
+
+def key_sentences(news: list, k: int = TOP_K) -> list[dict]:
+    """
+    The k sentences that best represent the stories as a whole, most central first.
+    Sentences are TF-IDF vectors, their score is the cosine with the centroid of all of
+    them, so topics several stories mention rank above one-off details. Near repeats of
+    an already picked sentence are skipped.
+    Returns dicts with sentence, publisher, link and score.
+    """
+    sentences, sources, tokens = [], [], []
+    seen = set()
+    for story in unique_stories(news):
+        # The description usually repeats the summary, each sentence counts once
+        fields = (story.get("summary"), plain_text(story.get("text")))
+        story_sentences = [story.get("title") or ""]
+        for field in fields:
+            story_sentences += split_sentences(field)
+        for sentence in story_sentences:
+            words = _words(sentence)
+            key = " ".join(words)
+            if len(words) < MIN_WORDS or key in seen:
+                continue
+            seen.add(key)
+            sentences.append(sentence)
+            sources.append(story)
+            tokens.append(words)
+
+    if not sentences:
+        return []
+
+    # Sparse (sentence, term, count) triplets
+    vocabulary = {}
+    rows, cols = [], []
+    for row, words in enumerate(tokens):
+        for word in words:
+            rows.append(row)
+            cols.append(vocabulary.setdefault(word, len(vocabulary)))
+    pairs = np.unique(np.array(rows, dtype=np.int64) * len(vocabulary) + np.array(cols), return_counts=True)
+    rows, cols = np.divmod(pairs[0], len(vocabulary))
+    counts = pairs[1]
+
+    n, terms = len(sentences), len(vocabulary)
+    idf = np.log((1 + n) / (1 + np.bincount(cols, minlength=terms))) + 1
+    weights = (1 + np.log(counts)) * idf[cols]
+    weights /= np.sqrt(np.bincount(rows, weights * weights, minlength=n))[rows]
+
+    centroid = np.bincount(cols, weights, minlength=terms) / n
+    scores = np.bincount(rows, weights * centroid[cols], minlength=n)
+
+    vectors = {}
+    starts = np.searchsorted(rows, np.arange(n + 1))
+    for row in range(n):
+        span = slice(starts[row], starts[row + 1])
+        vectors[row] = dict(zip(cols[span].tolist(), weights[span].tolist()))
+
+    picked = []
+    for row in np.argsort(-scores, kind="stable"):
+        vector = vectors[row]
+        if any(_cosine(vector, vectors[other]) > REDUNDANT_SIMILARITY for other in picked):
+            continue
+        picked.append(row)
+        if len(picked) == k:
+            break
+
+    return [
+        {
+            "sentence": sentences[row],
+            "publisher": sources[row].get("publisher"),
+            "link": sources[row].get("link"),
+            "score": float(scores[row]),
+        }
+        for row in picked
+    ]
+
+
+def _cosine(first: dict, second: dict) -> float:
+    if len(first) > len(second):
+        first, second = second, first
+    return sum(weight * second.get(term, 0.0) for term, weight in first.items())
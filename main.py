@@ -2,32 +2,71 @@ import sys
 from typing import List
 
 from PyQt6.QtCore import (
-    Qt, QThreadPool
+    Qt, QThreadPool, QTimer, pyqtSignal
 )
 from PyQt6.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
-    QLineEdit, QPushButton, QListWidget, QListWidgetItem, QLabel,
+    QLineEdit, QPushButton, QListWidget, QListWidgetItem, QListView, QLabel,
     QTextBrowser, QMessageBox, QSizePolicy, QSplitter, QGroupBox,
-    QScrollArea, QStackedWidget, QProgressBar, QGridLayout
+    QScrollArea, QStackedWidget, QProgressBar, QCompleter
 )
 from PyQt6.QtGui import QIcon
 from qt_material import apply_stylesheet
 
-from tasks import PriceHistoryFetchTask, NewsFetchTask, GenerateSummaryTask, GenerateDatosIndicadoresTask
+from tasks import (
+    PriceHistoryFetchTask, NewsFetchTask, GenerateSummaryTask, GenerateDatosIndicadoresTask,
+    MultiTimeframeIndicatorsTask, SymbolInfoTask, WatchlistRefreshTask, ComparisonFetchTask,
+    RiskMatrixTask, BatchSummaryTask, chart_interval, WATCHLIST_SIZE
+)
+
+from widgets import (
+    ChartWidget, NewsDetailPopup, NewsListModel, IndicatorPanel, TimeframeTable, SymbolCompleterModel,
+    MemoryView, WatchlistTable, AlertsView, RiskView, KeyPointsList, SENTIMENT_STATES
+)
+
+from symbols import SymbolIndex, is_valid_symbol
+from bars import join_keys
+from backoff import guard
+import api
+import memory
+import portfolio
+import sentiment
+import summaries
+from alerts import AlertEngine, parse_rule
 
-from widgets import ChartWidget, NewsDetailPopup, IndicatorWidget
+import db
 
-from db import SessionLocal, TickerHistory, init_db
+# Saved tickers loaded into the history list at a time
+HISTORY_PAGE_SIZE = 200
+
+# How often the watchlist is refreshed, in milliseconds
+WATCHLIST_REFRESH_MS = 5 * 60 * 1000
+
+# How often the cache budget is checked for what worker threads and the API added
+MEMORY_CHECK_MS = 5000
+
+# Index of the watchlist page in the central stack
+WATCHLIST_PAGE = 4
+RISK_PAGE = 5
 
 # --------- Main Window ---------
 class MainWindow(QMainWindow):
+    # The risk model was dropped to free memory, the view lets go of it too
+    risk_trimmed = pyqtSignal()
+
     def __init__(self):
         super().__init__()
-        init_db()
+        db.init_db()
+        self.symbol_index = SymbolIndex.load(extra=db.load_symbol_names())
+        self.alert_engine = AlertEngine()
+        self.load_alert_rules()
         self.setWindowTitle("Dashboard")
         self.resize(1020, 600)
         self.setMinimumSize(1020, 600)
         self.thread_pool = QThreadPool()
+        self.api_server = None  # embedded API, started by main()
+        self.popup = None
+        self.current_ticker = None
 
         # --- Top bar ---
         top_widget = QWidget()
@@ -45,6 +84,14 @@ class MainWindow(QMainWindow):
         self.search_input.setAlignment(Qt.AlignmentFlag.AlignHCenter)
         self.search_input.setFocusPolicy(Qt.FocusPolicy.ClickFocus)
         self.search_input.textEdited.connect(self.capitalize_input)
+        self.search_input.textEdited.connect(self.update_suggestions)
+
+        # Suggestions come from the local symbol index, no network involved
+        self.symbol_model = SymbolCompleterModel(self.symbol_index, self)
+        self.completer = QCompleter(self.symbol_model, self)
+        self.completer.setCompletionMode(QCompleter.CompletionMode.UnfilteredPopupCompletion)
+        self.completer.setWidget(self.search_input)
+        self.completer.activated.connect(self.on_symbol_selected)
 
         self.search_button = QPushButton("Buscar")
         self.search_button.setFocusPolicy(Qt.FocusPolicy.NoFocus)
@@ -53,8 +100,18 @@ class MainWindow(QMainWindow):
         # Allows to press Enter to search
         self.search_input.returnPressed.connect(self.search_button.click)
 
+        self.watchlist_button = QPushButton("Watchlist")
+        self.watchlist_button.setFocusPolicy(Qt.FocusPolicy.NoFocus)
+        self.watchlist_button.clicked.connect(self.show_watchlist)
+
         top_layout.addWidget(self.search_input)
         top_layout.addWidget(self.search_button)
+        self.risk_button = QPushButton("Riesgo")
+        self.risk_button.setFocusPolicy(Qt.FocusPolicy.NoFocus)
+        self.risk_button.clicked.connect(self.show_risk)
+
+        top_layout.addWidget(self.watchlist_button)
+        top_layout.addWidget(self.risk_button)
 
         # --- Main container ---
         self.central_stack = QStackedWidget()
@@ -94,12 +151,25 @@ class MainWindow(QMainWindow):
         error_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
         self.central_stack.addWidget(error_label)
 
+        # Watchlist Page
+        self.central_stack.addWidget(self.build_watchlist_page())
+
+        # Risk Page
+        self.risk_view = RiskView()
+        self.risk_view.refresh_requested.connect(self.build_risk_model)
+        self.risk_trimmed.connect(self.risk_view.clear)
+        self.central_stack.addWidget(self.risk_view)
+
         # History
         right_panel = QGroupBox("Historial")
         right_panel.setMaximumWidth(250)
         rh_layout = QVBoxLayout(right_panel)
         self.history_list = QListWidget()
+        self.history_items = {}
+        self.history_cursor = None
+        self.history_exhausted = False
         self.load_history()
+        self.history_list.verticalScrollBar().valueChanged.connect(self.on_history_scrolled)
         self.history_list.setUniformItemSizes(True)
         self.history_list.setTextElideMode(Qt.TextElideMode.ElideRight) # <---
         self.history_list.setWordWrap(False)
@@ -127,6 +197,73 @@ class MainWindow(QMainWindow):
         self.showMaximized()
         self.statusBar().showMessage('')
 
+        # Symbols without data and endpoints backing off after errors
+        self.guard_label = QLabel()
+        self.statusBar().addPermanentWidget(self.guard_label)
+        self.guard_timer = QTimer(self)
+        self.guard_timer.timeout.connect(self.update_guard_status)
+        self.guard_timer.start(2000)
+
+        # Caches are trimmed on the GUI thread only, some of them back Qt models.
+        # Tasks and the API just fill them, the budget catches up here
+        self.memory_timer = QTimer(self)
+        self.memory_timer.timeout.connect(memory.enforce)
+        self.memory_timer.start(MEMORY_CHECK_MS)
+
+        self.memory_view = None
+        memory_button = QPushButton("Memoria")
+        memory_button.setFlat(True)
+        memory_button.setFocusPolicy(Qt.FocusPolicy.NoFocus)
+        memory_button.clicked.connect(self.show_memory_view)
+        self.statusBar().addPermanentWidget(memory_button)
+
+        self.alerts_view = None
+        self.unseen_alerts = 0
+        self.alerts_button = QPushButton("Alertas")
+        self.alerts_button.setFlat(True)
+        self.alerts_button.setFocusPolicy(Qt.FocusPolicy.NoFocus)
+        self.alerts_button.clicked.connect(self.show_alerts_view)
+        self.statusBar().addPermanentWidget(self.alerts_button)
+
+        # All saved tickers are refreshed together, never one request per row
+        self._watchlist_running = False
+        self.watchlist_timer = QTimer(self)
+        self.watchlist_timer.timeout.connect(self.refresh_watchlist)
+        self.watchlist_timer.start(WATCHLIST_REFRESH_MS)
+        self.watchlist_rows = {}
+
+        # Built from the stored series when first shown, then updated with each watchlist refresh
+        self.risk_model = None
+        self.risk_tickers = []
+        self._risk_running = False
+        memory.register("Riesgo", self.risk_nbytes, self.trim_risk)
+
+    def build_watchlist_page(self):
+        """Builds the watchlist page"""
+        page = QWidget()
+        layout = QVBoxLayout(page)
+
+        header = QHBoxLayout()
+        title = QLabel("Watchlist")
+        title.setStyleSheet("font-size: 18px; font-weight: 600;")
+        header.addWidget(title)
+        header.addStretch()
+        refresh_button = QPushButton("Actualizar")
+        refresh_button.setFocusPolicy(Qt.FocusPolicy.NoFocus)
+        refresh_button.clicked.connect(self.refresh_watchlist)
+        self.summarize_button = QPushButton("Resumir todo")
+        self.summarize_button.setFocusPolicy(Qt.FocusPolicy.NoFocus)
+        self.summarize_button.setToolTip("Genera el resumen de cada ticker, varios por consulta")
+        self.summarize_button.clicked.connect(self.summarize_watchlist)
+        header.addWidget(self.summarize_button)
+        header.addWidget(refresh_button)
+        layout.addLayout(header)
+
+        self.watchlist_table = WatchlistTable()
+        self.watchlist_table.ticker_activated.connect(self.on_watchlist_ticker)
+        layout.addWidget(self.watchlist_table)
+        return page
+
     def build_main_content(self):
         """Builds the main page"""
         central = QWidget()
@@ -136,17 +273,40 @@ class MainWindow(QMainWindow):
 
         self.chart = ChartWidget()
         self.chart.period_changed.connect(self.on_period_changed)
+        self.chart.compare_changed.connect(self.fetch_comparison)
         size_policy = QSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Fixed)
         self.chart.setSizePolicy(size_policy)
-        self.chart.setFixedHeight(320)
+        self.chart.setFixedHeight(ChartWidget.BASE_HEIGHT)
 
         central_layout.addWidget(self.chart, stretch=4)
 
+        # Shown in place of the chart while its history loads, the indicator panel usually arrives first
+        self.chart_loading = QGroupBox('Evolución')
+        cl_loading = QVBoxLayout(self.chart_loading)
+        cl_loading.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        chart_progress = QProgressBar()
+        chart_progress.setRange(0, 0)
+        chart_progress.setFixedWidth(200)
+        cl_loading.addWidget(chart_progress)
+        self.chart_loading.setFixedHeight(ChartWidget.BASE_HEIGHT)
+        self.chart_loading.hide()
+        central_layout.addWidget(self.chart_loading, stretch=4)
+
         self.rating_group = QGroupBox("Indicadores")
-        self.indicators_layout = QGridLayout(self.rating_group)
+        rating_layout = QVBoxLayout(self.rating_group)
+        self.indicator_panel = IndicatorPanel()
+        rating_layout.addWidget(self.indicator_panel)
         
         central_layout.addWidget(self.rating_group, stretch=1)
 
+        timeframe_group = QGroupBox("Indicadores por temporalidad")
+        tf_layout = QVBoxLayout(timeframe_group)
+        self.timeframe_table = TimeframeTable()
+        self.timeframe_table.setMinimumHeight(300)
+        tf_layout.addWidget(self.timeframe_table)
+
+        central_layout.addWidget(timeframe_group, stretch=1)
+
         # News stack
         self.news_stack = QStackedWidget()
         self.news_stack.setMinimumHeight(330)
@@ -164,9 +324,24 @@ class MainWindow(QMainWindow):
         # News
         news_group = QGroupBox('Últimas Noticias')
         nl_content = QVBoxLayout(news_group)
-        self.news_list = QListWidget()
-        self.news_list.itemDoubleClicked.connect(self.on_news_item_double_clicked)
+        self.news_model = NewsListModel(self)
+        memory.register("Noticias", self.news_model.nbytes, self.news_model.trim)
+        self.news_list = QListView()
+        self.news_list.setModel(self.news_model)
+        self.news_list.setUniformItemSizes(True)
+        self.news_list.setLayoutMode(QListView.LayoutMode.Batched)
+        self.news_list.doubleClicked.connect(self.on_news_item_double_clicked)
         nl_content.addWidget(self.news_list)
+
+        # Extracted locally from the stories, no summarizer involved
+        self.key_points_list = KeyPointsList()
+        self.key_points_list.hide()
+        nl_content.addWidget(self.key_points_list)
+        self.key_points_button = QPushButton("Puntos clave")
+        self.key_points_button.setCheckable(True)
+        self.key_points_button.setFocusPolicy(Qt.FocusPolicy.NoFocus)
+        self.key_points_button.toggled.connect(self.on_key_points_toggled)
+        nl_content.addWidget(self.key_points_button, alignment=Qt.AlignmentFlag.AlignRight)
         self.news_stack.addWidget(news_group)
 
         self.news_stack.setCurrentIndex(0)
@@ -226,40 +401,89 @@ class MainWindow(QMainWindow):
         
         return scroll
 
+    def update_guard_status(self):
+        missing, backing_off = guard.status()
+        parts = []
+        if missing:
+            parts.append(f"Sin datos: {missing}")
+        if backing_off:
+            parts.append(f"En pausa: {backing_off}")
+        self.guard_label.setText(" · ".join(parts))
+
     def capitalize_input(self, text):
         cursor_position = self.search_input.cursorPosition()
         self.search_input.setText(text.upper())
         self.search_input.setCursorPosition(cursor_position)
 
+    def update_suggestions(self, text):
+        self.symbol_model.set_query(text)
+        if self.symbol_model.rowCount() and text.strip():
+            self.completer.complete()
+        else:
+            self.completer.popup().hide()
+
+    def on_symbol_selected(self, symbol: str):
+        self.search_input.setText(symbol)
+        self.on_search_clicked()
+
     def on_search_clicked(self):
-        ticker = self.search_input.text().strip()
+        ticker = self.search_input.text().strip().upper()
         if not ticker:
             QMessageBox.warning(self, "Atención", "Ingrese un ticker.")
             return
+        if not is_valid_symbol(ticker):
+            QMessageBox.warning(self, "Atención", f"\"{ticker}\" no es un ticker válido.")
+            return
         self.central_stack.setCurrentIndex(1)
         self.chart.reset()
-        self.news_list.clear()
         self.summary_view.clear()
+        self.timeframe_table.clear_values()
         self.start_fetch(ticker)
 
+    def release_ticker(self):
+        """Drops what the previous ticker left on screen before loading another one"""
+        self.chart.reset()
+        self._fetched_news_data = None
+        self._fetched_indicators_data = None
+        if self.popup is not None:
+            self.popup.clear()
+        memory.enforce()
+
     def start_fetch(self, ticker: str):
+        if ticker != self.current_ticker:
+            self.release_ticker()
         self.current_ticker = ticker
         self.statusBar().showMessage(f"Buscando datos para {ticker} ...", 3000)
         
-        self.news_stack.setCurrentIndex(0)
         self.summary_stack.setCurrentIndex(0)
+
+        # Stories already seen for this ticker are shown while the feed refreshes
+        if self.news_model.show_ticker(ticker):
+            self.news_stack.setCurrentIndex(1)
+            self.refresh_key_points()
+        else:
+            self.news_stack.setCurrentIndex(0)
+        self.refresh_sentiment()
         
         self.chart.reset_period()
         
         self._fetched_news_data = None
         self._fetched_indicators_data = None
 
+        self.show_chart_loading(True)
+
+        # The panel only needs the warm-up bars, it shows up before the chart history arrives
+        indicadores = GenerateDatosIndicadoresTask(ticker)
+        indicadores.signals.finished.connect(self.indicators_generated)
+        indicadores.signals.error.connect(self.on_daily_indicator_error)
+        self.thread_pool.start(indicadores)
+
         price_history = PriceHistoryFetchTask(ticker, period='1y')
         price_history.signals.finished.connect(self.on_price_history_fetched)
         price_history.signals.error.connect(self.on_price_history_error)
         self.thread_pool.start(price_history)
     
-    def on_price_history_fetched(self, period, df):
+    def on_price_history_fetched(self, period, bars, series):
         """
         Shows main page, starts other tasks, updates ticker history chart
         """
@@ -270,65 +494,94 @@ class MainWindow(QMainWindow):
         self.thread_pool.start(news)
 
         self.central_stack.setCurrentIndex(2)
+        self.show_chart_loading(False)
         self.statusBar().showMessage('Historial descargado correctamente.', 3000)
-        
-        indicadores = GenerateDatosIndicadoresTask(self.current_ticker)
-        indicadores.signals.finished.connect(self.indicators_generated)
-        indicadores.signals.error.connect(self.on_indicator_error)
-        self.thread_pool.start(indicadores)
+
+        timeframes = MultiTimeframeIndicatorsTask(self.current_ticker)
+        timeframes.signals.finished.connect(self.on_timeframes_generated)
+        timeframes.signals.error.connect(self.on_indicator_error)
+        self.thread_pool.start(timeframes)
+
+        # The ticker exists, learn its name for the suggestions if it's not known yet
+        self.symbol_index.add(self.current_ticker)
+        if not self.symbol_index.name(self.current_ticker):
+            symbol_info = SymbolInfoTask(self.current_ticker)
+            symbol_info.signals.finished.connect(self.on_symbol_info)
+            self.thread_pool.start(symbol_info)
 
         if(period == '1y'):
-            self.update_chart(period, df)
+            self.update_chart(period, bars, series)
 
-    def indicators_generated(self, datos_indicadores):
+    def on_symbol_info(self, ticker: str, name: str):
+        self.symbol_index.add(ticker, name)
+        db.save_symbol_name(ticker, name)
+
+    def indicators_generated(self, ticker: str, datos_indicadores):
+
+        # Ignore old tickers
+        if ticker != self.current_ticker:
+            return
 
         self._fetched_indicators_data = datos_indicadores
-        # Limpiar el layout actual
-        for i in reversed(range(self.indicators_layout.count())):
-            self.indicators_layout.itemAt(i).widget().setParent(None) 
-
-        # Agregar nuevos widgets de indicadores
-        row, col = 0, 0
-        for name, data_tuple in datos_indicadores.items():
-            display_value = ""
-            state = "neutral"
-            info_text = ""
-
-            if name in ['SMA10', 'SMA50', 'SMA200', 'RSI', 'Volatilidad', 'ATR14']:
-                # Tupla de (valor, estado, info)
-                value, state, info_text = data_tuple
-                display_value = f"{value:.2f}"
-            
-            elif name == 'MACD':
-                # Tupla de (linea, señal, hist, estado, info)
-                macd_line, signal_line, _, state, info_text = data_tuple
-                display_value = f"L: {macd_line:.2f} S: {signal_line:.2f}"
-
-            elif name == 'Estocastico':
-                # Tupla de (k, d, estado, info)
-                k_percent, d_percent, state, info_text = data_tuple
-                display_value = f"%K: {k_percent:.2f} %D: {d_percent:.2f}"
-
-            # Crear y añadir el widget
-            widget = IndicatorWidget(name, display_value, state, info_text)
-            self.indicators_layout.addWidget(widget, row, col)
-            
-            col += 1
-            if col >= 4:  # 4 indicadores por fila
-                col = 0
-                row += 1
-            self.statusBar().showMessage("Indicadores calculados correctamente.", 3000)
+
+        # Usually ready before the chart history, the page is shown with the panel filled
+        # and the chart placeholder until the history arrives
+        self.central_stack.setCurrentIndex(2)
+
+        # Tiles are reused, only their value and state change
+        self.indicator_panel.update_data(datos_indicadores)
+        self.statusBar().showMessage("Indicadores calculados correctamente.", 3000)
 
         self._check_if_ready_for_summary()
 
+    def on_timeframes_generated(self, ticker: str, resultados: dict):
+
+        # Ignore old tickers
+        if ticker != self.current_ticker:
+            return
+
+        self.timeframe_table.update_data(resultados)
+        # The timeframe series were just memoized by the task
+        memory.enforce()
+
     def on_indicator_error(self, msg: str):
         self.statusBar().showMessage(msg, 3000)
 
-    def update_chart(self, period, df):
-        dates = df.index.to_list()
-        prices = df['Close'].iloc[:, 0].tolist()
-        self.chart.update_data(dates, prices, self.current_ticker, period)
+    def on_daily_indicator_error(self, ticker: str, msg: str):
+        # A late failure of the previous ticker must not blank the current one
+        if ticker != self.current_ticker:
+            return
+        self.on_indicator_error(msg)
+        self._fetched_indicators_data = {}
+        self._check_if_ready_for_summary()
+
+    def show_chart_loading(self, loading: bool):
+        self.chart_loading.setVisible(loading)
+        self.chart.setVisible(not loading)
+
+    def update_chart(self, period, bars, series):
+        keys = join_keys(bars, chart_interval(period))
+        self.chart.update_data(bars.dates(), bars.close, self.current_ticker, period, series, keys)
         self.add_history_entry(self.current_ticker)
+        # Compared tickers follow the period of the chart
+        if self.chart.compare_tickers:
+            self.fetch_comparison(self.chart.compare_tickers)
+
+    def fetch_comparison(self, tickers: list):
+        invalid = [t for t in tickers if not is_valid_symbol(t)]
+        if invalid:
+            self.statusBar().showMessage(f"Tickers inválidos: {', '.join(invalid)}", 3000)
+            tickers = [t for t in tickers if is_valid_symbol(t)]
+            self.chart.set_compare(tickers)
+        if not tickers:
+            return
+        task = ComparisonFetchTask(tickers, self.chart.get_period())
+        task.signals.series_ready.connect(self.chart.add_compare_series)
+        task.signals.error.connect(self.on_comparison_error)
+        self.thread_pool.start(task)
+
+    def on_comparison_error(self, msg: str):
+        self.statusBar().showMessage(msg, 3000)
 
     def on_period_changed(self):
         period = self.chart.get_period()
@@ -342,23 +595,24 @@ class MainWindow(QMainWindow):
         self.statusBar().showMessage(msg, 3000)
         QMessageBox.warning(self, 'Error', msg)
 
-    def on_news_fetched(self, news: List[dict]):
-        self._fetched_news_data = news
-        self.statusBar().showMessage('Noticias descargadas correctamente.', 3000)
-        self.news_list.clear()
+    def on_news_fetched(self, ticker: str, news: List[dict]):
 
-        if not news:
-            self.news_list.addItem("No se encontraron noticias.")
+        # Older tickers still fill their feed, but don't touch the current one
+        self.news_model.append_news(ticker, news)
+        if ticker != self.current_ticker:
             return
 
-        for n in news:
-            item = QListWidgetItem(f"{n['title']} ({n['publisher']})")
-            item.setToolTip(f"Doble clic para ver detalles...\n\n{n['summary']}")
-            item.setData(Qt.ItemDataRole.UserRole, n)
-            self.news_list.addItem(item)   
+        self._fetched_news_data = news
+        self.statusBar().showMessage('Noticias descargadas correctamente.', 3000)
+        self.refresh_key_points()
+        self.refresh_sentiment()
 
-        self.news_stack.setCurrentIndex(1)   
+        if not news:
+            self.news_model.set_placeholder("No se encontraron noticias.")
+        else:
+            self.news_stack.setCurrentIndex(1)
 
+        # The summary doesn't wait for stories that aren't coming
         self._check_if_ready_for_summary()
     
     def _check_if_ready_for_summary(self):
@@ -375,6 +629,16 @@ class MainWindow(QMainWindow):
             self._generate_summary(ticker, news, indicators)
 
     def _generate_summary(self, ticker, news, indicadores):
+        if not news and not indicadores:
+            self.on_summary_error("No hay noticias ni indicadores para resumir.")
+            return
+
+        # Recent summaries, e.g. from a batch run, don't spend another request
+        cached = db.load_summaries([ticker], summaries.MAX_AGE).get(ticker)
+        if cached is not None:
+            self.show_summary(ticker, cached)
+            return
+
         self.statusBar().showMessage("Generando resumen...", 3000)
         
         summary_task = GenerateSummaryTask(ticker, news, indicadores)
@@ -382,7 +646,16 @@ class MainWindow(QMainWindow):
         summary_task.signals.error.connect(self.on_summary_error)
         self.thread_pool.start(summary_task)
 
-    def on_summary_generated(self, ticker: str, summary: str):
+    def on_summary_generated(self, ticker: str, summary: str, backend: str):
+        self.show_summary(ticker, summary)
+        # Fallback summaries are shown but not kept, the next visit asks the backend again
+        if backend == summaries.FALLBACK.name and summaries.BACKEND != backend:
+            if ticker == self.current_ticker:
+                self.statusBar().showMessage("Servicio de resúmenes no disponible, se muestra un resumen local.", 5000)
+            return
+        db.save_summary(ticker, summary)
+
+    def show_summary(self, ticker: str, summary: str):
 
         # Ignore old tickers
         if ticker != self.current_ticker:
@@ -399,41 +672,79 @@ class MainWindow(QMainWindow):
         self.summary_view.append(error)
         self.summary_stack.setCurrentIndex(2)
 
-    def on_news_item_double_clicked(self, item: QListWidgetItem):
+    def on_key_points_toggled(self, checked: bool):
+        self.news_list.setVisible(not checked)
+        self.key_points_list.setVisible(checked)
+        self.refresh_key_points()
+
+    def refresh_key_points(self):
+        if self.key_points_button.isChecked() and self.current_ticker:
+            self.key_points_list.set_news(self.news_model.news(self.current_ticker))
+
+    def refresh_sentiment(self):
+        """Sentiment tile of the current ticker, from every story stored for it"""
+        result = sentiment.aggregate(self.news_model.news(self.current_ticker))
+        if result is None:
+            self.indicator_panel.hide_extra("Sentimiento")
+            return
+        score, positive, negative = result
+        tone = sentiment.label(score)
+        self.indicator_panel.set_extra(
+            "Sentimiento", f"{score:+.2f}", SENTIMENT_STATES[tone],
+            f"{tone} ({positive} pos. / {negative} neg.)"
+        )
+
+    def on_news_item_double_clicked(self, index):
         """
         Al hacer doble clic, abre un popup con los detalles de la noticia.
         """
-        news_data = item.data(Qt.ItemDataRole.UserRole)
+        news_data = index.data(Qt.ItemDataRole.UserRole)
         if news_data:
-            # Usamos el nuevo widget en lugar de QDialog
-            self.popup = NewsDetailPopup(news_data, self)
+            # Un solo popup que se reutiliza para cada noticia
+            if self.popup is None:
+                self.popup = NewsDetailPopup(parent=self)
+            self.popup.set_news(news_data)
             self.popup.show()
+            self.popup.raise_()
 
     def on_news_error(self, msg: str):
         self.statusBar().showMessage(msg, 3000)
-        if hasattr(self, "news_list") and self.news_list is not None:
-            self.news_list.clear()
-            self.news_list.addItem(msg)
+        # Keep the stories already stored for the ticker, if any
+        if self.news_model.rowCount() == 0:
+            self.news_model.set_placeholder(msg)
+        self._fetched_news_data = []
+        self._check_if_ready_for_summary()
 
-    def add_history_entry(self, ticker: str):
-        
-        # Remove the same ticker if it's already in the list
-        for i in range(self.history_list.count()):
-            item = self.history_list.item(i)
-            if item.data(Qt.ItemDataRole.UserRole) == ticker:
-                self.history_list.takeItem(i)
-                break
-        
+    def _history_item(self, ticker: str) -> QListWidgetItem:
         item = QListWidgetItem(f"{ticker}")
         item.setData(Qt.ItemDataRole.UserRole, ticker)
-        
         item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-        
+        self.history_items[ticker] = item
+        return item
+
+    def add_history_entry(self, ticker: str):
+        # Saved right away so nothing is lost if the app doesn't close cleanly
+        db.touch_ticker(ticker)
+
+        # Move the ticker to the top if it's already in the list
+        item = self.history_items.get(ticker)
+        if item is not None:
+            row = self.history_list.row(item)
+            if row == 0:
+                return
+            self.history_list.takeItem(row)
+        else:
+            item = self._history_item(ticker)
+
         self.history_list.insertItem(0, item)
         self.history_list.setCurrentRow(0)
     
     def clear_history(self):
+        db.clear_history()
         self.history_list.clear()
+        self.history_items.clear()
+        self.history_cursor = None
+        self.history_exhausted = True
         self.statusBar().showMessage("Historial borrado.", 3000)
 
     def on_history_clicked(self, item: QListWidgetItem):
@@ -443,30 +754,214 @@ class MainWindow(QMainWindow):
         self.central_stack.setCurrentIndex(1)
         self.start_fetch(ticker)
 
-    def save_history(self):
-        session = SessionLocal()
-        session.query(TickerHistory).delete()
-        
-        for i in range(self.history_list.count()):
-            item = self.history_list.item(i)
-            ticker = item.data(Qt.ItemDataRole.UserRole)
-            session.add(TickerHistory(ticker=ticker))
-            
-        session.commit()
-        session.close()
-    
     def load_history(self):
-        session = SessionLocal()
-        tickers = session.query(TickerHistory).all()
-        for entry in tickers:
-            self.add_history_entry(entry.ticker)
-        session.close()
-    
+        """Appends the next page of saved tickers, most recent first"""
+        if self.history_exhausted:
+            return
+
+        rows = db.load_history(HISTORY_PAGE_SIZE, before=self.history_cursor)
+        if len(rows) < HISTORY_PAGE_SIZE:
+            self.history_exhausted = True
+        if rows:
+            self.history_cursor = rows[-1][1]
+
+        for ticker, _ in rows:
+            # Tickers searched during this session are already at the top
+            if ticker not in self.history_items:
+                self.history_list.addItem(self._history_item(ticker))
+
+    def on_history_scrolled(self, value: int):
+        if value == self.history_list.verticalScrollBar().maximum():
+            self.load_history()
+
+    def show_watchlist(self):
+        self.central_stack.setCurrentIndex(WATCHLIST_PAGE)
+        self.refresh_watchlist()
+
+    def refresh_watchlist(self):
+        # A cycle is already running, the next tick will pick up any change
+        if self._watchlist_running:
+            return
+        self._watchlist_running = True
+        task = WatchlistRefreshTask(extra=(portfolio.BENCHMARK,))
+        task.signals.finished.connect(self.on_watchlist_refreshed)
+        task.signals.error.connect(self.on_watchlist_error)
+        self.thread_pool.start(task)
+
+    def on_watchlist_refreshed(self, tickers, rows):
+        self._watchlist_running = False
+        self.watchlist_table.update_data(tickers, rows)
+        self.watchlist_rows = rows
+
+        # Only tickers whose last bar changed are evaluated, indicators come with the rows
+        fired = self.alert_engine.evaluate({ticker: rows[ticker] for ticker in tickers})
+        if fired:
+            self.on_alerts_fired(fired)
+        self.update_risk(tickers)
+        if self.central_stack.currentIndex() == WATCHLIST_PAGE:
+            self.statusBar().showMessage("Watchlist actualizada.", 3000)
+
+    def on_watchlist_error(self, msg: str):
+        self._watchlist_running = False
+        self.statusBar().showMessage(msg, 3000)
+
+    def on_watchlist_ticker(self, ticker: str):
+        self.search_input.setText(ticker)
+        self.on_search_clicked()
+
+    def summarize_watchlist(self):
+        tickers = [ticker for ticker, _ in db.load_history(WATCHLIST_SIZE)]
+        if not tickers:
+            return
+        self.summarize_button.setEnabled(False)
+        task = BatchSummaryTask(tickers)
+        task.signals.progress.connect(self.on_batch_summary_progress)
+        task.signals.finished.connect(self.on_batch_summary_finished)
+        task.signals.error.connect(self.on_batch_summary_error)
+        self.thread_pool.start(task)
+
+    def on_batch_summary_progress(self, done: int, total: int):
+        self.statusBar().showMessage(f"Generando resúmenes: {done}/{total}", 10000)
+
+    def on_batch_summary_finished(self, summarized: int, requests: int):
+        self.summarize_button.setEnabled(True)
+        if not requests:
+            self.statusBar().showMessage("Los resúmenes ya están actualizados.", 5000)
+            return
+        self.statusBar().showMessage(
+            f"{summarized} resúmenes generados con {requests} consultas.", 5000
+        )
+
+    def on_batch_summary_error(self, msg: str):
+        self.summarize_button.setEnabled(True)
+        self.statusBar().showMessage(f"Error al generar los resúmenes: {msg}", 5000)
+
+    def show_risk(self):
+        self.central_stack.setCurrentIndex(RISK_PAGE)
+        if self.risk_model is None:
+            self.build_risk_model()
+        else:
+            self.risk_view.set_model(self.risk_model)
+
+    def build_risk_model(self):
+        if self._risk_running:
+            return
+        self._risk_running = True
+        self.statusBar().showMessage("Calculando matriz de riesgo...", 3000)
+        task = RiskMatrixTask()
+        task.signals.finished.connect(self.on_risk_model)
+        task.signals.error.connect(self.on_risk_error)
+        self.thread_pool.start(task)
+
+    def on_risk_model(self, tickers, model):
+        self._risk_running = False
+        self.risk_model = model
+        self.risk_tickers = tickers
+        # Stored series can be a few hours behind the last watchlist refresh
+        model.update(self.risk_quotes())
+        memory.enforce()
+        if self.central_stack.currentIndex() == RISK_PAGE and self.risk_model is not None:
+            self.risk_view.set_model(model)
+
+    def on_risk_error(self, msg: str):
+        self._risk_running = False
+        self.statusBar().showMessage(msg, 3000)
+
+    def risk_quotes(self) -> dict:
+        return {
+            ticker: (row['day'], row['price'])
+            for ticker, row in self.watchlist_rows.items() if row is not None
+        }
+
+    def update_risk(self, tickers: list):
+        """New closes only touch the last row of the model, other tickers need a rebuild"""
+        if self.risk_model is None:
+            return
+        visible = self.central_stack.currentIndex() == RISK_PAGE
+        if set(tickers) != set(self.risk_tickers):
+            if visible:
+                self.build_risk_model()
+            else:
+                self.trim_risk(0)
+            return
+        if self.risk_model.update(self.risk_quotes()) and visible:
+            self.risk_view.set_model(self.risk_model)
+
+    def risk_nbytes(self) -> int:
+        return self.risk_model.nbytes() if self.risk_model is not None else 0
+
+    def trim_risk(self, target: int):
+        # May run on any thread, only the model is dropped here, the view follows on the GUI thread
+        if target < self.risk_nbytes():
+            self.risk_model = None
+            self.risk_trimmed.emit()
+
+    def load_alert_rules(self):
+        rules = []
+        for text in db.load_alert_rules():
+            try:
+                rules.append(parse_rule(text))
+            except ValueError:
+                db.delete_alert_rule(text)
+        self.alert_engine.set_rules(rules)
+
+    def get_alerts_view(self) -> AlertsView:
+        if self.alerts_view is None:
+            self.alerts_view = AlertsView(self)
+            self.alerts_view.rule_added.connect(self.on_alert_rule_added)
+            self.alerts_view.rule_removed.connect(self.on_alert_rule_removed)
+            self.alerts_view.set_rules([rule.text for rule in self.alert_engine.rules])
+        return self.alerts_view
+
+    def show_alerts_view(self):
+        self.get_alerts_view()
+        self.unseen_alerts = 0
+        self.alerts_button.setText("Alertas")
+        self.alerts_view.show()
+        self.alerts_view.raise_()
+
+    def on_alert_rule_added(self, text: str):
+        try:
+            rule = parse_rule(text)
+        except ValueError as e:
+            QMessageBox.warning(self.alerts_view, "Atención", str(e))
+            return
+        if self.alert_engine.add_rule(rule):
+            db.save_alert_rule(rule.text)
+        self.alerts_view.set_rules([r.text for r in self.alert_engine.rules])
+
+    def on_alert_rule_removed(self, text: str):
+        self.alert_engine.remove_rule(text)
+        db.delete_alert_rule(text)
+        self.alerts_view.set_rules([r.text for r in self.alert_engine.rules])
+
+    def on_alerts_fired(self, fired: list):
+        view = self.get_alerts_view()
+        view.add_alerts(fired)
+        if view.isVisible():
+            return
+
+        self.unseen_alerts += len(fired)
+        self.alerts_button.setText(f"Alertas ({self.unseen_alerts})")
+        self.statusBar().showMessage(f"{len(fired)} alertas nuevas: {fired[0]}", 5000)
+
+    def show_memory_view(self):
+        if self.memory_view is None:
+            self.memory_view = MemoryView(self)
+        self.memory_view.show()
+        self.memory_view.raise_()
+
     def closeEvent(self, event):
-        self.save_history()
+        # Let running requests and tasks queue their writes, then commit whatever is left
+        if self.api_server is not None:
+            self.api_server.stop()
+        self.thread_pool.waitForDone()
+        db.shutdown()
         return super().closeEvent(event)
 
 def main():
+    if memory.TRACE_AT_STARTUP:
+        memory.start_tracing()
     app = QApplication(sys.argv)
     app.setWindowIcon(QIcon("assets/logo.png"))
     apply_stylesheet(app, 'light_cyan_500.xml', invert_secondary=True)
@@ -474,6 +969,9 @@ def main():
         app.setStyleSheet(app.styleSheet() + f.read())
     w = MainWindow()
     w.show()
+    if api.PORT:
+        w.api_server = api.start_in_thread()
+        w.statusBar().showMessage(f"API local en http://{api.HOST}:{api.PORT}/", 5000)
     sys.exit(app.exec())
 
 
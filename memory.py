@@ -0,0 +1,114 @@
+import os
+import threading
+import tracemalloc
+
+# Bytes all registered caches may hold together before the least recently used entries go
+CACHE_LIMIT = int(float(os.getenv("DASHBOARD_CACHE_MB", "256")) * 1024 * 1024)
+
+# Set DASHBOARD_TRACEMALLOC=1 to trace allocations from startup (slower)
+TRACE_AT_STARTUP = os.getenv("DASHBOARD_TRACEMALLOC") == "1"
+
+# Source file -> subsystem, first match wins
+SUBSYSTEMS = (
+    ("Indicadores", ("indicadores.py", "backtest.py")),
+    ("Precios", ("bars.py", "storage.py", "pyarrow")),
+    ("Descargas", ("yfinance", "pandas", "requests", "curl_cffi", "urllib3", "json")),
+    ("Resúmenes", ("google", "genai", "httpx", "pydantic")),
+    ("Base de datos", ("db.py", "sqlalchemy", "sqlite3")),
+    ("Interfaz", ("main.py", "widgets.py", "symbols.py", "pyqtgraph", "PyQt6")),
+    ("NumPy", ("numpy",)),
+)
+
+
+class _Cache:
+    __slots__ = ("name", "nbytes", "trim")
+
+    def __init__(self, name, nbytes, trim):
+        self.name = name
+        self.nbytes = nbytes
+        self.trim = trim
+
+
+_caches = []
+_lock = threading.Lock()
+
+
+def register(name: str, nbytes, trim):
+    """
+    Adds a cache to the global budget.
+    nbytes() returns its current size, trim(target) drops least recently used
+    entries until it holds at most `target` bytes.
+    """
+    with _lock:
+        _caches.append(_Cache(name, nbytes, trim))
+
+
+def usage() -> dict:
+    """Bytes held by each registered cache"""
+    with _lock:
+        caches = list(_caches)
+    return {cache.name: cache.nbytes() for cache in caches}
+
+
+def enforce(limit: int | None = None):
+    """
+    Trims caches, largest first, until they fit the limit together.
+    Call it from the GUI thread only: some trims change Qt models.
+    """
+    limit = CACHE_LIMIT if limit is None else limit
+    with _lock:
+        caches = list(_caches)
+
+    sizes = {cache.name: cache.nbytes() for cache in caches}
+    total = sum(sizes.values())
+    for cache in sorted(caches, key=lambda c: sizes[c.name], reverse=True):
+        if total <= limit:
+            break
+        excess = total - limit
+        cache.trim(max(0, sizes[cache.name] - excess))
+        total -= sizes[cache.name] - cache.nbytes()
+
+
+def start_tracing():
+    if not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+
+def stop_tracing():
+    tracemalloc.stop()
+
+
+def is_tracing() -> bool:
+    return tracemalloc.is_tracing()
+
+
+def _subsystem(filename: str) -> str:
+    path = filename.replace("\\", "/")
+    for name, markers in SUBSYSTEMS:
+        if any(marker in path for marker in markers):
+            return name
+    return "Otros"
+
+
+def snapshot_by_subsystem() -> list[tuple[str, int, int]]:
+    """
+    (subsystem, bytes, blocks) for memory still allocated since tracing started,
+    attributed by the file that allocated it. Empty if tracing is off.
+    """
+    if not tracemalloc.is_tracing():
+        return []
+
+    snapshot = tracemalloc.take_snapshot().filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    ))
+    totals = {}
+    for stat in snapshot.statistics("filename"):
+        name = _subsystem(stat.traceback[0].filename)
+        size, count = totals.get(name, (0, 0))
+        totals[name] = (size + stat.size, count + stat.count)
+
+    return sorted(
+        ((name, size, count) for name, (size, count) in totals.items()),
+        key=lambda row: row[1], reverse=True
+    )
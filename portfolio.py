@@ -0,0 +1,221 @@
+import numpy as np
+
+from bars import align
+
+# Index the betas are measured against
+BENCHMARK = "^GSPC"
+
+# Daily returns in the covariance window, one trading year
+WINDOW = 252
+
+# Returns kept for the rolling correlation of a pair, the matrices only use the last WINDOW
+HISTORY = 3 * WINDOW
+
+# Pairs with fewer common returns in the window have no covariance
+MIN_OBSERVATIONS = 20
+
+TRADING_DAYS = 252
+
+# Incremental updates accumulate rounding error, the sums are rebuilt every so many new days
+REBUILD_EVERY = 64
+
+
+class RiskModel:
+    """
+    Daily log returns of many tickers on a common calendar, plus the sums the
+    covariance needs over the last WINDOW days. A new day adds one return row and
+    drops the oldest, so the sums are updated with outer products instead of
+    recomputing X^T X.
+    Missing returns (before a ticker listed, or while it had no data) are NaN and
+    each pair uses the days both have.
+    """
+
+    def __init__(self, tickers: list, keys: np.ndarray, prices: np.ndarray, benchmark: str | None = None):
+        # prices is (days, tickers), already aligned to keys
+        self.tickers = list(tickers)
+        self.index = {ticker: i for i, ticker in enumerate(self.tickers)}
+        self.benchmark = benchmark if benchmark in self.index else None
+        self.keys = np.asarray(keys)[-(HISTORY + 1):].copy()
+        self.prices = np.asarray(prices, dtype=np.float64)[-(HISTORY + 1):].copy()
+        with np.errstate(divide="ignore", invalid="ignore"):
+            self.returns = np.log(self.prices[1:] / self.prices[:-1])
+        self._recompute()
+
+    @classmethod
+    def build(cls, closes: dict, benchmark: str | None = BENCHMARK) -> "RiskModel":
+        """
+        closes: {ticker: (join keys, close)} of daily bars.
+        The benchmark's trading days are the calendar, every other ticker takes
+        its last close at or before each of them.
+        """
+        tickers = list(closes)
+        if benchmark in closes:
+            keys = closes[benchmark][0]
+        elif closes:
+            keys = np.unique(np.concatenate([k for k, _ in closes.values()]))
+        else:
+            keys = np.empty(0, dtype=np.int64)
+        keys = keys[-(HISTORY + 1):]
+
+        prices = np.empty((len(keys), len(tickers)))
+        for column, ticker in enumerate(tickers):
+            prices[:, column] = align(keys, *closes[ticker])
+        return cls(tickers, keys, prices, benchmark)
+
+    def __len__(self):
+        return len(self.tickers)
+
+    def nbytes(self) -> int:
+        matrices = (self.prices, self.returns, self._count, self._sum, self._products)
+        return sum(array.nbytes for array in matrices) + (self._cov.nbytes if self._cov is not None else 0)
+
+    def _window(self) -> np.ndarray:
+        return self.returns[-WINDOW:]
+
+    def _recompute(self):
+        """Sums over the whole window, also used to reset the rounding error"""
+        window = self._window()
+        present = np.isfinite(window).astype(np.float64)
+        values = np.where(present > 0, window, 0.0)
+        self._count = present.T @ present      # days with both returns
+        self._sum = values.T @ present         # [i, j]: sum of i's returns on those days
+        self._products = values.T @ values
+        self._since_rebuild = 0
+        self._cov = None
+
+    def _accumulate(self, row: np.ndarray, sign: float):
+        present = np.isfinite(row).astype(np.float64)
+        values = np.where(present > 0, row, 0.0)
+        self._count += sign * np.outer(present, present)
+        self._sum += sign * np.outer(values, present)
+        self._products += sign * np.outer(values, values)
+        self._cov = None
+
+    def update(self, quotes: dict) -> bool:
+        """
+        Applies the latest daily closes, {ticker: (join key, close)}.
+        A new benchmark day (or any new day without a benchmark) opens a row and
+        rolls the window, closes of the current day replace the last row.
+        Closes dated after the current day wait until the calendar reaches them.
+        Returns True if anything changed.
+        """
+        if len(self.keys) < 2:
+            return False
+
+        if self.benchmark is not None:
+            day = quotes.get(self.benchmark, (None, None))[0]
+        else:
+            day = max((key for key, _ in quotes.values()), default=None)
+
+        changed = False
+        if day is not None and day > self.keys[-1]:
+            self._append_day(day)
+            changed = True
+
+        last = self.prices[-1].copy()
+        for ticker, (key, close) in quotes.items():
+            column = self.index.get(ticker)
+            if column is not None and key == self.keys[-1] and np.isfinite(close):
+                last[column] = close
+        if np.array_equal(last, self.prices[-1], equal_nan=True):
+            return changed
+
+        self._accumulate(self.returns[-1], -1)
+        self.prices[-1] = last
+        with np.errstate(divide="ignore", invalid="ignore"):
+            self.returns[-1] = np.log(last / self.prices[-2])
+        self._accumulate(self.returns[-1], 1)
+        return True
+
+    def _append_day(self, day):
+        # Until their close arrives tickers keep the previous one, a zero return
+        if len(self.returns) >= WINDOW:
+            self._accumulate(self.returns[-WINDOW], -1)
+        self.keys = np.append(self.keys, day)[-(HISTORY + 1):]
+        self.prices = np.vstack((self.prices, self.prices[-1]))[-(HISTORY + 1):]
+        with np.errstate(invalid="ignore"):
+            row = self.prices[-1] - self.prices[-1]
+        self.returns = np.vstack((self.returns, row))[-HISTORY:]
+        self._accumulate(row, 1)
+
+        self._since_rebuild += 1
+        if self._since_rebuild >= REBUILD_EVERY:
+            self._recompute()
+
+    def covariance(self) -> np.ndarray:
+        """Daily covariance over the window, NaN for pairs with too few common days"""
+        if self._cov is None:
+            count = self._count
+            with np.errstate(divide="ignore", invalid="ignore"):
+                cov = (self._products - self._sum * self._sum.T / count) / (count - 1)
+            cov[count < MIN_OBSERVATIONS] = np.nan
+            self._cov = cov
+        return self._cov
+
+    def correlation(self) -> np.ndarray:
+        cov = self.covariance()
+        with np.errstate(divide="ignore", invalid="ignore"):
+            std = np.sqrt(np.diag(cov))
+            return np.clip(cov / np.outer(std, std), -1, 1)
+
+    def volatility(self) -> np.ndarray:
+        """Annualized volatility of each ticker"""
+        return np.sqrt(np.diag(self.covariance()) * TRADING_DAYS)
+
+    def betas(self) -> np.ndarray:
+        """Beta of each ticker against the benchmark, NaN without one"""
+        if self.benchmark is None:
+            return np.full(len(self.tickers), np.nan)
+        cov = self.covariance()
+        column = self.index[self.benchmark]
+        return cov[:, column] / cov[column, column]
+
+    def portfolio_volatility(self, weights: dict | None = None) -> float:
+        """
+        Annualized volatility of a portfolio, {ticker: weight}.
+        Defaults to equal weights over every ticker with data except the benchmark.
+        """
+        cov = self.covariance()
+        w = np.zeros(len(self.tickers))
+        if weights is None:
+            w[np.isfinite(np.diag(cov))] = 1.0
+            if self.benchmark is not None:
+                w[self.index[self.benchmark]] = 0.0
+        else:
+            for ticker, weight in weights.items():
+                if ticker in self.index:
+                    w[self.index[ticker]] = weight
+        if not w.any():
+            return float("nan")
+
+        w /= w.sum()
+        held = np.flatnonzero(w)
+        # Pairs without enough common history count as uncorrelated
+        sub = np.nan_to_num(cov[np.ix_(held, held)])
+        variance = w[held] @ sub @ w[held]
+        return float(np.sqrt(max(variance, 0.0) * TRADING_DAYS))
+
+    def rolling_correlation(self, first: str, second: str, window: int = 60):
+        """(keys, correlation) of a pair over the kept history, one value per day"""
+        x = self.returns[:, self.index[first]]
+        y = self.returns[:, self.index[second]]
+        both = np.isfinite(x) & np.isfinite(y)
+        x, y = np.where(both, x, 0.0), np.where(both, y, 0.0)
+
+        def rolling(values):
+            total = np.concatenate(([0.0], np.cumsum(values)))
+            return total[window:] - total[:-window]
+
+        if len(x) < window:
+            return self.keys[:0], np.empty(0)
+
+        n = rolling(both.astype(np.float64))
+        sx, sy = rolling(x), rolling(y)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            cov = rolling(x * y) - sx * sy / n
+            var_x = rolling(x * x) - sx * sx / n
+            var_y = rolling(y * y) - sy * sy / n
+            corr = np.clip(cov / np.sqrt(var_x * var_y), -1, 1)
+        corr[n < MIN_OBSERVATIONS] = np.nan
+        # returns[i] ends on keys[i + 1]
+        return self.keys[window:], corr
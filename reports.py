@@ -0,0 +1,347 @@
+import argparse
+import base64
+import html
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from datetime import datetime
+
+# Reports are rendered without a window, also on machines without a display
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import pyqtgraph.exporters
+from PyQt6.QtCore import QBuffer, QByteArray, QIODevice, QMarginsF, QUrl, QSizeF
+from PyQt6.QtGui import QImage, QPageLayout, QPageSize, QPainter, QPdfWriter, QTextDocument, QColor
+from PyQt6.QtWidgets import QApplication
+
+import db
+import indicadores
+import sentiment
+import storage
+import summaries
+from bars import join_keys
+from tasks import (
+    WATCHLIST_SIZE, chart_view, covers, fetch_news, history_days, history_start, load_or_download_many
+)
+from widgets import ChartWidget, STATUS_COLORS, DEFAULT_STATUS_COLOR, SENTIMENT_STATES, indicator_display
+
+# Morning reports of many tickers, rendered offscreen in parallel processes:
+#
+#   python reports.py AAPL MSFT NVDA --formats html,pdf
+#   python reports.py --watchlist --workers 8
+#
+# Prices come from the local store (missing series are downloaded together first),
+# news are fetched once by the main process and summaries come from the database.
+# Tickers without a recent summary get the template one.
+
+OUTPUT_DIR = "reports"
+FORMATS = ("html", "pdf", "png")
+
+# The chart shows a year of daily bars, with the indicator warm-up before it
+REPORT_HISTORY_DAYS = history_days('1y')
+
+# Pixels, the chart keeps its aspect ratio in every format
+CHART_SIZE = (1000, 420)
+PAGE_WIDTH = 1000
+
+TILE_COLUMNS = 4
+
+_app = None
+_chart = None
+
+
+# ---------- Worker process ----------
+
+def _init_worker():
+    global _app, _chart
+    _app = QApplication.instance() or QApplication(sys.argv[:1])
+    # One chart per process, redrawn for every ticker like the window does
+    _chart = ChartWidget()
+    # Shown on the offscreen platform, so the plot gets its real layout and size
+    _chart.plot.setParent(None)
+    _chart.plot.resize(*CHART_SIZE)
+    _chart.plot.show()
+    for name in ("SMA50", "SMA200"):
+        _chart.overlay_checks[name].setChecked(True)
+
+
+def _load_bars(ticker: str):
+    bars = storage.load_bars(ticker, '1d')
+    if bars is None:
+        # A stale copy is better than no report when the download failed
+        bars = storage.load_bars(ticker, '1d', max_age=0)
+    return bars
+
+
+def _chart_image(ticker: str, bars, series) -> QImage:
+    view = chart_view(bars, '1y')
+    series = {name: values[-len(view):] for name, values in series.items()}
+    _chart.update_data(view.dates(), view.close, ticker, '1y', series, join_keys(view, '1d'))
+    _app.processEvents()
+    return pyqtgraph.exporters.ImageExporter(_chart.plot.plotItem).export(toBytes=True)
+
+
+def _png_bytes(image: QImage) -> bytes:
+    data = QByteArray()
+    buffer = QBuffer(data)
+    buffer.open(QIODevice.OpenModeFlag.WriteOnly)
+    image.save(buffer, "PNG")
+    return bytes(data)
+
+
+def _color(state: str) -> str:
+    return STATUS_COLORS.get(state, DEFAULT_STATUS_COLOR)
+
+
+def _tiles(datos_indicadores: dict, news: list) -> list:
+    tiles = [(name, *indicator_display(name, data)) for name, data in datos_indicadores.items()]
+    result = sentiment.aggregate(news)
+    if result is not None:
+        score, positive, negative = result
+        tone = sentiment.label(score)
+        tiles.append(("Sentimiento", f"{score:+.2f}", SENTIMENT_STATES[tone],
+                      f"{tone} ({positive} pos. / {negative} neg.)"))
+    return tiles
+
+
+def report_html(ticker: str, bars, datos_indicadores: dict, news: list, summary: str,
+                summary_source: str, chart_src: str) -> str:
+    """The report as a single HTML page, chart_src is where the chart image is read from"""
+    close = bars.close
+    change = float(close[-1]) / float(close[-2]) - 1 if len(close) > 1 else float('nan')
+
+    cells = [
+        f'<td width="25%"><span style="color:{_color(state)}; font-size:16pt">&#9679;</span> '
+        f'<b>{html.escape(name)}</b><br>{html.escape(value)}<br>'
+        f'<span style="color:{_color(state)}">{html.escape(info)}</span></td>'
+        for name, value, state, info in _tiles(datos_indicadores, news)
+    ]
+    rows = "".join(
+        f"<tr>{''.join(cells[i:i + TILE_COLUMNS])}</tr>" for i in range(0, len(cells), TILE_COLUMNS)
+    )
+
+    paragraphs = "".join(f"<p>{html.escape(p)}</p>" for p in summary.split("\n") if p.strip())
+
+    items = []
+    for story in news:
+        state = SENTIMENT_STATES[sentiment.label(story.get('sentiment', 0.0))]
+        items.append(
+            f'<li><a href="{html.escape(story.get("link") or "")}">{html.escape(story.get("title") or "")}</a>'
+            f' <span style="color:#666">({html.escape(story.get("publisher") or "")})</span>'
+            f' <span style="color:{_color(state)}">{sentiment.label(story.get("sentiment", 0.0))}</span></li>'
+        )
+    news_html = f"<ul>{''.join(items)}</ul>" if items else "<p>No se encontraron noticias.</p>"
+
+    return (
+        "<html><head><meta charset=\"utf-8\">"
+        f"<title>{html.escape(ticker)}</title></head>"
+        f'<body style="font-family:sans-serif; max-width:{PAGE_WIDTH}px">'
+        f"<h1>{html.escape(ticker)}</h1>"
+        f'<p style="color:#666">{datetime.now():%d/%m/%Y %H:%M} &middot; '
+        f"Último cierre: {float(close[-1]):.2f} ({change:+.2%})</p>"
+        f'<img src="{chart_src}" width="{CHART_SIZE[0]}">'
+        f"<h2>Indicadores</h2><table width=\"100%\" cellpadding=\"6\">{rows}</table>"
+        f"<h2>Resumen</h2>{paragraphs}"
+        f'<p style="color:#666"><i>{html.escape(summary_source)}</i></p>'
+        f"<h2>Noticias</h2>{news_html}"
+        "</body></html>"
+    )
+
+
+def _document(page: str, chart: QImage) -> QTextDocument:
+    document = QTextDocument()
+    document.addResource(QTextDocument.ResourceType.ImageResource, QUrl("chart.png"), chart)
+    document.setHtml(page)
+    document.setTextWidth(PAGE_WIDTH)
+    return document
+
+
+def _write_png(document: QTextDocument, path: str):
+    size = document.size().toSize()
+    image = QImage(size, QImage.Format.Format_RGB32)
+    image.fill(QColor("white"))
+    painter = QPainter(image)
+    document.drawContents(painter)
+    painter.end()
+    image.save(path, "PNG")
+
+
+def _write_pdf(document: QTextDocument, path: str):
+    writer = QPdfWriter(path)
+    writer.setPageSize(QPageSize(QPageSize.PageSizeId.A4))
+    writer.setPageMargins(QMarginsF(12, 12, 12, 12), QPageLayout.Unit.Millimeter)
+    # Scales the page width in pixels to the printable width
+    writer.setResolution(int(PAGE_WIDTH / writer.pageLayout().paintRect(QPageLayout.Unit.Inch).width()))
+    document.setPageSize(QSizeF(writer.width(), writer.height()))
+    document.print(writer)
+
+
+def render_report(ticker: str, summary: str | None, news: list, formats: list, out_dir: str) -> dict:
+    """
+    Renders one ticker's report, runs in a worker process.
+    News come fetched by the main process, workers never touch the network.
+    Returns the written files and the seconds spent on each stage, or the error.
+    """
+    timings = {}
+    start = time.perf_counter()
+    try:
+        bars = _load_bars(ticker)
+        if bars is None or len(bars) < 2:
+            return {"ticker": ticker, "error": "sin datos de precios"}
+        series = indicadores.calcular_series(bars)
+        datos_indicadores = indicadores.calcular_indicadores(bars, series)
+        timings["datos"] = time.perf_counter() - start
+
+        if summary is not None:
+            source = "Resumen guardado."
+        else:
+            summary = summaries.FALLBACK.summarize(ticker, news, datos_indicadores)
+            source = "Resumen local, no había un resumen reciente guardado."
+
+        mark = time.perf_counter()
+        chart = _chart_image(ticker, bars, series)
+        timings["gráfico"] = time.perf_counter() - mark
+
+        mark = time.perf_counter()
+        base = os.path.join(out_dir, ticker.upper().replace("/", "_").replace("\\", "_"))
+        files = []
+        if "html" in formats:
+            # The page carries its own chart so it can be mailed as a single file
+            src = "data:image/png;base64," + base64.b64encode(_png_bytes(chart)).decode()
+            page = report_html(ticker, bars, datos_indicadores, news, summary, source, src)
+            with open(f"{base}.html", "w", encoding="utf-8") as f:
+                f.write(page)
+            files.append(f"{base}.html")
+        if "pdf" in formats or "png" in formats:
+            document = _document(
+                report_html(ticker, bars, datos_indicadores, news, summary, source, "chart.png"), chart
+            )
+            if "png" in formats:
+                _write_png(document, f"{base}.png")
+                files.append(f"{base}.png")
+            if "pdf" in formats:
+                _write_pdf(document, f"{base}.pdf")
+                files.append(f"{base}.pdf")
+        timings["documentos"] = time.perf_counter() - mark
+
+    except Exception as e:
+        return {"ticker": ticker, "error": str(e)}
+
+    timings["total"] = time.perf_counter() - start
+    return {"ticker": ticker, "files": files, "timings": timings}
+
+
+# ---------- Main process ----------
+
+# News requests in flight at once while preparing
+NEWS_WORKERS = 8
+
+
+def prefetch_news(tickers: list) -> dict:
+    """
+    {ticker: stories} fetched here once, through the guard, so render processes
+    don't each hit the network. A ticker whose feed fails goes out without news.
+    """
+    def fetch(ticker):
+        try:
+            return fetch_news(ticker)
+        except Exception:
+            return []
+
+    with ThreadPoolExecutor(NEWS_WORKERS) as pool:
+        return dict(zip(tickers, pool.map(fetch, tickers)))
+
+
+def prefetch(tickers: list) -> list:
+    """
+    Downloads what the stored series lack for the report chart (a year plus the warm-up),
+    one request per kind of span for all the tickers. Returns the tickers that needed it.
+    """
+    start = history_start(REPORT_HISTORY_DAYS)
+    missing = [
+        ticker for ticker in tickers
+        if storage.load_bars(ticker, '1d') is None or not covers(storage.coverage(ticker, '1d'), start)
+    ]
+    if missing:
+        load_or_download_many(missing, '1d', REPORT_HISTORY_DAYS)
+    return missing
+
+
+def generate(tickers: list, formats=FORMATS, out_dir: str = OUTPUT_DIR, workers: int | None = None) -> list:
+    """Renders the reports of every ticker, printing progress and throughput. Returns the results"""
+    workers = workers or os.cpu_count() or 1
+    os.makedirs(out_dir, exist_ok=True)
+    start = time.perf_counter()
+
+    downloaded = prefetch(tickers)
+    news = prefetch_news(tickers)
+    cached = db.load_summaries(tickers, summaries.MAX_AGE)
+    prepared = time.perf_counter() - start
+
+    results = []
+    # spawn, a forked Qt application is not safe to use
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(workers, mp_context=context, initializer=_init_worker) as pool:
+        futures = [
+            pool.submit(render_report, ticker, cached.get(ticker), news[ticker], list(formats), out_dir)
+            for ticker in tickers
+        ]
+        for done, future in enumerate(as_completed(futures), start=1):
+            result = future.result()
+            results.append(result)
+            if "error" in result:
+                print(f"[{done}/{len(tickers)}] {result['ticker']}: error, {result['error']}")
+            else:
+                print(f"[{done}/{len(tickers)}] {result['ticker']}: {result['timings']['total']:.2f} s")
+
+    elapsed = time.perf_counter() - start
+    _print_throughput(results, elapsed, prepared, workers, len(downloaded), len(cached))
+    return results
+
+
+def _print_throughput(results: list, elapsed: float, prepared: float, workers: int, downloaded: int, cached: int):
+    ok = [r for r in results if "error" not in r]
+    files = sum(len(r["files"]) for r in ok)
+    print()
+    print(f"{len(ok)} de {len(results)} informes ({files} archivos) en {elapsed:.1f} s con {workers} procesos")
+    if elapsed > 0:
+        print(f"Rendimiento: {len(ok) / elapsed:.2f} informes/s ({len(ok) / elapsed * 60:.0f} por minuto)")
+    print(f"Preparación (precios y noticias): {prepared:.2f} s, {downloaded} series descargadas, {cached} resúmenes guardados")
+    if ok:
+        stages = ok[0]["timings"].keys()
+        means = ", ".join(f"{stage} {sum(r['timings'][stage] for r in ok) / len(ok):.2f} s" for stage in stages)
+        print(f"Tiempo medio por informe: {means}")
+    for r in results:
+        if "error" in r:
+            print(f"  {r['ticker']}: {r['error']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Genera informes de varios tickers sin abrir la ventana")
+    parser.add_argument("tickers", nargs="*", help="tickers a incluir")
+    parser.add_argument("--watchlist", action="store_true", help="incluir los tickers del historial")
+    parser.add_argument("--formats", default="html,pdf,png", help="formatos separados por coma: html, pdf, png")
+    parser.add_argument("--out", default=OUTPUT_DIR, help="carpeta de salida")
+    parser.add_argument("--workers", type=int, default=None, help="procesos en paralelo, por defecto uno por núcleo")
+    args = parser.parse_args()
+
+    formats = [f.strip().lower() for f in args.formats.split(",") if f.strip()]
+    unknown = [f for f in formats if f not in FORMATS]
+    if unknown or not formats:
+        parser.error(f"Formatos desconocidos: {', '.join(unknown) or '(ninguno)'}")
+
+    db.init_db()
+    tickers = [t.upper() for t in args.tickers]
+    if args.watchlist:
+        tickers += [t for t, _ in db.load_history(WATCHLIST_SIZE) if t not in tickers]
+    if not tickers:
+        parser.error("Indicá al menos un ticker o --watchlist")
+
+    generate(list(dict.fromkeys(tickers)), formats, args.out, args.workers)
+    db.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+import re
+
+import numpy as np
+
+# Compact financial lexicon: word -> weight. Based on the kind of terms in the
+# Loughran-McDonald lists, plus their common Spanish counterparts.
+LEXICON = {
+    # Positive
+    "beat": 1, "beats": 1, "surge": 1, "surges": 1, "surged": 1, "soar": 1, "soars": 1, "soared": 1,
+    "jump": 1, "jumps": 1, "jumped": 1, "rally": 1, "rallies": 1, "rallied": 1, "gain": 1, "gains": 1,
+    "gained": 1, "rise": 1, "rises": 1, "rising": 1, "rose": 1, "climb": 1, "climbs": 1, "climbed": 1,
+    "record": 1, "growth": 1, "grow": 1, "grows": 1, "profit": 1, "profits": 1, "profitable": 1,
+    "strong": 1, "stronger": 1, "strength": 1, "upgrade": 2, "upgrades": 2, "upgraded": 2,
+    "outperform": 2, "outperforms": 2, "bullish": 2, "buy": 1, "boost": 1, "boosts": 1, "boosted": 1,
+    "optimistic": 1, "optimism": 1, "positive": 1, "exceed": 1, "exceeds": 1, "exceeded": 1,
+    "improve": 1, "improves": 1, "improved": 1, "improvement": 1, "innovation": 1, "innovative": 1,
+    "success": 1, "successful": 1, "win": 1, "wins": 1, "won": 1, "raise": 1, "raises": 1,
+    "dividend": 1, "buyback": 1, "expand": 1, "expands": 1, "expansion": 1, "lift": 1, "lifts": 1,
+    "recovery": 1, "rebound": 1, "rebounds": 1, "opportunity": 1, "opportunities": 1, "favorable": 1,
+    "sube": 1, "suben": 1, "subió": 1, "alza": 1, "ganancia": 1, "ganancias": 1, "crecimiento": 1,
+    "récord": 1, "mejora": 1, "fuerte": 1, "supera": 1, "superó": 1, "optimismo": 1, "recupera": 1,
+    # Negative
+    "miss": -1, "misses": -1, "missed": -1, "fall": -1, "falls": -1, "fell": -1, "drop": -1,
+    "drops": -1, "dropped": -1, "plunge": -2, "plunges": -2, "plunged": -2, "slump": -2, "slumps": -1,
+    "tumble": -2, "tumbles": -2, "tumbled": -2, "decline": -1, "declines": -1, "declined": -1,
+    "loss": -1, "losses": -1, "lose": -1, "loses": -1, "weak": -1, "weaker": -1, "weakness": -1,
+    "downgrade": -2, "downgrades": -2, "downgraded": -2, "underperform": -2, "bearish": -2,
+    "sell": -1, "selloff": -2, "cut": -1, "cuts": -1, "layoff": -1, "layoffs": -1, "lawsuit": -1,
+    "probe": -1, "investigation": -1, "fined": -1, "recall": -1, "risk": -1, "risks": -1,
+    "concern": -1, "concerns": -1, "worry": -1, "worries": -1, "fear": -1, "fears": -1,
+    "warning": -1, "warns": -1, "warned": -1, "crisis": -2, "bankruptcy": -2, "default": -2,
+    "fraud": -2, "slowdown": -1, "slow": -1, "slows": -1, "pressure": -1, "headwinds": -1,
+    "criticism": -1, "slams": -1, "disappoint": -1, "disappoints": -1, "disappointing": -1,
+    "volatile": -1, "uncertainty": -1, "tariff": -1, "tariffs": -1, "delay": -1, "delays": -1,
+    "baja": -1, "bajan": -1, "cae": -1, "caen": -1, "cayó": -1, "caída": -1, "pérdida": -1,
+    "pérdidas": -1, "débil": -1, "riesgo": -1, "preocupación": -1, "temor": -1,
+    "recorte": -1, "despidos": -1, "quiebra": -2,
+}
+
+# A negator up to this many words before a lexicon word flips its sign
+NEGATORS = frozenset(("not", "no", "never", "without", "nor", "isn't", "wasn't", "don't", "doesn't",
+                      "didn't", "won't", "can't", "sin", "nunca", "tampoco"))
+NEGATION_WINDOW = 3
+
+# Scores beyond these are shown as positive / negative
+THRESHOLD = 0.2
+
+# The NUL character separates the stories joined for tokenizing
+_WORD = re.compile(r"\x00|[a-záéíóúñü]+(?:'[a-z]+)?")
+_TERMS = {word: i for i, word in enumerate(LEXICON)}
+_WEIGHTS = np.array(list(LEXICON.values()), dtype=np.float64)
+
+
+def score_texts(texts: list) -> np.ndarray:
+    """
+    Sentiment of each text in [-1, 1]: (positive - negative) / (positive + negative + 1)
+    over the lexicon weights, with negated words flipped.
+    All texts are tokenized in one pass and scored with bincount over the matches.
+    """
+    if not texts:
+        return np.empty(0)
+
+    tokens = _WORD.findall("\x00".join(text.replace("\x00", " ") for text in texts).lower())
+    story = np.cumsum(np.fromiter((t == "\x00" for t in tokens), dtype=bool, count=len(tokens)))
+    terms = np.fromiter(
+        (_TERMS.get(t, -1) for t in tokens), dtype=np.int64, count=len(tokens)
+    )
+    negator = np.fromiter((t in NEGATORS for t in tokens), dtype=bool, count=len(tokens))
+
+    hits = np.flatnonzero(terms >= 0)
+    weights = _WEIGHTS[terms[hits]]
+
+    # Negated if a negator of the same story sits in the window before the word
+    negated = np.zeros(len(hits), dtype=bool)
+    for offset in range(1, NEGATION_WINDOW + 1):
+        before = hits - offset
+        valid = before >= 0
+        negated[valid] |= negator[before[valid]] & (story[before[valid]] == story[hits[valid]])
+    weights = np.where(negated, -weights, weights)
+
+    rows = story[hits]
+    positive = np.bincount(rows, np.maximum(weights, 0), minlength=len(texts))
+    negative = np.bincount(rows, np.maximum(-weights, 0), minlength=len(texts))
+    return (positive - negative) / (positive + negative + 1)
+
+
+def story_text(story: dict) -> str:
+    return f"{story.get('title') or ''}. {story.get('summary') or ''}"
+
+
+def score_news(news: list) -> list:
+    """Adds a 'sentiment' score to each story dict, returns the same list"""
+    for story, score in zip(news, score_texts([story_text(s) for s in news])):
+        story["sentiment"] = float(score)
+    return news
+
+
+def label(score: float) -> str:
+    if score > THRESHOLD:
+        return "Positivo"
+    if score < -THRESHOLD:
+        return "Negativo"
+    return "Neutral"
+
+
+def aggregate(news: list):
+    """
+    (mean score, positive stories, negative stories) of a ticker's feed,
+    None without stories. Stories missing a score are scored on the fly.
+    """
+    if not news:
+        return None
+    missing = [story for story in news if "sentiment" not in story]
+    if missing:
+        score_news(missing)
+    scores = np.array([story["sentiment"] for story in news])
+    return float(scores.mean()), int((scores > THRESHOLD).sum()), int((scores < -THRESHOLD).sum())
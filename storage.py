@@ -0,0 +1,135 @@
+import logging
+import os
+import time
+import uuid
+
+import pyarrow as pa
+import pyarrow.ipc as ipc
+
+from bars import BarSeries, FIELDS
+
+# Local columnar store for downloaded price history.
+# Each ticker/interval pair lives in its own uncompressed Arrow IPC file so
+# it can be memory-mapped back without copying the column buffers.
+
+DATA_DIR = os.getenv("DASHBOARD_DATA_DIR", "data")
+
+# How long a stored series is considered fresh, in seconds
+MAX_AGE = {
+    "5m": 5 * 60,
+    "1h": 60 * 60,
+    "1d": 12 * 60 * 60,
+    "1mo": 24 * 60 * 60,
+}
+
+# Files written before series were normalized lack this version and are downloaded again
+VERSION = "2"
+
+# Tries at replacing a file a reader still has mapped, and seconds between them
+REPLACE_ATTEMPTS = 5
+REPLACE_DELAY = 0.05
+
+log = logging.getLogger(__name__)
+
+SCHEMA = pa.schema(
+    [pa.field("timestamp", pa.int64())] +
+    [pa.field(name, pa.float64()) for name in FIELDS]
+)
+
+
+def _path(ticker: str, interval: str) -> str:
+    safe = ticker.upper().replace("/", "_").replace("\\", "_")
+    return os.path.join(DATA_DIR, interval, f"{safe}.arrow")
+
+
+def save_bars(ticker: str, interval: str, bars: BarSeries, start: int = 0) -> bool:
+    """
+    Writes a series to the store, replacing the previous file.
+    start: UTC nanoseconds the download covered from, 0 for the whole download period of the interval
+    Returns False (and logs it) if the previous file could not be replaced, the caller's
+    bars are still good but the next load will download them again.
+    """
+    arrays = [pa.array(bars.timestamps, type=pa.int64())]
+    arrays += [pa.array(getattr(bars, name), type=pa.float64()) for name in FIELDS]
+
+    # Timestamps are stored as UTC nanoseconds, the original zone goes in the metadata
+    schema = SCHEMA.with_metadata({"tz": bars.tz, "version": VERSION, "start": str(int(start))})
+    table = pa.Table.from_arrays(arrays, schema=schema)
+
+    path = _path(ticker, interval)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    # Write to a temp file first so readers never see a half written file
+    tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+    with pa.OSFile(tmp, "wb") as sink:
+        with ipc.new_file(sink, schema) as writer:
+            writer.write_table(table)
+    # On Windows the old file can't be replaced while a reader has it mapped,
+    # those maps are usually short lived
+    for attempt in range(REPLACE_ATTEMPTS):
+        try:
+            os.replace(tmp, path)
+            return True
+        except OSError as e:
+            error = e
+            time.sleep(REPLACE_DELAY * 2 ** attempt)
+    os.remove(tmp)
+    log.warning("No se pudo guardar %s %s: %s", ticker, interval, error)
+    return False
+
+
+def load_bars(ticker: str, interval: str, max_age: float | None = None):
+    """
+    Reads a stored series back memory-mapped, the arrays are views over the file.
+    Returns None if there is no file or it is older than max_age seconds.
+    """
+    path = _path(ticker, interval)
+    if not os.path.exists(path):
+        return None
+
+    if max_age is None:
+        max_age = MAX_AGE.get(interval, 0)
+    if max_age and time.time() - os.path.getmtime(path) > max_age:
+        return None
+
+    source = pa.memory_map(path, "r")
+    table = ipc.open_file(source).read_all().combine_chunks()
+    metadata = table.schema.metadata or {}
+    tz = metadata.get(b"tz", b"").decode()
+
+    if table.schema.names != SCHEMA.names or metadata.get(b"version", b"").decode() != VERSION:
+        return None  # written by an older version, download again
+
+    columns = [
+        table.column(name).to_numpy(zero_copy_only=False)
+        for name in ("timestamp",) + FIELDS
+    ]
+    return BarSeries(*columns, tz=tz)
+
+
+def coverage(ticker: str, interval: str):
+    """
+    (start, age) of a stored series: the UTC nanoseconds its downloads cover from (0 for the
+    whole download period) and the seconds since it was written. None if there is no file
+    or load_bars would reject it as written by an older version. Only the schema is read.
+    """
+    path = _path(ticker, interval)
+    try:
+        age = time.time() - os.path.getmtime(path)
+        with pa.memory_map(path, "r") as source:
+            schema = ipc.open_file(source).schema
+    except (OSError, pa.ArrowInvalid):
+        return None
+    metadata = schema.metadata or {}
+    if schema.names != SCHEMA.names or metadata.get(b"version", b"").decode() != VERSION:
+        return None
+    # Files written before the start was recorded held the whole period
+    return int(metadata.get(b"start", b"0") or 0), age
+
+
+def stored_tickers(interval: str) -> list[str]:
+    """Tickers that have a stored series for the interval, in any freshness"""
+    folder = os.path.join(DATA_DIR, interval)
+    if not os.path.isdir(folder):
+        return []
+    return sorted(name[:-len(".arrow")] for name in os.listdir(folder) if name.endswith(".arrow"))
@@ -0,0 +1,335 @@
+import http.client
+import json
+import os
+from abc import ABC, abstractmethod
+from urllib.parse import urlsplit
+
+from dotenv import load_dotenv
+from google import genai
+from google.genai import types
+
+from backoff import guard, FetchBlocked
+import indicadores as registro
+import keypoints
+import sentiment
+
+MODEL = "gemini-2.5-flash"
+
+# Summarizer used unless a task asks for another one: gemini, template or http
+BACKEND = os.getenv("DASHBOARD_SUMMARIZER", "gemini")
+
+# Backends tried in order when the chosen one fails, comma separated. The template answers last
+FALLBACKS = [
+    name.strip() for name in os.getenv("DASHBOARD_SUMMARIZER_FALLBACKS", "").split(",") if name.strip()
+]
+
+# Local stand-in for the LLM, see summary_server.py
+HTTP_URL = os.getenv("DASHBOARD_SUMMARIZER_URL", "http://127.0.0.1:8765/summarize")
+
+# Seconds to reach a backend and to wait for its answer before the next one is tried.
+# A ticker's summary keeps a spinner up, batches run in the background and may take longer
+CONNECT_TIMEOUT = 3
+READ_TIMEOUT = 20
+BATCH_READ_TIMEOUT = 60
+
+# Tickers packed in one request. The free tier allows 250 requests a day,
+# a 100 ticker watchlist takes 10 (plus a retry for any ticker missing from a reply)
+BATCH_SIZE = 10
+
+# The free tier allows 10 requests a minute
+MIN_REQUEST_INTERVAL = 6.5
+
+# Summaries younger than this are shown instead of asking again, in seconds
+MAX_AGE = 12 * 60 * 60
+
+INSTRUCTIONS = (
+    "1. Resumen general: Describe brevemente el activo, y la situación actual del activo.\n"
+    "2. Análisis de noticias: Explica qué temas predominan en las noticias recientes y cómo se relacionan con el sentimiento indicado, sin volver a clasificarlo.\n"
+    "3. Análisis de indicadores: Interpreta brevemente los indicadores técnicos y sugiere qué podrían implicar para el comportamiento futuro del activo. No hagas referencia al estado de los indicadores como 'good' 'bad' 'neutro' o 'ninguno'.\n\n"
+    "Evita redundancias, no uses negritas, sé directo y mantén cada parte en uno o dos párrafos como máximo.\n\n"
+)
+
+
+def _context(news, indicadores) -> str:
+    # The most representative sentences across the stories instead of every summary
+    news_text = "\n".join(f"- {point['sentence']}" for point in keypoints.key_sentences(news))
+    indicators_text = "\n".join(_indicator_line(name, data) for name, data in indicadores.items())
+    return (
+        "--- NOTICIAS ---\n"
+        f"{news_text}"
+        f"\n\n--- SENTIMIENTO ---\n{_sentiment_text(news)}"
+        "\n\n--- INDICADORES ---\n"
+        f"{indicators_text}"
+    )
+
+
+def _indicator_line(name: str, data) -> str:
+    # data is (valores..., estado, info), the registry knows how to show the values
+    indicador = registro.REGISTRO.get(name)
+    label = f"{name} ({indicador.descripcion})" if indicador is not None else name
+    return f"- {label}: {registro.mostrar(name, data)}, {data[-1]}"
+
+
+def _sentiment_text(news) -> str:
+    # Scored locally, the model only has to explain it
+    result = sentiment.aggregate(news)
+    if result is None:
+        return "Sin noticias."
+    score, positive, negative = result
+    return (
+        f"{sentiment.label(score)} (puntaje {score:+.2f} entre -1 y 1): {positive} noticias positivas, "
+        f"{negative} negativas y {len(news) - positive - negative} neutrales."
+    )
+
+
+def ticker_prompt(ticker: str, news, indicadores) -> str:
+    return (
+        f"Analiza la siguiente información relacionada con {ticker} y genera un texto estructurado en tres partes separadas por saltos de línea:\n\n"
+        f"{INSTRUCTIONS}"
+        f"{_context(news, indicadores)}"
+    )
+
+
+def batch_prompt(items: dict) -> str:
+    """items: {ticker: (news, indicadores)}"""
+    blocks = "\n\n".join(
+        f"===== {ticker} =====\n{_context(news, indicadores)}"
+        for ticker, (news, indicadores) in items.items()
+    )
+    return (
+        f"Analiza por separado la información de cada uno de estos activos: {', '.join(items)}.\n"
+        "Para cada uno genera un texto estructurado en tres partes separadas por saltos de línea:\n\n"
+        f"{INSTRUCTIONS}"
+        "No mezcles información entre activos. Responde solo con un objeto JSON cuyas claves son "
+        "exactamente los tickers indicados y cuyos valores son el texto de cada uno.\n\n"
+        f"{blocks}"
+    )
+
+
+def batch_config(tickers) -> types.GenerateContentConfig:
+    """Asks for a JSON object with one string per ticker"""
+    return types.GenerateContentConfig(
+        response_mime_type="application/json",
+        response_schema=types.Schema(
+            type=types.Type.OBJECT,
+            properties={ticker: types.Schema(type=types.Type.STRING) for ticker in tickers},
+            required=list(tickers),
+        ),
+    )
+
+
+def parse_batch(text: str, tickers) -> dict:
+    """
+    {ticker: summary} for the requested tickers found in a batch reply.
+    Unknown keys and empty summaries are dropped, raises ValueError if the reply isn't a JSON object.
+    """
+    text = (text or "").strip()
+    # Without the schema some replies come wrapped in a markdown block
+    if text.startswith("```"):
+        text = text.strip("`").removeprefix("json").strip()
+    try:
+        reply = json.loads(text)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Respuesta no válida: {e}") from e
+    if not isinstance(reply, dict):
+        raise ValueError("La respuesta no es un objeto JSON")
+
+    requested = {ticker.upper(): ticker for ticker in tickers}
+    summaries = {}
+    for key, value in reply.items():
+        ticker = requested.get(str(key).strip().upper())
+        if ticker is not None and isinstance(value, str) and value.strip():
+            summaries[ticker] = value.strip()
+    return summaries
+
+
+# ---------- Backends ----------
+
+class Summarizer(ABC):
+    """
+    Turns news and indicator results into summaries.
+    summarize_batch gets {ticker: (news, indicadores)} and returns {ticker: summary},
+    tickers missing from the result may be asked again.
+    """
+    name = ""
+    # Seconds between batch requests, to stay within the backend's rate limits
+    min_interval = 0.0
+
+    @abstractmethod
+    def summarize(self, ticker: str, news, indicadores) -> str:
+        ...
+
+    def summarize_batch(self, items: dict) -> dict:
+        return {ticker: self.summarize(ticker, *item) for ticker, item in items.items()}
+
+
+class GeminiSummarizer(Summarizer):
+    name = "gemini"
+    min_interval = MIN_REQUEST_INTERVAL
+
+    def __init__(self):
+        self._client = None
+
+    @property
+    def client(self) -> genai.Client:
+        # Created on first use so a missing API key fails inside the call, not in the constructor
+        if self._client is None:
+            load_dotenv()
+            # The SDK takes a single timeout for connecting and answering
+            self._client = genai.Client(
+                api_key=os.getenv('GEMINI_API_KEY'),
+                http_options=types.HttpOptions(timeout=(CONNECT_TIMEOUT + READ_TIMEOUT) * 1000)
+            )
+        return self._client
+
+    def summarize(self, ticker: str, news, indicadores) -> str:
+        summary = self.client.models.generate_content(
+            model=MODEL, contents=ticker_prompt(ticker, news, indicadores)
+        )
+        if not summary or not summary.text:
+            raise ValueError(f"No se pudo generar un resumen para {ticker}. ")
+        return summary.text
+
+    def summarize_batch(self, items: dict) -> dict:
+        config = batch_config(list(items))
+        config.http_options = types.HttpOptions(timeout=(CONNECT_TIMEOUT + BATCH_READ_TIMEOUT) * 1000)
+        response = self.client.models.generate_content(
+            model=MODEL, contents=batch_prompt(items), config=config
+        )
+        try:
+            return parse_batch(response.text, list(items))
+        except ValueError:
+            return {}
+
+
+class TemplateSummarizer(Summarizer):
+    """Deterministic summary from the indicator states and news titles, needs no network"""
+    name = "template"
+
+    MAX_TITLES = 3
+
+    def summarize(self, ticker: str, news, indicadores) -> str:
+        # Indicator tuples end with (estado, info)
+        states = {name: (data[-2], data[-1]) for name, data in indicadores.items()}
+        good = [name for name, (state, _) in states.items() if state == "good"]
+        bad = [name for name, (state, _) in states.items() if state == "bad"]
+
+        if len(good) > len(bad):
+            tone = "mayormente favorable"
+        elif len(bad) > len(good):
+            tone = "mayormente desfavorable"
+        else:
+            tone = "mixto"
+        general = (
+            f"Resumen general: {ticker} muestra un panorama técnico {tone}: "
+            f"{len(good)} de {len(states)} indicadores en zona favorable y {len(bad)} en zona desfavorable."
+        )
+
+        titles = [n["title"] for n in news if n.get("title")][:self.MAX_TITLES]
+        if titles:
+            publishers = {n["publisher"] for n in news if n.get("publisher")}
+            noticias = (
+                f"Análisis de noticias: {len(news)} noticias recientes de {len(publishers) or 1} "
+                f"{'medio' if len(publishers) <= 1 else 'medios'}. Titulares destacados: "
+                + "; ".join(titles) + f". Sentimiento: {_sentiment_text(news)}"
+            )
+        else:
+            noticias = "Análisis de noticias: no hay noticias recientes."
+
+        detalle = ", ".join(f"{name} {info.lower()}" for name, (_, info) in states.items())
+        indicadores_text = f"Análisis de indicadores: {detalle}." if detalle else \
+            "Análisis de indicadores: sin datos suficientes."
+
+        return "\n\n".join((general, noticias, indicadores_text))
+
+
+class HttpSummarizer(Summarizer):
+    """
+    Posts {"items": {ticker: {"news", "indicadores"}}} to a local service that answers
+    {"summaries": {ticker: text}}, used to test throughput without spending quota.
+    """
+    name = "http"
+
+    def __init__(self, url: str | None = None):
+        self.url = url or HTTP_URL
+
+    def summarize(self, ticker: str, news, indicadores) -> str:
+        summary = self._post({ticker: (news, indicadores)}, READ_TIMEOUT).get(ticker)
+        if not summary:
+            raise ValueError(f"No se pudo generar un resumen para {ticker}. ")
+        return summary
+
+    def summarize_batch(self, items: dict) -> dict:
+        return self._post(items, BATCH_READ_TIMEOUT)
+
+    def _post(self, items: dict, read_timeout: float) -> dict:
+        body = json.dumps({"items": {
+            ticker: {"news": news, "indicadores": indicadores}
+            for ticker, (news, indicadores) in items.items()
+        }}).encode()
+        url = urlsplit(self.url)
+        connection_class = http.client.HTTPSConnection if url.scheme == "https" else http.client.HTTPConnection
+        # A service that isn't running fails fast, a slow answer gets the read timeout
+        connection = connection_class(url.hostname, url.port, timeout=CONNECT_TIMEOUT)
+        try:
+            connection.connect()
+            connection.sock.settimeout(read_timeout)
+            connection.request("POST", url.path or "/", body, {"Content-Type": "application/json"})
+            response = connection.getresponse()
+            if response.status != 200:
+                raise ValueError(f"El servicio respondió {response.status} {response.reason}")
+            reply = json.load(response)
+        finally:
+            connection.close()
+        return parse_batch(json.dumps(reply.get("summaries", {})), list(items))
+
+
+BACKENDS = {
+    "gemini": GeminiSummarizer,
+    "template": TemplateSummarizer,
+    "http": HttpSummarizer,
+}
+
+FALLBACK = TemplateSummarizer()
+
+
+def backend(name: str | None = None) -> Summarizer:
+    name = name or BACKEND
+    if name not in BACKENDS:
+        raise ValueError(f"Resumidor desconocido: {name}")
+    return BACKENDS[name]()
+
+
+def _call(summarizer: Summarizer, method: str, *args):
+    """
+    Calls the backend unless it is backing off. Any failure (quota, timeout, no API key)
+    backs it off through the shared guard and the next backend in FALLBACKS is tried,
+    the template answers when none of them can.
+    Returns (result, name of the backend that produced it).
+    """
+    chain = [summarizer] + [backend(name) for name in FALLBACKS if name != summarizer.name]
+    for candidate in chain:
+        if isinstance(candidate, TemplateSummarizer):
+            break
+        try:
+            guard.check(candidate.name, 'summaries')
+            result = getattr(candidate, method)(*args)
+        except FetchBlocked:
+            continue
+        except Exception:
+            # The caller reports the backend that answered, the guard keeps the failures
+            guard.record_failure(candidate.name, 'summaries')
+            continue
+        guard.record_success(candidate.name, 'summaries')
+        return result, candidate.name
+    return getattr(FALLBACK, method)(*args), FALLBACK.name
+
+
+def summarize(summarizer: Summarizer, ticker: str, news, indicadores):
+    """(summary, backend name), falling back to the template"""
+    return _call(summarizer, "summarize", ticker, news, indicadores)
+
+
+def summarize_batch(summarizer: Summarizer, items: dict):
+    """({ticker: summary}, backend name), falling back to the template"""
+    return _call(summarizer, "summarize_batch", items)
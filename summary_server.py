@@ -0,0 +1,76 @@
+import argparse
+import json
+import random
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from summaries import TemplateSummarizer
+
+# Local stand-in for the summary LLM, answers what summaries.HttpSummarizer sends
+# after a configurable delay, so summary throughput can be tested without spending quota:
+#
+#   python summary_server.py --latency 3 --per-ticker 0.5 --jitter 1
+#   DASHBOARD_SUMMARIZER=http python main.py
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    latency = 0.0
+    per_ticker = 0.0
+    jitter = 0.0
+    error_rate = 0.0
+    summarizer = TemplateSummarizer()
+
+    def do_POST(self):
+        if self.path != "/summarize":
+            self.send_error(404)
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            items = json.loads(self.rfile.read(length))["items"]
+        except (ValueError, KeyError):
+            self.send_error(400, "Se esperaba {\"items\": {ticker: {news, indicadores}}}")
+            return
+
+        time.sleep(max(0.0, self.latency + self.per_ticker * len(items) + random.uniform(-self.jitter, self.jitter)))
+
+        # Simulates an exhausted quota so the fallback can be tried
+        if random.random() < self.error_rate:
+            self.send_error(429, "Quota exceeded")
+            return
+
+        summaries = {
+            ticker: self.summarizer.summarize(ticker, item.get("news", []), item.get("indicadores", {}))
+            for ticker, item in items.items()
+        }
+        body = json.dumps({"summaries": summaries}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servicio local que reemplaza al LLM de los resúmenes")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=2.0, help="segundos por consulta")
+    parser.add_argument("--per-ticker", type=float, default=0.0, help="segundos extra por ticker del lote")
+    parser.add_argument("--jitter", type=float, default=0.0, help="variación aleatoria de la demora, en segundos")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fracción de consultas respondidas con 429")
+    args = parser.parse_args()
+
+    StandInHandler.latency = args.latency
+    StandInHandler.per_ticker = args.per_ticker
+    StandInHandler.jitter = args.jitter
+    StandInHandler.error_rate = args.error_rate
+
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), StandInHandler)
+    print(f"Resumidor local en http://127.0.0.1:{args.port}/summarize")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
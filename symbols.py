@@ -0,0 +1,115 @@
+import bisect
+import csv
+import difflib
+import os
+import re
+
+# Offline list of known symbols, enriched at runtime with names from get_info
+SYMBOLS_FILE = os.path.join("assets", "symbols.csv")
+
+# Yahoo symbols: AAPL, BRK-B, ^GSPC, BTC-USD, EURUSD=X, GC=F, GGAL.BA ...
+SYMBOL_PATTERN = re.compile(r"^\^?[A-Z0-9][A-Z0-9.\-]{0,14}(=[XF])?$")
+
+# Suggestions shown in the completer
+MAX_SUGGESTIONS = 12
+
+
+def is_valid_symbol(symbol: str) -> bool:
+    """Rejects text that can never be a ticker before it reaches the network"""
+    return bool(SYMBOL_PATTERN.match(symbol))
+
+
+class SymbolIndex:
+    """
+    Sorted symbols and name words for prefix lookups with bisect.
+    Fuzzy matches only run when nothing starts with the query.
+    """
+
+    def __init__(self):
+        self.names = {}
+        self.symbols = []
+        # (word, symbol) pairs from the names, sorted by word
+        self.words = []
+
+    @classmethod
+    def load(cls, path: str = SYMBOLS_FILE, extra=()) -> "SymbolIndex":
+        """Builds the index from the offline file plus (symbol, name) pairs"""
+        index = cls()
+        if os.path.exists(path):
+            with open(path, newline="", encoding="utf-8") as f:
+                for row in csv.DictReader(f):
+                    index.names[row["symbol"].upper()] = row["name"]
+        for symbol, name in extra:
+            if name or symbol not in index.names:
+                index.names[symbol.upper()] = name or ""
+        index._rebuild()
+        return index
+
+    def _rebuild(self):
+        self.symbols = sorted(self.names)
+        self.words = sorted(
+            (word, symbol)
+            for symbol, name in self.names.items()
+            for word in _name_words(name)
+        )
+
+    def __contains__(self, symbol: str) -> bool:
+        return symbol in self.names
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def name(self, symbol: str) -> str:
+        return self.names.get(symbol, "")
+
+    def add(self, symbol: str, name: str = ""):
+        """Adds a symbol or updates its name, keeping the arrays sorted"""
+        symbol = symbol.upper()
+        old = self.names.get(symbol)
+        if old is not None and (old == name or not name):
+            return
+
+        self.names[symbol] = name or old or ""
+        if old is None:
+            bisect.insort(self.symbols, symbol)
+        else:
+            self.words = [entry for entry in self.words if entry[1] != symbol]
+        for word in _name_words(name):
+            bisect.insort(self.words, (word, symbol))
+
+    def search(self, query: str, limit: int = MAX_SUGGESTIONS) -> list[str]:
+        """Symbols starting with the query, then by name, then close misspellings"""
+        query = query.strip().upper()
+        if not query:
+            return []
+
+        results = _prefix(self.symbols, query, limit)
+
+        if len(results) < limit:
+            start = bisect.bisect_left(self.words, (query,))
+            for word, symbol in self.words[start:]:
+                if not word.startswith(query) or len(results) >= limit:
+                    break
+                if symbol not in results:
+                    results.append(symbol)
+
+        if not results:
+            # Only symbols of similar length, difflib over the whole list is too slow
+            candidates = [s for s in self.symbols if abs(len(s) - len(query)) <= 1]
+            results = difflib.get_close_matches(query, candidates, n=limit, cutoff=0.6)
+
+        return results
+
+
+def _prefix(items: list[str], query: str, limit: int) -> list[str]:
+    start = bisect.bisect_left(items, query)
+    results = []
+    for item in items[start:start + limit]:
+        if not item.startswith(query):
+            break
+        results.append(item)
+    return results
+
+
+def _name_words(name: str) -> list[str]:
+    return [word for word in re.split(r"[^\w]+", name.upper()) if len(word) > 1]
@@ -1,14 +1,337 @@
 import yfinance as yf
+import numpy as np
 from PyQt6.QtCore import QObject, QRunnable, pyqtSignal
-from google import genai
-import os
-from dotenv import load_dotenv
-import pandas as pd
+import datetime
+import threading
+import time
+from contextlib import ExitStack
 import indicadores
+import keypoints
+import sentiment
+import alerts
+import portfolio
+import summaries
+import storage
+from bars import BarSeries, NS_PER_DAY, resample, is_finer, merge, join_keys
+from backoff import guard, FetchBlocked
+import db
+
+# Stored interval -> period downloaded for it.
+# Coarser bars (weekly, monthly) are never downloaded, they are resampled locally.
+DOWNLOAD_PERIODS = {
+    '5m': '1d',
+    '1h': '3mo',
+    '1d': 'max',
+}
+
+# Chart period -> stored interval it is served from
+PERIODS = {
+    '1d': '5m',
+    '1mo': '1h',
+    '1y': '1d',
+    'ytd': '1d',
+    'max': '1d',
+}
+
+# Timeframes shown in the multi-timeframe indicator table
+INDICATOR_TIMEFRAMES = ('1h', '1d', '1wk', '1mo')
+
+# Bars needed at a timeframe before a coarser source is preferred, the longest
+# warm-up among the enabled indicators (SMA200 by default)
+MIN_INDICATOR_BARS = indicadores.calentamiento()
+
+# Watchlist: saved tickers shown, recent daily bars fetched each cycle and
+# how old a stored daily series can be and still be topped up with them
+WATCHLIST_SIZE = 500
+WATCHLIST_QUOTE_PERIOD = '5d'
+WATCHLIST_TOP_UP_DAYS = 5
+
+# Closes drawn in each sparkline
+SPARKLINE_BARS = 60
+
+
+# Stale series of these intervals are topped up from their last bars instead of downloaded
+# again. The 5m series only holds the current session, it is replaced.
+TOP_UP_INTERVALS = ('1h', '1d')
+
+# Top-ups start this many days before the last stored bar, so the closes they share
+# reveal a split or dividend adjustment to bars.merge
+TOP_UP_OVERLAP_DAYS = 5
+
+# Calendar days added to a span of daily bars for market holidays
+HOLIDAY_MARGIN_DAYS = 10
+
+def calendar_days(daily_bars: int) -> int:
+    """Calendar days that hold a number of daily bars, 252 sessions a year"""
+    return int(np.ceil(daily_bars * 365 / 252)) + HOLIDAY_MARGIN_DAYS
+
+# Daily history the indicator panel needs: the warm-up plus the previous bar its rules compare against
+INDICATOR_HISTORY_DAYS = calendar_days(MIN_INDICATOR_BARS + 1)
+
+# Daily bars used for the watchlist indicators. Every warm-up, EMAs included,
+# is over long before this, so the states match the ones of the full series
+WATCHLIST_INDICATOR_BARS = 3 * indicadores.calentamiento()
+
+# Daily history of the risk model, the returns it keeps plus the close before them
+RISK_HISTORY_DAYS = calendar_days(portfolio.HISTORY + 1)
+
+# The watchlist keeps the saved tickers' daily series, the risk model reads them too
+WATCHLIST_HISTORY_DAYS = max(calendar_days(max(WATCHLIST_INDICATOR_BARS, SPARKLINE_BARS)), RISK_HISTORY_DAYS)
+
+# Daily history resampled for the multi-timeframe table, enough for the warm-up in monthly bars
+TIMEFRAME_HISTORY_DAYS = 31 * MIN_INDICATOR_BARS
+
+def history_days(period: str):
+    """
+    Calendar days of history a chart period needs from its stored series, warm-up included
+    so the indicator series are valid from the first visible bar. None for the whole period.
+    """
+    if period == '1y':
+        return 365 + INDICATOR_HISTORY_DAYS
+    if period == 'ytd':
+        return datetime.date.today().timetuple().tm_yday + INDICATOR_HISTORY_DAYS
+    return None
+
+def _date(ns: int) -> str:
+    return datetime.datetime.fromtimestamp(ns / 1e9, datetime.timezone.utc).strftime('%Y-%m-%d')
+
+def _span(interval: str, start: int) -> dict:
+    return {'start': _date(start)} if start else {'period': DOWNLOAD_PERIODS[interval]}
+
+def history_start(days: int | None) -> int:
+    """UTC nanoseconds `days` calendar days ago, 0 (the whole download period) for None"""
+    return time.time_ns() - days * NS_PER_DAY if days else 0
+
+def covers(coverage, start: int) -> bool:
+    """Whether a stored series' downloads (storage.coverage) reach back to start"""
+    return coverage is not None and (not coverage[0] or bool(start and start >= coverage[0]))
+
+def plan_download(interval: str, bars, coverage, start: int) -> list:
+    """
+    Downloads still missing for a stored series to cover from `start` (UTC nanoseconds,
+    0 for the whole download period of the interval) up to now.
+    coverage is storage.coverage() of the stored series.
+    Returns (where, yf.download arguments) pairs, where is 'all' (replaces the series),
+    'tail' (recent bars) or 'head' (older bars), in that order. Empty when the stored
+    bars are enough.
+    """
+    if bars is None or bars.empty or coverage is None:
+        return [('all', _span(interval, start))]
+
+    age = coverage[1]
+    stale = age > storage.MAX_AGE.get(interval, 0)
+    if stale and interval not in TOP_UP_INTERVALS:
+        return [('all', _span(interval, start))]
+
+    # The tail goes first: if the head then fails, the series saved with its old
+    # coverage is fresh and still asks for the older bars next time
+    plan = []
+    if stale:
+        plan.append(('tail', {'start': _date(bars.last_timestamp() - TOP_UP_OVERLAP_DAYS * NS_PER_DAY)}))
+    if not covers(coverage, start):
+        # Only up to the first stored bar, the rest is already here
+        plan.append(('head', {**_span(interval, start), 'end': _date(bars.timestamps[0] + NS_PER_DAY)}))
+    return plan
+
+# One download at a time per series, a second task waits and finds it stored
+_download_locks = {}
+_download_locks_lock = threading.Lock()
+
+def _download_lock(ticker: str, interval: str) -> threading.Lock:
+    with _download_locks_lock:
+        return _download_locks.setdefault((ticker.upper(), interval), threading.Lock())
+
+def load_or_download(ticker: str, interval: str, days: int | None = None):
+    """
+    Returns the stored series for ticker/interval covering at least the last `days`
+    calendar days (the whole download period if None). Only the span the stored
+    series lacks is downloaded: older bars, the bars since it went stale, or all of it.
+    """
+    start = history_start(days)
+    with _download_lock(ticker, interval):
+        bars = storage.load_bars(ticker, interval, max_age=0)
+        coverage = storage.coverage(ticker, interval) if bars is not None else None
+        plan = plan_download(interval, bars, coverage, start)
+        if not plan:
+            return bars
+
+        covered = coverage[0] if coverage is not None else start
+        # Checked once for the whole plan, a block between steps would waste the first one
+        guard.check(ticker, 'prices')
+        for step, (where, kwargs) in enumerate(plan):
+            try:
+                df = yf.download(ticker, interval=interval, progress=False, **kwargs)
+            except Exception:
+                guard.record_failure(ticker, 'prices')
+                if step:
+                    # Keep the tail already downloaded, the head is planned again
+                    storage.save_bars(ticker, interval, bars, covered)
+                raise
+            # An empty answer is still an answer, it closes the breaker
+            guard.record_success(ticker, 'prices')
+
+            # Rows without any price normalize to an empty series, same as no rows
+            downloaded = BarSeries.from_download(df) if not df.empty else None
+            if downloaded is not None and downloaded.empty:
+                downloaded = None
+
+            if where == 'all':
+                if downloaded is None:
+                    # No daily bars at all means an unknown or delisted symbol,
+                    # empty intraday downloads are normal while the market is closed
+                    if interval == '1d':
+                        guard.record_missing(ticker)
+                    if bars is None or bars.empty:
+                        return None
+                    # The stored bars are still the latest there are
+                    continue
+                bars, covered = downloaded, start
+            elif where == 'head':
+                # Nothing older may exist, the span still counts as covered
+                if downloaded is not None:
+                    bars = merge(downloaded, bars)
+                covered = start
+            elif downloaded is not None:
+                bars = merge(bars, downloaded)
+
+        # Saved even if nothing new came back, so the series counts as fresh again
+        storage.save_bars(ticker, interval, bars, covered)
+        return bars
+
+def load_or_download_many(tickers: list, interval: str, days: int | None = None) -> dict:
+    """
+    load_or_download for several tickers. Their plans are grouped by kind and each kind
+    is a single request for all of them, asking for the widest span any of them needs.
+    Returns {ticker: BarSeries} for the tickers with bars. A ticker whose request fails
+    or is backing off keeps its stored series, if it has one.
+    """
+    start = history_start(days)
+    with ExitStack() as locks:
+        # Always taken in the same order, so two batches can't wait on each other
+        for key in sorted({ticker.upper() for ticker in tickers}):
+            locks.enter_context(_download_lock(key, interval))
+
+        result, covered, requests = {}, {}, {}
+        for ticker in tickers:
+            bars = storage.load_bars(ticker, interval, max_age=0)
+            coverage = storage.coverage(ticker, interval) if bars is not None else None
+            if bars is not None and not bars.empty:
+                result[ticker] = bars
+            covered[ticker] = coverage[0] if coverage is not None else start
+            for where, kwargs in plan_download(interval, bars, coverage, start):
+                requests.setdefault(where, []).append((ticker, kwargs))
+
+        changed = set()
+        for where in ('all', 'head', 'tail'):
+            batch = requests.get(where)
+            if not batch:
+                continue
+            kwargs = dict(batch[0][1])
+            if 'start' in kwargs:
+                kwargs['start'] = min(request['start'] for _, request in batch)
+            if 'end' in kwargs:
+                kwargs['end'] = max(request['end'] for _, request in batch)
+            names = [ticker for ticker, _ in batch]
+            try:
+                downloaded = download_many(
+                    names, interval, missing_if_empty=where == 'all' and interval == '1d', **kwargs
+                )
+            except Exception:
+                # Already counted by the guard, the stored series are still good for now
+                continue
+
+            for ticker in names:
+                bars = downloaded.get(ticker)
+                if where == 'all':
+                    if bars is not None:
+                        result[ticker], covered[ticker] = bars, start
+                        changed.add(ticker)
+                elif ticker in result:
+                    if bars is not None:
+                        result[ticker] = merge(bars, result[ticker]) if where == 'head' else merge(result[ticker], bars)
+                    if where == 'head':
+                        covered[ticker] = start
+                    changed.add(ticker)
+
+        for ticker in changed:
+            storage.save_bars(ticker, interval, result[ticker], covered[ticker])
+    return result
+
+def download_many(tickers: list, interval: str, missing_if_empty: bool = False, **kwargs) -> dict:
+    """
+    Downloads several tickers in a single request, kwargs are the span for yf.download.
+    Returns {ticker: BarSeries} for the ones that came back with data.
+    missing_if_empty: the span is the ticker's whole history, no bars means an unknown symbol.
+    """
+    allowed = []
+    for ticker in tickers:
+        try:
+            guard.check(ticker, 'prices')
+            allowed.append(ticker)
+        except FetchBlocked:
+            pass
+    if not allowed:
+        return {}
+
+    try:
+        df = yf.download(allowed, interval=interval, progress=False, group_by='column', **kwargs)
+    except Exception:
+        for ticker in allowed:
+            guard.record_failure(ticker, 'prices')
+        raise
+
+    result = {}
+    tickers_found = set(df.columns.get_level_values(1)) if not df.empty else set()
+    for ticker in allowed:
+        guard.record_success(ticker, 'prices')
+        bars = BarSeries.from_download(df, ticker) if ticker in tickers_found else None
+        if bars is None or bars.empty:
+            if missing_if_empty:
+                guard.record_missing(ticker)
+            continue
+        result[ticker] = bars
+    return result
+
+def chart_interval(period: str) -> str:
+    """Interval of the bars drawn for a chart period, the max view uses monthly bars"""
+    return '1mo' if period == 'max' else PERIODS[period]
+
+def chart_view(bars: BarSeries, period: str) -> BarSeries:
+    """Cuts a stored series down to what the chart shows for a period"""
+    if period == '1mo':
+        return bars.last_days(31)
+    if period == '1y':
+        return bars.last_days(365)
+    if period == 'ytd':
+        return bars.year_to_date()
+    return bars
+
+def fetch_news(ticker: str) -> list:
+    """Latest stories of a ticker as dicts with title, link, publisher, time, summary and sentiment"""
+    guard.check(ticker, 'news')
+    try:
+        data = yf.Ticker(ticker).get_news(count=10)
+    except Exception:
+        guard.record_failure(ticker, 'news')
+        raise
+    guard.record_success(ticker, 'news')
+
+    news = []
+    for n in data or []:
+        content = n.get("content", {})
+        news.append({
+        "title": content.get("title"),
+        "link": content.get("canonicalUrl", {}).get("url"),
+        "publisher": content.get("provider", {}).get("displayName"),
+        "time": content.get("pubDate"),
+        "summary": content.get("summary"),
+        "text": keypoints.plain_text(content.get("description"))
+        })
+    return sentiment.score_news(news)
 
 # QRunnable doesn't support signals so they must be included here
 class PriceHistoryFetchSignals(QObject):
-    finished = pyqtSignal(str, object)
+    finished = pyqtSignal(str, object, object)
     error = pyqtSignal(str)
 
 class PriceHistoryFetchTask(QRunnable):
@@ -16,6 +339,7 @@ class PriceHistoryFetchTask(QRunnable):
     Fetches price history.
     Period: 1 day, 1 month, 1 year, year to date, max.
     Intervals vary.
+    Emits the bars shown on the chart and the indicator series aligned with them.
     """
     def __init__(self, ticker: str, period: str):
         super().__init__()
@@ -26,31 +350,82 @@ class PriceHistoryFetchTask(QRunnable):
     def run(self):
         
         try:
-            
-            if(self.period == '1d'):
-                df = yf.download(self.ticker, period='1d', interval='5m', progress=False)
-            elif(self.period == '1mo'):
-                df = yf.download(self.ticker, period='1mo', interval='1h', progress=False)
-            elif(self.period == '1y'):
-                df = yf.download(self.ticker, period='1y', interval='1d', progress=False)
-            elif(self.period == 'ytd'):
-                df = yf.download(self.ticker, period='ytd', interval='1d', progress=False)
-            elif(self.period == 'max'):
-                df = yf.download(self.ticker, period='max', interval='1mo', progress=False)
-
-            if df.empty:
+            interval = PERIODS[self.period]
+            bars = load_or_download(self.ticker, interval, history_days(self.period))
+
+            if bars is None:
                 self.signals.error.emit(
                     f"No se encontraron datos para {self.ticker}. "
                 )
                 return
+
+            # The max view shows monthly bars resampled from the daily series
+            if chart_interval(self.period) != interval:
+                interval = chart_interval(self.period)
+                bars = resample(bars, interval)
+
+            # Series are computed (and memoized) over the whole stored series
+            # so indicators have their warm-up, then cut to the visible bars
+            view = chart_view(bars, self.period)
+            series = indicadores.series_indicadores(self.ticker, interval, bars)
+            series = {name: values[-len(view):] for name, values in series.items()}
             
-            self.signals.finished.emit(self.period, df)
+            self.signals.finished.emit(self.period, view, series)
+
+        except Exception as e:
+            self.signals.error.emit(str(e))
+
+class ComparisonFetchSignals(QObject):
+    series_ready = pyqtSignal(str, str, object, object)
+    error = pyqtSignal(str)
+
+class ComparisonFetchTask(QRunnable):
+    """
+    Fetches the tickers compared on the chart for a period.
+    Stored series are emitted right away, the missing ones are downloaded
+    together and emitted one by one, so each curve is drawn as soon as it's ready.
+    Emits (period, ticker, join keys, closes).
+    """
+
+    def __init__(self, tickers: list, period: str):
+        super().__init__()
+        self.tickers = tickers
+        self.period = period
+        self.signals = ComparisonFetchSignals()
+
+    def run(self):
+        try:
+            interval = PERIODS[self.period]
+            start = history_start(history_days(self.period))
+            missing = []
+            for ticker in self.tickers:
+                bars = storage.load_bars(ticker, interval)
+                # A series downloaded for the indicator panel may not reach back far enough
+                if bars is None or not covers(storage.coverage(ticker, interval), start):
+                    missing.append(ticker)
+                else:
+                    self._emit(ticker, bars)
+
+            if missing:
+                downloaded = load_or_download_many(missing, interval, history_days(self.period))
+                for ticker in missing:
+                    bars = downloaded.get(ticker)
+                    if bars is None:
+                        self.signals.error.emit(f"No se encontraron datos para {ticker}.")
+                        continue
+                    self._emit(ticker, bars)
 
         except Exception as e:
             self.signals.error.emit(str(e))
 
+    def _emit(self, ticker: str, bars: BarSeries):
+        interval = chart_interval(self.period)
+        if interval != PERIODS[self.period]:
+            bars = resample(bars, interval)
+        self.signals.series_ready.emit(self.period, ticker, join_keys(bars, interval), bars.close)
+
 class NewsFetchSignals(QObject):
-    finished = pyqtSignal(object)
+    finished = pyqtSignal(str, object)
     error = pyqtSignal(str)
 
 class NewsFetchTask(QRunnable):
@@ -65,92 +440,177 @@ class NewsFetchTask(QRunnable):
 
     def run(self):
         try:
-            data = yf.Ticker(self.ticker).get_news(count=10)
+            news = fetch_news(self.ticker)
 
-            if not data:
+            if not news:
                 self.signals.error.emit(
                     f"No se encontraron noticias para {self.ticker}. "
                 )
                 return
+
+            self.signals.finished.emit(self.ticker, news)
+
+        except Exception as e:
+            self.signals.error.emit(str(e))
             
-            news = []
 
-            for n in data:
-                content = n.get("content", {})
-                news.append({
-                "title": content.get("title"),
-                "link": content.get("canonicalUrl", {}).get("url"),
-                "publisher": content.get("provider", {}).get("displayName"),
-                "time": content.get("pubDate"),
-                "summary": content.get("summary")
-                })
+class SymbolInfoSignals(QObject):
+    finished = pyqtSignal(str, str)
+    error = pyqtSignal(str)
 
-            self.signals.finished.emit(news)
+class SymbolInfoTask(QRunnable):
+    """
+    Fetches the display name of a ticker for the symbol index
+    """
+
+    def __init__(self, ticker: str):
+        super().__init__()
+        self.ticker = ticker
+        self.signals = SymbolInfoSignals()
 
+    def run(self):
+        try:
+            guard.check(self.ticker, 'info')
+            try:
+                info = yf.Ticker(self.ticker).get_info() or {}
+            except Exception:
+                guard.record_failure(self.ticker, 'info')
+                raise
+            guard.record_success(self.ticker, 'info')
+            name = info.get("displayName") or info.get("shortName") or info.get("longName")
+            if name:
+                self.signals.finished.emit(self.ticker, name)
         except Exception as e:
             self.signals.error.emit(str(e))
-            
 
 class GenerateSummarySignals(QObject):
-    finished = pyqtSignal(str, str)
+    finished = pyqtSignal(str, str, str)
     error = pyqtSignal(str)
 
 class GenerateSummaryTask(QRunnable):
     """
-    Uses Gemini API to generate a brief summary
+    Generates a brief summary with the selected backend (Gemini by default).
+    If the backend is unavailable the template summary is emitted instead,
+    together with the name of the backend that produced it.
     """
     
-    def __init__(self, ticker: str, news, indicators_data):
+    def __init__(self, ticker: str, news, indicators_data, backend: str | None = None):
         super().__init__()
         
         self.news = news
         self.indicadores = indicators_data
-        #load_dotenv()
+        self.backend = backend
         self.ticker = ticker
         self.signals = GenerateSummarySignals()
-        #self.client = genai.Client( api_key=os.getenv('GEMINI_API_KEY') )
 
     def run(self):
         try:
-            
-            load_dotenv()
-            client = genai.Client( api_key=os.getenv('GEMINI_API_KEY') )
-            
-            news_text = "\n".join([f"- {n['title']}: {n['summary']}" for n in self.news])
-            
-            indicators_text = "\n".join([f"- {name}: {data[1]}" for name, data in self.indicadores.items()])
-
-            prompt = (
-                f"Analiza la siguiente información relacionada con {self.ticker} y genera un texto estructurado en tres partes separadas por saltos de línea:\n\n"
-                "1. Resumen general: Describe brevemente el activo, y la situación actual del activo.\n"
-                "2. Análisis de noticias: Explica qué tendencia o sentimiento reflejan las noticias recientes (positivo, negativo, neutro) y qué temas predominan.\n"
-                "3. Análisis de indicadores: Interpreta brevemente los indicadores técnicos y sugiere qué podrían implicar para el comportamiento futuro del activo. No hagas referencia al estado de los indicadores como 'good' 'bad' 'neutro' o 'ninguno'.\n\n"
-                "Evita redundancias, no uses negritas, sé directo y mantén cada parte en uno o dos párrafos como máximo.\n\n"
-                "--- NOTICIAS ---\n"
-                f"{news_text}"
-                "\n\n--- INDICADORES ---\n"
-                f"{indicators_text}"
+            summary, used = summaries.summarize(
+                summaries.backend(self.backend), self.ticker, self.news, self.indicadores
             )
+            self.signals.finished.emit(self.ticker, summary, used)
 
-            summary = client.models.generate_content(model='gemini-2.5-flash', contents=prompt)
-    
-            if not summary:
-                self.signals.error.emit(
-                    f"No se pudo generar un resumen para {self.ticker}. "
-                )
-                return
+        except Exception as e:
+            print(e)
+            self.signals.error.emit(str(e))
+
+class BatchSummarySignals(QObject):
+    progress = pyqtSignal(int, int)
+    finished = pyqtSignal(int, int)
+    error = pyqtSignal(str)
 
-            self.signals.finished.emit(self.ticker, summary.text)
+class BatchSummaryTask(QRunnable):
+    """
+    Summarizes many tickers packing BATCH_SIZE of them in each request, the reply
+    is a JSON object keyed by ticker that fills the summary cache.
+    Tickers with a recent summary are skipped, the ones missing from a reply are
+    asked again once. Stops if the backend becomes unavailable rather than caching
+    fallback summaries. Emits progress (done, total) and (summarized, requests).
+    """
+
+    def __init__(self, tickers: list, backend: str | None = None):
+        super().__init__()
+        self.tickers = list(tickers)
+        self.backend = backend
+        self.signals = BatchSummarySignals()
+        self._last_request = 0.0
+
+    def run(self):
+        try:
+            fresh = db.load_summaries(self.tickers, summaries.MAX_AGE)
+            pending = [ticker for ticker in self.tickers if ticker not in fresh]
+            total, done, requests = len(pending), 0, 0
+            self.signals.progress.emit(done, total)
+
+            items = {}
+            for ticker in pending:
+                item = self._inputs(ticker)
+                if item is None:
+                    total -= 1
+                    self.signals.progress.emit(done, total)
+                else:
+                    items[ticker] = item
+
+            summarizer = summaries.backend(self.backend)
+            for attempt in range(2):
+                missing = {}
+                batch_tickers = list(items)
+                for start in range(0, len(batch_tickers), summaries.BATCH_SIZE):
+                    batch = {t: items[t] for t in batch_tickers[start:start + summaries.BATCH_SIZE]}
+                    reply, used = self._request(summarizer, batch)
+                    requests += 1
+                    # A configured fallback's reply is kept, only the template's stops the run
+                    if used == summaries.FALLBACK.name and used != summarizer.name:
+                        self.signals.error.emit(
+                            f"{summarizer.name} no está disponible, se generaron {done} de {total} resúmenes."
+                        )
+                        return
+                    for ticker, summary in reply.items():
+                        db.save_summary(ticker, summary)
+                    done += len(reply)
+                    self.signals.progress.emit(done, total)
+                    missing.update({t: item for t, item in batch.items() if t not in reply})
+                items = missing
+                if not items:
+                    break
+
+            self.signals.finished.emit(done, requests)
 
         except Exception as e:
-            print(e)
             self.signals.error.emit(str(e))
 
+    @staticmethod
+    def _inputs(ticker: str):
+        """(news, indicadores) of a ticker, None if it can't be summarized now"""
+        try:
+            bars = load_or_download(ticker, '1d', INDICATOR_HISTORY_DAYS)
+            if bars is None or len(bars) <= 2:
+                return None
+            series = indicadores.series_indicadores(ticker, '1d', bars)
+            return fetch_news(ticker), indicadores.calcular_indicadores(bars, series)
+        except Exception:
+            # The guard already keeps track of failing tickers, the rest still get summarized
+            return None
+
+    def _request(self, summarizer, batch: dict):
+        # Stay under the backend's requests per minute
+        wait = self._last_request + summarizer.min_interval - time.monotonic()
+        if wait > 0:
+            time.sleep(wait)
+        self._last_request = time.monotonic()
+        return summaries.summarize_batch(summarizer, batch)
+
 class GenerateDatosIndicadoresSignals(QObject):
-    finished = pyqtSignal(object)
-    error = pyqtSignal(str)
+    finished = pyqtSignal(str, object)
+    error = pyqtSignal(str, str)
 
 class GenerateDatosIndicadoresTask(QRunnable):
+    """
+    Computes the daily indicator panel.
+    Only the daily bars the warm-up needs are required, so with an empty store it
+    downloads a fraction of the chart's history and finishes before it.
+    Emits (ticker, indicator results), errors also carry the ticker.
+    """
 
     def __init__(self, ticker: str):
         super().__init__()
@@ -159,38 +619,212 @@ class GenerateDatosIndicadoresTask(QRunnable):
         
     def fetch_data(self):
 
-        df = yf.download(self.ticker, period='1y', interval='1d', progress=False)
-        if df.empty:
-            self.signals.error.emit(f"No se encontraron datos para {self.ticker}. ")
-            return None
-        return df
+        bars = load_or_download(self.ticker, '1d', INDICATOR_HISTORY_DAYS)
+        if bars is None:
+            self.signals.error.emit(self.ticker, f"No se encontraron datos para {self.ticker}. ")
+        return bars
 
     def run(self):
         try:
-            df = self.fetch_data()
-            if df is None:
+            bars = self.fetch_data()
+            if bars is None:
                 return
-            SMA10, estado_SMA10, info_SMA10 = indicadores.promedio_movil(df['Close'], 10)
-            SMA50, estado_SMA50, info_SMA50 = indicadores.promedio_movil(df['Close'], 50)
-            SMA200, estado_SMA200, info_SMA200 = indicadores.promedio_movil(df['Close'], 200)
-            MACD_line, Signal_line, Histograma, estado_MACD, info_MACD = indicadores.macd(df['Close'])
-            K_percent, D_percent, estado_Estocastico, info_Estocastico = indicadores.oscilador_estocastico(df) 
-            RSI_value, estado_RSI, info_RSI = indicadores.rsi(df['Close'])
-            Volatilidad_value, estado_Volatilidad, info_Volatilidad = indicadores.volatilidad(df['Close'])
-            ATR_value, estado_ATR, info_ATR = indicadores.atr(df['High'], df['Low'], df['Close'], periodo=14)
-
-            datos_indicadores = {
-                'SMA10': (SMA10, estado_SMA10, info_SMA10),
-                'SMA50': (SMA50, estado_SMA50, info_SMA50),
-                'SMA200': (SMA200, estado_SMA200, info_SMA200),
-                'MACD': (MACD_line, Signal_line, Histograma, estado_MACD, info_MACD),
-                'Estocastico': (K_percent, D_percent, estado_Estocastico, info_Estocastico),
-                'RSI': (RSI_value, estado_RSI, info_RSI),
-                'Volatilidad': (Volatilidad_value, estado_Volatilidad, info_Volatilidad),
-                'ATR14': (ATR_value, estado_ATR, info_ATR)
-            }
-            self.signals.finished.emit(datos_indicadores)
+
+            series = indicadores.series_indicadores(self.ticker, '1d', bars)
+            datos_indicadores = indicadores.calcular_indicadores(bars, series)
+            self.signals.finished.emit(self.ticker, datos_indicadores)
             
         except Exception as e:
-            self.signals.error.emit(str(e))        
+            self.signals.error.emit(self.ticker, str(e))        
+
+class MultiTimeframeIndicatorsSignals(QObject):
+    finished = pyqtSignal(str, object)
+    error = pyqtSignal(str)
 
+class MultiTimeframeIndicatorsTask(QRunnable):
+    """
+    Computes the indicator set for several timeframes.
+    Each timeframe is resampled from the finest stored series that has enough
+    bars, so only the hourly and daily series are ever downloaded.
+    """
+
+    def __init__(self, ticker: str):
+        super().__init__()
+        self.ticker = ticker
+        self.signals = MultiTimeframeIndicatorsSignals()
+
+    def run(self):
+        try:
+            # Finest first, the 5m series is only used if the chart already stored it
+            sources = []
+            for interval in ('5m', '1h', '1d'):
+                if interval == '5m':
+                    bars = storage.load_bars(self.ticker, interval)
+                elif interval == '1d':
+                    bars = load_or_download(self.ticker, interval, TIMEFRAME_HISTORY_DAYS)
+                else:
+                    bars = load_or_download(self.ticker, interval)
+                if bars is not None and len(bars):
+                    sources.append((interval, bars))
+
+            resultados = {}
+            for timeframe in INDICATOR_TIMEFRAMES:
+                best = None
+                for interval, bars in sources:
+                    if not is_finer(interval, timeframe):
+                        continue
+                    candidate = bars if interval == timeframe else resample(bars, timeframe)
+                    if best is None or len(candidate) > len(best):
+                        best = candidate
+                    if len(candidate) >= MIN_INDICATOR_BARS:
+                        break
+
+                # Too short to compute anything meaningful
+                if best is None or len(best) <= 2:
+                    resultados[timeframe] = None
+                    continue
+                series = indicadores.series_indicadores(self.ticker, timeframe, best)
+                resultados[timeframe] = indicadores.calcular_indicadores(best, series)
+
+            self.signals.finished.emit(self.ticker, resultados)
+
+        except Exception as e:
+            self.signals.error.emit(str(e))
+
+class WatchlistRefreshSignals(QObject):
+    finished = pyqtSignal(object, object)
+    error = pyqtSignal(str)
+
+class WatchlistRefreshTask(QRunnable):
+    """
+    Refreshes every saved ticker in one cycle.
+    Stored daily series are topped up with a single download of the last days,
+    tickers without a usable stored series are downloaded together in another one.
+    `extra` tickers (e.g. the risk benchmark) are refreshed along but not listed.
+    Emits the ticker list (most recent first) and {ticker: row or None}.
+    """
+
+    def __init__(self, extra=()):
+        super().__init__()
+        self.extra = list(extra)
+        self.signals = WatchlistRefreshSignals()
+
+    def run(self):
+        try:
+            tickers = [ticker for ticker, _ in db.load_history(WATCHLIST_SIZE)]
+            if not tickers:
+                self.signals.finished.emit([], {})
+                return
+            refreshed = tickers + [ticker for ticker in self.extra if ticker not in tickers]
+
+            limit = time.time_ns() - WATCHLIST_TOP_UP_DAYS * NS_PER_DAY
+            start = history_start(WATCHLIST_HISTORY_DAYS)
+            stored, stale, planned = {}, set(), []
+            for ticker in refreshed:
+                bars = storage.load_bars(ticker, '1d')
+                if bars is None:
+                    bars = storage.load_bars(ticker, '1d', max_age=0)
+                    stale.add(ticker)
+                if (bars is None or bars.empty or bars.last_timestamp() < limit
+                        or not covers(storage.coverage(ticker, '1d'), start)):
+                    planned.append(ticker)
+                else:
+                    stored[ticker] = bars
+
+            daily = {}
+            if stored:
+                quotes = download_many(list(stored), '1d', period=WATCHLIST_QUOTE_PERIOD)
+                for ticker, bars in stored.items():
+                    if ticker in quotes:
+                        bars = merge(bars, quotes[ticker])
+                        # Refreshes the stored copy once it would have been downloaded again anyway
+                        if ticker in stale:
+                            bars = self._save_top_up(ticker, quotes[ticker], bars)
+                    daily[ticker] = bars
+            if planned:
+                # Only the span each of them lacks, in one request per kind of span
+                daily.update(load_or_download_many(planned, '1d', WATCHLIST_HISTORY_DAYS))
+
+            rows = {ticker: self._row(daily[ticker]) if ticker in daily else None for ticker in refreshed}
+            self.signals.finished.emit(tickers, rows)
+
+        except Exception as e:
+            self.signals.error.emit(str(e))
+
+    @staticmethod
+    def _save_top_up(ticker: str, quotes: BarSeries, bars: BarSeries) -> BarSeries:
+        """
+        Stores a stale series topped up with the quotes. Another task may have saved
+        the series meanwhile, so the quotes go on top of what is stored now.
+        """
+        with _download_lock(ticker, '1d'):
+            current = storage.load_bars(ticker, '1d', max_age=0)
+            coverage = storage.coverage(ticker, '1d')
+            if current is not None and not current.empty and coverage is not None:
+                bars = merge(current, quotes)
+            storage.save_bars(ticker, '1d', bars, coverage[0] if coverage else 0)
+        return bars
+
+    @staticmethod
+    def _row(bars: BarSeries) -> dict:
+        close = bars.close
+        previous = float(close[-2]) if len(close) > 1 else float('nan')
+        tail = bars[-WATCHLIST_INDICATOR_BARS:]
+        if len(tail) > 2:
+            series = indicadores.calcular_series(tail)
+            datos = indicadores.calcular_indicadores(tail, series)
+            # Previous and last value of everything the alert rules can use
+            series = dict(series, precio=tail.close)
+            # Series of disabled indicators never trigger
+            missing = np.full(2, np.nan)
+            valores = np.array([series.get(name, missing)[-2:] for name in alerts.FEATURES]).T
+        else:
+            datos, valores = {}, None
+        return {
+            'price': float(close[-1]),
+            'change': float(close[-1]) / previous - 1,
+            'sparkline': close[-SPARKLINE_BARS:].copy(),
+            'indicadores': datos,
+            'valores': valores,
+            'timestamp': bars.last_timestamp(),
+            'day': int(join_keys(bars[-1:], '1d')[0]),
+        }
+
+class RiskMatrixSignals(QObject):
+    finished = pyqtSignal(object, object)
+    error = pyqtSignal(str)
+
+class RiskMatrixTask(QRunnable):
+    """
+    Builds the risk model of the saved tickers from their stored daily series.
+    Only the benchmark may be downloaded, the watchlist keeps the rest up to date.
+    Emits the saved tickers and the model.
+    """
+
+    def __init__(self, benchmark: str = portfolio.BENCHMARK):
+        super().__init__()
+        self.benchmark = benchmark
+        self.signals = RiskMatrixSignals()
+
+    def run(self):
+        try:
+            tickers = [ticker for ticker, _ in db.load_history(WATCHLIST_SIZE)]
+            closes = {}
+            for ticker in tickers:
+                bars = storage.load_bars(ticker, '1d', max_age=0)
+                if bars is not None and len(bars) > 1:
+                    closes[ticker] = (join_keys(bars, '1d'), bars.close)
+
+            if self.benchmark not in closes:
+                try:
+                    bars = load_or_download(self.benchmark, '1d', RISK_HISTORY_DAYS)
+                except Exception:
+                    # An outdated copy is better than no betas
+                    bars = storage.load_bars(self.benchmark, '1d', max_age=0)
+                if bars is not None and len(bars) > 1:
+                    closes[self.benchmark] = (join_keys(bars, '1d'), bars.close)
+
+            self.signals.finished.emit(tickers, portfolio.RiskModel.build(closes, self.benchmark))
+
+        except Exception as e:
+            self.signals.error.emit(str(e))
@@ -0,0 +1,111 @@
+import numpy as np
+import pytest
+
+from alerts import FEATURES, AlertEngine, parse_rule
+
+
+def row(timestamp, previous=None, last=None):
+    """A watchlist row, previous/last are {feature: value} for the two bars, the rest NaN"""
+    valores = np.full((2, len(FEATURES)), np.nan)
+    for bar, values in enumerate((previous or {}, last or {})):
+        for name, value in values.items():
+            valores[bar, FEATURES.index(name)] = value
+    price = valores[1, FEATURES.index("precio")]
+    return {"valores": valores, "timestamp": timestamp, "price": price}
+
+
+def engine(*rules):
+    engine = AlertEngine()
+    engine.set_rules([parse_rule(text) for text in rules])
+    return engine
+
+
+def fired(alerts):
+    return sorted((alert.ticker, alert.rule) for alert in alerts)
+
+
+def test_parse_rule_normalizes_the_text():
+    assert parse_rule("aapl: atr > 5").text == "AAPL: ATR14 > 5"
+    assert parse_rule("precio cruza arriba de sma200").text == "precio cruza arriba SMA200"
+    with pytest.raises(ValueError):
+        parse_rule("RSI ~ 30")
+    with pytest.raises(ValueError):
+        parse_rule("FOO < 30")
+
+
+def test_threshold_fires_on_the_edge_and_rearms():
+    alerts = engine("RSI < 30")
+    assert fired(alerts.evaluate({"AAPL": row(1, last={"RSI": 25.0})})) == [("AAPL", "RSI < 30")]
+    # Still true on the next bar: no new alert
+    assert alerts.evaluate({"AAPL": row(2, last={"RSI": 20.0})}) == []
+    # Goes false, which re-arms it, then true again
+    assert alerts.evaluate({"AAPL": row(3, last={"RSI": 40.0})}) == []
+    assert fired(alerts.evaluate({"AAPL": row(4, last={"RSI": 28.0})})) == [("AAPL", "RSI < 30")]
+
+
+def test_unchanged_rows_are_skipped():
+    alerts = engine("RSI < 30")
+    assert len(alerts.evaluate({"AAPL": row(1, last={"RSI": 25.0, "precio": 10.0})})) == 1
+    # Same timestamp and price: not evaluated, so the rule isn't re-armed
+    assert alerts.evaluate({"AAPL": row(1, last={"RSI": 40.0, "precio": 10.0})}) == []
+    assert alerts.evaluate({"AAPL": row(1, last={"RSI": 25.0, "precio": 10.5})}) == []
+
+
+def test_state_is_kept_per_ticker():
+    alerts = engine("RSI > 70")
+    rows = {"AAPL": row(1, last={"RSI": 75.0}), "MSFT": row(1, last={"RSI": 50.0})}
+    assert fired(alerts.evaluate(rows)) == [("AAPL", "RSI > 70")]
+    rows = {"AAPL": row(2, last={"RSI": 80.0}), "MSFT": row(2, last={"RSI": 71.0})}
+    assert fired(alerts.evaluate(rows)) == [("MSFT", "RSI > 70")]
+
+
+def test_cross_fires_once_per_cross():
+    alerts = engine("precio cruza arriba SMA200")
+    cross = row(1, previous={"precio": 99.0, "SMA200": 100.0}, last={"precio": 101.0, "SMA200": 100.0})
+    assert fired(alerts.evaluate({"AAPL": cross})) == [("AAPL", "precio cruza arriba SMA200")]
+    # The price moving within the same bar doesn't renotify
+    same_bar = row(1, previous={"precio": 99.0, "SMA200": 100.0}, last={"precio": 102.0, "SMA200": 100.0})
+    assert alerts.evaluate({"AAPL": same_bar}) == []
+    # Next bar it stays above, no cross
+    above = row(2, previous={"precio": 102.0, "SMA200": 100.0}, last={"precio": 103.0, "SMA200": 100.0})
+    assert alerts.evaluate({"AAPL": above}) == []
+    below = row(3, previous={"precio": 103.0, "SMA200": 100.0}, last={"precio": 98.0, "SMA200": 100.0})
+    assert alerts.evaluate({"AAPL": below}) == []
+    again = row(4, previous={"precio": 98.0, "SMA200": 100.0}, last={"precio": 100.5, "SMA200": 100.0})
+    assert len(alerts.evaluate({"AAPL": again})) == 1
+
+
+def test_scoped_rules_only_apply_to_their_ticker():
+    alerts = engine("AAPL: ATR > 5", "MSFT: MACD cruza abajo señal")
+    rows = {
+        "AAPL": row(1, last={"ATR14": 6.0}, previous={"MACD": 1.0, "MACD_signal": 0.0}),
+        "MSFT": row(1, last={"ATR14": 6.0, "MACD": -1.0, "MACD_signal": 0.0}, previous={"MACD": 1.0, "MACD_signal": 0.0}),
+    }
+    assert fired(alerts.evaluate(rows)) == [("AAPL", "AAPL: ATR14 > 5"), ("MSFT", "MSFT: MACD cruza abajo MACD_signal")]
+    rows = {"AAPL": row(2, last={"ATR14": 7.0}), "MSFT": row(2, last={"ATR14": 7.0})}
+    assert alerts.evaluate(rows) == []
+    rows = {"AAPL": row(3, last={"ATR14": 4.0})}
+    assert alerts.evaluate(rows) == []
+    rows = {"AAPL": row(4, last={"ATR14": 5.5})}
+    assert fired(alerts.evaluate(rows)) == [("AAPL", "AAPL: ATR14 > 5")]
+
+
+def test_editing_rules_keeps_the_armed_state():
+    alerts = engine("RSI < 30")
+    assert len(alerts.evaluate({"AAPL": row(1, last={"RSI": 25.0})})) == 1
+
+    # Adding a rule rechecks every ticker, but the one already true stays quiet
+    assert alerts.add_rule(parse_rule("RSI < 50"))
+    assert not alerts.add_rule(parse_rule("rsi < 50"))
+    assert fired(alerts.evaluate({"AAPL": row(1, last={"RSI": 25.0})})) == [("AAPL", "RSI < 50")]
+
+    # A removed and re-added rule starts disarmed
+    alerts.remove_rule("RSI < 30")
+    alerts.add_rule(parse_rule("RSI < 30"))
+    assert fired(alerts.evaluate({"AAPL": row(1, last={"RSI": 25.0})})) == [("AAPL", "RSI < 30")]
+
+
+def test_missing_values_never_fire():
+    alerts = engine("RSI < 30", "precio cruza abajo SMA50")
+    assert alerts.evaluate({"AAPL": row(1, last={"precio": 10.0})}) == []
+    assert alerts.evaluate({"AAPL": None, "MSFT": {"valores": None}}) == []
@@ -0,0 +1,119 @@
+import numpy as np
+import pandas as pd
+
+from bars import NS_PER_DAY, BarSeries, merge, normalize, resample
+
+DAY0 = pd.Timestamp("2024-01-01").value  # a Monday
+
+
+def series(days, close, open=None, high=None, low=None, volume=None, tz=""):
+    """Bars at midnight of the given day offsets, missing columns copy the close"""
+    close = np.asarray(close, dtype=np.float64)
+    timestamps = DAY0 + np.asarray(days, dtype=np.int64) * NS_PER_DAY
+
+    def column(values, default):
+        return default.copy() if values is None else np.asarray(values, dtype=np.float64)
+
+    return BarSeries(
+        timestamps, column(open, close), column(high, close), column(low, close), close,
+        column(volume, np.ones(len(close))), tz
+    )
+
+
+def test_normalize_sorts_and_keeps_last_duplicate():
+    bars = normalize(series([2, 0, 1, 1], [12.0, 10.0, 11.0, 11.5]))
+    assert (bars.timestamps == DAY0 + np.arange(3) * NS_PER_DAY).all()
+    assert bars.close.tolist() == [10.0, 11.5, 12.0]
+
+
+def test_normalize_fills_gaps_with_flat_bars():
+    bars = normalize(series(
+        range(4), [10.0, np.nan, 0.0, 13.0],
+        open=[9.5, np.nan, 10.2, np.nan], high=[10.5, 11.0, np.nan, 13.5],
+        volume=[100, 50, np.nan, np.nan]
+    ))
+    assert bars.close.tolist() == [10.0, 10.0, 10.0, 13.0]
+    # A gap bar is flat and without volume whatever partial prices it had
+    assert bars.open[1:3].tolist() == bars.high[1:3].tolist() == bars.low[1:3].tolist() == [10.0, 10.0]
+    assert bars.volume.tolist() == [100.0, 0.0, 0.0, 0.0]
+    # A missing open takes the close and the range is widened to contain it
+    assert bars.open[3] == 13.0 and bars.high[3] == 13.5 and bars.low[3] == 13.0
+
+
+def test_normalize_drops_bars_before_the_first_close():
+    bars = normalize(series(range(4), [np.nan, np.nan, 20.0, 21.0], open=[1.0, np.nan, 20.0, 21.0]))
+    assert len(bars) == 2
+    assert bars.timestamps[0] == DAY0 + 2 * NS_PER_DAY
+
+    assert normalize(series(range(2), [np.nan, -1.0])).empty
+
+
+def test_from_download_converts_to_utc_and_keeps_the_zone():
+    index = pd.date_range("2024-03-08 09:30", periods=3, freq="D", tz="America/New_York")
+    df = pd.DataFrame({
+        ("Open", "AAPL"): [1.0, 2.0, 3.0], ("High", "AAPL"): [1.0, 2.0, 3.0],
+        ("Low", "AAPL"): [1.0, 2.0, 3.0], ("Close", "AAPL"): [1.0, 2.0, 3.0],
+        ("Volume", "AAPL"): [1.0, 1.0, 1.0],
+    }, index=index)
+    df.columns = pd.MultiIndex.from_tuples(df.columns)
+
+    bars = BarSeries.from_download(df, "AAPL")
+    assert bars.tz == "America/New_York"
+    assert (bars.timestamps == index.tz_convert("UTC").tz_localize(None).as_unit("ns").asi8).all()
+    # 14:30 UTC before the DST change on the 10th, 13:30 after it
+    assert pd.Timestamp(bars.timestamps[0]).hour == 14
+    assert pd.Timestamp(bars.timestamps[2]).hour == 13
+    assert (bars.dates() == index).all()
+
+
+def test_merge_replaces_the_tail():
+    old = series(range(5), [10.0, 11.0, 12.0, 13.0, 14.0])
+    new = series([3, 4, 5], [13.0, 14.5, 15.0])
+    merged = merge(old, new)
+    assert (merged.timestamps == DAY0 + np.arange(6) * NS_PER_DAY).all()
+    assert merged.close.tolist() == [10.0, 11.0, 12.0, 13.0, 14.5, 15.0]
+
+
+def test_merge_rescales_after_an_adjustment():
+    old = series(range(4), [100.0, 102.0, 104.0, 106.0], volume=[10.0] * 4)
+    # A 2:1 split: the shared bars come back halved
+    new = series([2, 3, 4], [52.0, 53.0, 54.0], volume=[20.0] * 3)
+    merged = merge(old, new)
+    assert np.allclose(merged.close, [50.0, 51.0, 52.0, 53.0, 54.0])
+    assert np.allclose(merged.volume[:2], [20.0, 20.0])
+
+
+def test_merge_leaves_old_bars_past_a_gap():
+    old = series(range(3), [10.0, 11.0, 12.0])
+    merged = merge(old, series([10, 11], [20.0, 21.0]))
+    assert len(merged) == 5
+    assert merged.close.tolist() == [10.0, 11.0, 12.0, 20.0, 21.0]
+    assert merge(old, series([], [])) is old
+
+
+def test_resample_weekly_across_gaps():
+    # Mon-Fri, a missing week, then Mon-Tue
+    days = [0, 1, 2, 3, 4, 14, 15]
+    bars = series(
+        days, [1.0, 2.0, 3.0, 4.0, 5.0, 6.0, 7.0],
+        open=[0.5, 2.0, 3.0, 4.0, 5.0, 6.5, 7.0], high=[1.0, 9.0, 3.0, 4.0, 5.0, 6.5, 8.0],
+        low=[0.5, 2.0, 0.1, 4.0, 5.0, 6.0, 7.0], volume=[1, 2, 3, 4, 5, 6, 7]
+    )
+    weekly = resample(bars, "1wk")
+    assert (weekly.timestamps == DAY0 + np.array([0, 14]) * NS_PER_DAY).all()
+    assert weekly.open.tolist() == [0.5, 6.5]
+    assert weekly.high.tolist() == [9.0, 8.0]
+    assert weekly.low.tolist() == [0.1, 6.0]
+    assert weekly.close.tolist() == [5.0, 7.0]
+    assert weekly.volume.tolist() == [15.0, 13.0]
+
+
+def test_resample_daily_uses_the_local_day():
+    # Hourly bars from 20:00 to 23:00 New York time span two UTC days but one local day
+    index = pd.date_range("2024-01-02 20:00", periods=4, freq="h", tz="America/New_York")
+    utc = index.tz_convert("UTC").tz_localize(None).as_unit("ns").asi8
+    bars = BarSeries(utc, *(np.arange(1.0, 5.0) for _ in range(5)), tz="America/New_York")
+    daily = resample(bars, "1d")
+    assert len(daily) == 1
+    assert daily.close[0] == 4.0 and daily.volume[0] == 10.0
+    assert resample(series([], []), "1d").empty
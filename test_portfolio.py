@@ -0,0 +1,106 @@
+import numpy as np
+import pandas as pd
+
+from portfolio import BENCHMARK, HISTORY, MIN_OBSERVATIONS, REBUILD_EVERY, WINDOW, RiskModel
+
+TICKERS = ("AAPL", "MSFT", "XOM", BENCHMARK)
+
+
+def random_closes(days, tickers=TICKERS, seed=0):
+    """(days, tickers) random walk of closes"""
+    rng = np.random.default_rng(seed)
+    returns = rng.normal(0.0005, 0.02, size=(days, len(tickers)))
+    return 100 * np.exp(np.cumsum(returns, axis=0))
+
+
+def build(prices, keys, tickers=TICKERS):
+    return RiskModel.build({t: (keys, prices[:, i]) for i, t in enumerate(tickers)})
+
+
+def expected_covariance(prices):
+    """Pairwise covariance of the last WINDOW log returns, the slow way"""
+    returns = np.log(prices[1:] / prices[:-1])[-WINDOW:]
+    return pd.DataFrame(returns).cov(min_periods=MIN_OBSERVATIONS).to_numpy()
+
+
+def test_build_matches_np_cov():
+    prices = random_closes(HISTORY + 50)
+    model = build(prices, np.arange(len(prices)))
+    returns = np.log(prices[1:] / prices[:-1])[-WINDOW:]
+    assert np.allclose(model.covariance(), np.cov(returns, rowvar=False))
+    assert len(model.keys) == HISTORY + 1
+
+
+def test_incremental_updates_match_np_cov():
+    prices = random_closes(WINDOW + 2 * REBUILD_EVERY + 40, seed=1)
+    start = WINDOW + 10
+    model = build(prices[:start], np.arange(start))
+
+    # Past a rebuild, so both the outer product updates and the reset are exercised
+    for day in range(start, len(prices)):
+        quotes = {t: (day, prices[day, i]) for i, t in enumerate(TICKERS)}
+        assert model.update(quotes)
+        returns = np.log(prices[1:day + 1] / prices[:day])[-WINDOW:]
+        assert np.allclose(model.covariance(), np.cov(returns, rowvar=False), rtol=1e-9, atol=1e-14)
+
+
+def test_intraday_quotes_replace_the_last_day():
+    prices = random_closes(WINDOW + 30, seed=2)
+    keys = np.arange(len(prices))
+    model = build(prices[:-1], keys[:-1])
+
+    # The benchmark opens the new day first, the others keep their close until they quote
+    day = keys[-1]
+    model.update({BENCHMARK: (day, prices[-1, 3])})
+    partial = prices.copy()
+    partial[-1, :3] = prices[-2, :3]
+    assert np.allclose(model.covariance(), expected_covariance(partial))
+
+    # Updated closes of the same day replace the row instead of adding one
+    model.update({"AAPL": (day, prices[-1, 0] * 1.01), "MSFT": (day, prices[-1, 1])})
+    partial[-1, :2] = prices[-1, 0] * 1.01, prices[-1, 1]
+    assert np.allclose(model.covariance(), expected_covariance(partial))
+    model.update({t: (day, prices[-1, i]) for i, t in enumerate(TICKERS)})
+    assert np.allclose(model.covariance(), expected_covariance(prices))
+    assert len(model.keys) == len(prices)
+
+    # Nothing new: unchanged, and quotes for a later day than the calendar wait
+    assert not model.update({t: (day, prices[-1, i]) for i, t in enumerate(TICKERS)})
+    assert not model.update({"AAPL": (day + 1, 1.0)})
+
+
+def test_missing_history_uses_common_days():
+    prices = random_closes(WINDOW + 40, seed=3)
+    keys = np.arange(len(prices))
+    # XOM lists late, MSFT too late to have enough common days in the window
+    listed = {"AAPL": 0, "MSFT": len(prices) - MIN_OBSERVATIONS + 5, "XOM": len(prices) - 100, BENCHMARK: 0}
+    closes = {t: (keys[listed[t]:], prices[listed[t]:, i]) for i, t in enumerate(TICKERS)}
+    model = RiskModel.build(closes)
+
+    masked = prices.copy()
+    for i, ticker in enumerate(TICKERS):
+        masked[:listed[ticker], i] = np.nan
+    expected = expected_covariance(masked)
+    cov = model.covariance()
+    assert np.array_equal(np.isnan(cov), np.isnan(expected))
+    assert np.isnan(cov[1]).all()
+    assert np.allclose(cov, expected, equal_nan=True)
+
+    # New days keep the pairwise sums in step
+    for day in range(len(prices), len(prices) + 30):
+        quote = random_closes(1, seed=day)[0]
+        model.update({t: (day, quote[i]) for i, t in enumerate(TICKERS)})
+        masked = np.vstack((masked, quote))
+    assert np.allclose(model.covariance(), expected_covariance(masked), equal_nan=True)
+
+
+def test_betas_and_volatility():
+    prices = random_closes(WINDOW + 1, seed=4)
+    model = build(prices, np.arange(len(prices)))
+    returns = np.log(prices[1:] / prices[:-1])
+    cov = np.cov(returns, rowvar=False)
+    assert np.allclose(model.betas(), cov[:, 3] / cov[3, 3])
+    assert np.isclose(model.betas()[3], 1.0)
+    assert np.allclose(model.volatility(), np.sqrt(np.diag(cov) * 252))
+    weights = np.array([1, 1, 1, 0]) / 3
+    assert np.isclose(model.portfolio_volatility(), np.sqrt(weights @ cov @ weights * 252))
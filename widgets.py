@@ -1,9 +1,40 @@
 import math
+import sys
+from collections import OrderedDict
+import numpy as np
 import pyqtgraph as pg
 from PyQt6.QtCore import Qt, QSize, QRectF, pyqtSignal, QPointF
-from PyQt6.QtGui import QPainter, QPen, QBrush, QColor, QFont,QDesktopServices, QRadialGradient
-from PyQt6.QtWidgets import QWidget, QSizePolicy, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QComboBox
-from PyQt6.QtCore import QUrl
+from PyQt6.QtGui import QPainter, QPen, QBrush, QColor, QFont,QDesktopServices, QRadialGradient, QPixmap, QPolygonF
+from PyQt6.QtWidgets import (
+    QWidget, QSizePolicy, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QComboBox,
+    QTableView, QHeaderView, QAbstractItemView, QCheckBox, QGridLayout,
+    QTableWidget, QTableWidgetItem, QLineEdit, QListWidget, QListWidgetItem
+)
+from PyQt6.QtCore import QUrl, QAbstractTableModel, QAbstractListModel, QModelIndex
+
+import indicadores
+import keypoints
+import memory
+import sentiment
+from bars import align
+
+STATUS_COLORS = {
+    "good": "#4CAF50",
+    "neutral": "#FFC107",
+    "bad": "#F44336",
+}
+DEFAULT_STATUS_COLOR = "#9E9E9E"
+
+# Sentiment labels shown with the indicator colors
+SENTIMENT_STATES = {
+    "Positivo": "good",
+    "Neutral": "neutral",
+    "Negativo": "bad",
+}
+
+def indicator_display(name: str, data_tuple):
+    """Returns (display_value, state, info) for an indicator result tuple (valores..., estado, info)"""
+    return indicadores.mostrar(name, data_tuple), data_tuple[-2], data_tuple[-1]
 
 
 
@@ -124,13 +155,72 @@ class WheelRatingSelector(QWidget):
 class ChartWidget(QWidget):
     
     period_changed = pyqtSignal(str)
+
+    BASE_HEIGHT = 320
+    SUB_PANE_HEIGHT = 130
+
+    # Moving averages that can be drawn over the price
+    OVERLAY_COLORS = {
+        "SMA10": "#f59e0b",
+        "SMA50": "#16a34a",
+        "SMA200": "#dc2626",
+    }
     
+    # Compared tickers, in the order they are added
+    COMPARE_COLORS = ["#9333ea", "#ea580c", "#0d9488", "#db2777", "#65a30d", "#0284c7"]
+
+    compare_changed = pyqtSignal(list)
+
     def __init__(self, parent=None):
         super().__init__(parent)
 
+        self._x = None
+        self._series = {}
+        self._overlay_items = []
+
+        # Current chart, kept to redraw it when the comparison changes
+        self._dates = None
+        self._prices = None
+        self._keys = None
+        self._ticker = ""
+        self._period = None
+
+        self.compare_tickers = []
+        self._compare_data = {}   # ticker -> (join keys, closes) for the current period
+        self._compare_items = {}  # ticker -> plot item
+
         layout = QVBoxLayout(self)
         
         top_row = QHBoxLayout()
+
+        # Overlays and sub-pane are drawn from the series already computed by the task
+        self.overlay_checks = {}
+        for name in self.OVERLAY_COLORS:
+            check = QCheckBox(name)
+            check.setFocusPolicy(Qt.FocusPolicy.NoFocus)
+            check.toggled.connect(self._draw_overlays)
+            self.overlay_checks[name] = check
+            top_row.addWidget(check)
+
+        self.sub_pane_list = QComboBox()
+        self.sub_pane_list.addItems(['Sin panel', 'RSI', 'MACD'])
+        self.sub_pane_list.setFixedWidth(175)
+        self.sub_pane_list.currentIndexChanged.connect(self._draw_sub_pane)
+        top_row.addWidget(self.sub_pane_list)
+
+        # Other tickers drawn over this one, rebased so they can be compared
+        self.compare_input = QLineEdit()
+        self.compare_input.setPlaceholderText("Comparar con (ej: MSFT, XRP-USD)")
+        self.compare_input.setFixedWidth(230)
+        self.compare_input.returnPressed.connect(self._on_compare_entered)
+        top_row.addWidget(self.compare_input)
+
+        self.compare_mode = QComboBox()
+        self.compare_mode.addItems(['Base 100', '% cambio'])
+        self.compare_mode.setFixedWidth(120)
+        self.compare_mode.currentIndexChanged.connect(self._redraw)
+        top_row.addWidget(self.compare_mode)
+
         top_row.addStretch()
         
         self.droplist = QComboBox()
@@ -153,7 +243,18 @@ class ChartWidget(QWidget):
         self.plot.setLabel('bottom', 'Días')
         self.plot.getAxis('bottom').setTicks([])
         self.plot.getAxis('left').setTicks([])
+        self.plot.addLegend(offset=(10, 10))
         layout.addWidget(self.plot)
+
+        # RSI / MACD pane, shares the x axis with the price plot
+        self.sub_plot = pg.PlotWidget()
+        self.sub_plot.showGrid(x=True, y=True, alpha=0.3)
+        self.sub_plot.setBackground("w")
+        self.sub_plot.setFixedHeight(self.SUB_PANE_HEIGHT)
+        self.sub_plot.getAxis('bottom').setTicks([])
+        self.sub_plot.setXLink(self.plot)
+        self.sub_plot.hide()
+        layout.addWidget(self.sub_plot)
         
         self.droplist.currentIndexChanged.connect(self._on_period_changed)
     
@@ -161,23 +262,50 @@ class ChartWidget(QWidget):
         text = self.droplist.itemText(index)
         self.period_changed.emit(text)
 
-    def update_data(self, dates, prices, ticker: str, period: str):
+    def update_data(self, dates, prices, ticker: str, period: str, series=None, keys=None):
         """
         Actualiza la gráfica con datos nuevos.
-        dates: lista de pd.Timestamp
-        prices: lista de floats
+        dates: pd.DatetimeIndex
+        prices: array de floats (BarSeries.close)
         ticker: string del ticker
         period: string del periodo
+        series: dict de arrays de indicadores alineados con prices
+        keys: claves para alinear los tickers comparados (bars.join_keys)
         """
+        # Compared series of another period use other bars, they are requested again
+        if period != self._period:
+            self._compare_data = {}
+
+        self._dates = dates
+        self._prices = prices
+        self._keys = keys
+        self._ticker = ticker
+        self._period = period
+        self._x = np.arange(len(dates))
+        self._series = series or {}
+        self._redraw()
+
+    def _redraw(self):
+        if self._x is None:
+            return
         self.plot.clear()
+        self._overlay_items = []
+        self._compare_items = {}
+        self._draw_price()
+        self._draw_overlays()
+        self._draw_sub_pane()
 
-        x = list(range(len(dates)))
+    def _draw_price(self):
+        dates, prices, ticker, period, x = self._dates, self._prices, self._ticker, self._period, self._x
 
-        self.plot.plot(
-            x, prices,
-            pen=pg.mkPen("#2563eb", width=3),
-            symbol='o', symbolSize=5, symbolBrush="#2563eb"
-        )
+        if self.compare_tickers:
+            self._draw_comparison()
+        else:
+            self.plot.plot(
+                x, prices,
+                pen=pg.mkPen("#2563eb", width=3),
+                symbol='o', symbolSize=5, symbolBrush="#2563eb"
+            )
         
         self.plot.enableAutoRange(axis=pg.ViewBox.XYAxes, enable=True)
         
@@ -188,7 +316,8 @@ class ChartWidget(QWidget):
             "ytd": "Evolución YTD",
             "max": "Evolución histórica"
         }
-        self.plot.setTitle(f"{titles.get(period, 'Evolución')} - {ticker}", color="#333", size="14pt")
+        if not self.compare_tickers:
+            self.plot.setTitle(f"{titles.get(period, 'Evolución')} - {ticker}", color="#333", size="14pt")
         
         # Interval adjustment
         if period == "1d":      
@@ -214,7 +343,12 @@ class ChartWidget(QWidget):
         
         self.plot.getAxis('bottom').setTicks([tick_labels])
 
-        min_price, max_price = min(prices), max(prices)
+        # Rebased curves keep pyqtgraph's own ticks
+        if self.compare_tickers:
+            return
+
+        self.plot.setLabel('left', 'Precio')
+        min_price, max_price = float(np.nanmin(prices)), float(np.nanmax(prices))
         step = (max_price - min_price) / 6 if max_price > min_price else 1
         yticks = [
             (round(min_price + i * step, 2), str(round(min_price + i * step, 2)))
@@ -222,7 +356,122 @@ class ChartWidget(QWidget):
         ]
         self.plot.getAxis('left').setTicks([yticks])
 
+    def _rebase(self, values):
+        """Base 100 or percent change from the first value shown"""
+        valid = np.flatnonzero(np.isfinite(values))
+        if not len(valid):
+            return values
+        rebased = values / values[valid[0]]
+        return rebased * 100 if self.compare_mode.currentIndex() == 0 else (rebased - 1) * 100
+
+    def _draw_comparison(self):
+        mode = self.compare_mode.currentText()
+        self.plot.setTitle(f"Comparación ({mode}) - {self._ticker}", color="#333", size="14pt")
+        self.plot.setLabel('left', mode)
+        self.plot.getAxis('left').setTicks(None)
+        self.plot.plot(
+            self._x, self._rebase(np.asarray(self._prices, dtype=np.float64)),
+            pen=pg.mkPen("#2563eb", width=3), name=self._ticker
+        )
+        for ticker in self.compare_tickers:
+            if ticker in self._compare_data:
+                self._draw_compare_curve(ticker)
+
+    def _draw_compare_curve(self, ticker: str):
+        keys, closes = self._compare_data[ticker]
+        values = self._rebase(align(self._keys, keys, closes))
+        item = self._compare_items.get(ticker)
+        if item is not None:
+            item.setData(self._x, values, connect='finite')
+            return
+        color = self.COMPARE_COLORS[self.compare_tickers.index(ticker) % len(self.COMPARE_COLORS)]
+        self._compare_items[ticker] = self.plot.plot(
+            self._x, values, pen=pg.mkPen(color, width=2), connect='finite', name=ticker
+        )
+
+    def _on_compare_entered(self):
+        text = self.compare_input.text().upper().replace(",", " ")
+        tickers = []
+        for ticker in text.split():
+            if ticker != self._ticker and ticker not in tickers:
+                tickers.append(ticker)
+        self.set_compare(tickers)
+        self.compare_changed.emit(tickers)
+
+    def set_compare(self, tickers: list):
+        """Sets the compared tickers, their curves appear as add_compare_series delivers them"""
+        self.compare_tickers = list(tickers)
+        self._compare_data = {t: d for t, d in self._compare_data.items() if t in tickers}
+        self._redraw()
+
+    def add_compare_series(self, period: str, ticker: str, keys, closes):
+        """Draws or updates a single compared curve, without touching the others"""
+        if period != self._period or ticker not in self.compare_tickers or self._keys is None:
+            return
+        self._compare_data[ticker] = (keys, closes)
+        self._draw_compare_curve(ticker)
+
+    def _draw_overlays(self):
+        for item in self._overlay_items:
+            self.plot.removeItem(item)
+        self._overlay_items = []
+
+        # Moving averages are in price units, they don't apply to rebased curves
+        if self._x is None or self.compare_tickers:
+            return
+
+        for name, check in self.overlay_checks.items():
+            if check.isChecked() and name in self._series:
+                item = self.plot.plot(
+                    self._x, self._series[name],
+                    pen=pg.mkPen(self.OVERLAY_COLORS[name], width=2),
+                    connect='finite'
+                )
+                self._overlay_items.append(item)
+
+    def _draw_sub_pane(self):
+        self.sub_plot.clear()
+        mode = self.sub_pane_list.currentText()
+
+        # Modes are named after their series, a disabled indicator leaves the pane empty
+        if self._x is None or mode not in self._series:
+            self.sub_plot.hide()
+            self.setFixedHeight(self.BASE_HEIGHT)
+            return
+
+        x = self._x
+        if mode == 'RSI':
+            self.sub_plot.plot(x, self._series['RSI'], pen=pg.mkPen("#6366f1", width=2), connect='finite')
+            for level in (30, 70):
+                self.sub_plot.addItem(pg.InfiniteLine(
+                    pos=level, angle=0, pen=pg.mkPen("#9E9E9E", style=Qt.PenStyle.DashLine)
+                ))
+            self.sub_plot.setYRange(0, 100)
+        else:
+            hist = np.nan_to_num(self._series['MACD_hist'])
+            brushes = [pg.mkBrush("#4CAF50" if h >= 0 else "#F44336") for h in hist]
+            self.sub_plot.addItem(pg.BarGraphItem(x=x, height=hist, width=0.8, brushes=brushes, pen=None))
+            self.sub_plot.plot(x, self._series['MACD'], pen=pg.mkPen("#2563eb", width=2), connect='finite')
+            self.sub_plot.plot(x, self._series['MACD_signal'], pen=pg.mkPen("#f59e0b", width=2), connect='finite')
+            self.sub_plot.enableAutoRange(axis=pg.ViewBox.YAxis, enable=True)
+
+        self.sub_plot.setLabel('left', mode)
+        self.sub_plot.show()
+        self.setFixedHeight(self.BASE_HEIGHT + self.SUB_PANE_HEIGHT)
+
     def reset(self):
+        self._x = None
+        self._series = {}
+        self._overlay_items = []
+        self._dates = self._prices = self._keys = None
+        self._period = None
+        self.compare_tickers = []
+        self._compare_data = {}
+        self._compare_items = {}
+        self.compare_input.clear()
+        self.sub_plot.clear()
+        self.sub_plot.hide()
+        self.setFixedHeight(self.BASE_HEIGHT)
         self.plot.clear()
         self.plot.setTitle("")
         self.plot.setLabel('left', 'Precio')
@@ -249,10 +498,11 @@ class ChartWidget(QWidget):
 class NewsDetailPopup(QWidget):
     """
     Un widget emergente para mostrar los detalles de una noticia sin usar QDialog.
+    Se crea una sola vez y se reutiliza con set_news para cada noticia.
     """
-    def __init__(self, news_item: dict, parent=None):
+    def __init__(self, news_item: dict | None = None, parent=None):
         super().__init__(parent)
-        self.news_item = news_item
+        self.news_item = {}
 
         # Configurar como una ventana de herramientas flotante que aparece sobre la principal
         self.setWindowFlags(Qt.WindowType.Dialog)
@@ -266,21 +516,20 @@ class NewsDetailPopup(QWidget):
         layout.setSpacing(10)
 
         # Título
-        title_label = QLabel(self.news_item.get('title', 'Sin título'))
-        title_label.setStyleSheet("font-size: 16px; font-weight: bold;")
-        title_label.setWordWrap(True)
-        layout.addWidget(title_label)
+        self.title_label = QLabel()
+        self.title_label.setStyleSheet("font-size: 16px; font-weight: bold;")
+        self.title_label.setWordWrap(True)
+        layout.addWidget(self.title_label)
 
         # Publicador y fecha
-        meta_text = f"<i>{self.news_item.get('publisher', '')} - {self.news_item.get('time', '')}</i>"
-        meta_label = QLabel(meta_text)
-        meta_label.setStyleSheet("color: #555;")
-        layout.addWidget(meta_label)
+        self.meta_label = QLabel()
+        self.meta_label.setStyleSheet("color: #555;")
+        layout.addWidget(self.meta_label)
 
         # Resumen
-        summary_label = QLabel(self.news_item.get('summary', 'No hay resumen disponible.'))
-        summary_label.setWordWrap(True)
-        layout.addWidget(summary_label, stretch=1) # Ocupa el espacio disponible
+        self.summary_label = QLabel()
+        self.summary_label.setWordWrap(True)
+        layout.addWidget(self.summary_label, stretch=1) # Ocupa el espacio disponible
 
         # Botones
         button_layout = QHBoxLayout()
@@ -296,13 +545,219 @@ class NewsDetailPopup(QWidget):
         button_layout.addWidget(close_button)
         layout.addLayout(button_layout)
 
+        if news_item:
+            self.set_news(news_item)
+
+    def clear(self):
+        """Cierra el popup y suelta la noticia mostrada"""
+        self.close()
+        self.news_item = {}
+        self.title_label.clear()
+        self.meta_label.clear()
+        self.summary_label.clear()
+
+    def set_news(self, news_item: dict):
+        """Muestra otra noticia en el mismo popup"""
+        self.news_item = news_item
+        self.title_label.setText(news_item.get('title', 'Sin título'))
+        self.meta_label.setText(f"<i>{news_item.get('publisher', '')} - {news_item.get('time', '')}</i>")
+        self.summary_label.setText(news_item.get('summary', 'No hay resumen disponible.'))
+
     def open_link(self):
         """Abre el enlace de la noticia en el navegador y cierra el popup."""
         link = self.news_item.get('link')
         if link:
             QDesktopServices.openUrl(QUrl(link))
         self.close()
-        
+
+# News feed model
+
+class NewsListModel(QAbstractListModel):
+    """
+    News feed for the current ticker.
+    Stories are kept per ticker and appended without resetting the view;
+    rows are exposed in batches through fetchMore so long feeds don't block
+    the UI thread. Tooltips are built only when the view asks for them.
+    """
+
+    BATCH_SIZE = 50
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._by_ticker = OrderedDict()   # ticker -> list of news dicts, least recently shown first
+        self._keys = {}        # ticker -> set of links/titles already stored
+        self._ticker = None
+        self._items = []
+        self._loaded = 0
+        self._placeholder = None
+        self._bytes = {}       # ticker -> approximate size of its stories
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return 1 if self._placeholder else self._loaded
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+
+        if self._placeholder:
+            return self._placeholder if role == Qt.ItemDataRole.DisplayRole else None
+
+        n = self._items[index.row()]
+        if role == Qt.ItemDataRole.DisplayRole:
+            return f"{n['title']} ({n['publisher']})"
+        if role == Qt.ItemDataRole.ToolTipRole:
+            tone = f"Sentimiento: {sentiment.label(n['sentiment'])} ({n['sentiment']:+.2f})\n" if 'sentiment' in n else ""
+            return f"Doble clic para ver detalles...\n{tone}\n{n['summary']}"
+        if role == Qt.ItemDataRole.ForegroundRole and 'sentiment' in n:
+            state = SENTIMENT_STATES[sentiment.label(n['sentiment'])]
+            return QColor(STATUS_COLORS[state]) if state != "neutral" else None
+        if role == Qt.ItemDataRole.UserRole:
+            return n
+        return None
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and not self._placeholder and self._loaded < len(self._items)
+
+    def fetchMore(self, parent=QModelIndex()):
+        count = min(self.BATCH_SIZE, len(self._items) - self._loaded)
+        if count <= 0:
+            return
+        self.beginInsertRows(QModelIndex(), self._loaded, self._loaded + count - 1)
+        self._loaded += count
+        self.endInsertRows()
+
+    def show_ticker(self, ticker: str) -> bool:
+        """Switches the feed to a ticker, returns True if it already has stories"""
+        self.beginResetModel()
+        self._ticker = ticker
+        self._items = self._by_ticker.setdefault(ticker, [])
+        self._by_ticker.move_to_end(ticker)
+        self._keys.setdefault(ticker, set())
+        self._loaded = 0
+        self._placeholder = None
+        self.endResetModel()
+        if self.canFetchMore():
+            self.fetchMore()
+        return bool(self._items)
+
+    def append_news(self, ticker: str, news: list):
+        """Stores new stories for the ticker, only the unseen ones are inserted"""
+        items = self._by_ticker.setdefault(ticker, [])
+        keys = self._keys.setdefault(ticker, set())
+
+        added = 0
+        for n in news:
+            key = n.get('link') or n.get('title')
+            if key in keys:
+                continue
+            keys.add(key)
+            items.append(n)
+            added += 1
+            self._bytes[ticker] = self._bytes.get(ticker, 0) + _story_size(n)
+
+        if ticker != self._ticker:
+            return
+
+        if self._placeholder:
+            self.beginResetModel()
+            self._placeholder = None
+            self.endResetModel()
+
+        # Show the first batch right away, the view pulls the rest when scrolled
+        if added and self.canFetchMore() and self._loaded < self.BATCH_SIZE:
+            self.fetchMore()
+
+    def set_placeholder(self, text: str):
+        """Shows a single message row instead of the stories"""
+        self.beginResetModel()
+        self._placeholder = text
+        self.endResetModel()
+
+    def news(self, ticker: str) -> list:
+        return self._by_ticker.get(ticker, [])
+
+    def nbytes(self) -> int:
+        return sum(self._bytes.values())
+
+    def trim(self, target: int):
+        """Forgets the stories of the least recently shown tickers, never the current one"""
+        for ticker in list(self._by_ticker):
+            if self.nbytes() <= target:
+                break
+            if ticker == self._ticker:
+                continue
+            del self._by_ticker[ticker]
+            self._keys.pop(ticker, None)
+            self._bytes.pop(ticker, None)
+
+
+def _story_size(story: dict) -> int:
+    return sys.getsizeof(story) + sum(sys.getsizeof(v) for v in story.values() if v is not None)
+
+class KeyPointsList(QListWidget):
+    """Las oraciones más representativas de las noticias, doble clic abre la noticia de origen"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWordWrap(True)
+        self.setAlternatingRowColors(True)
+        self.itemDoubleClicked.connect(self._open_link)
+
+    def set_news(self, news: list):
+        self.clear()
+        points = keypoints.key_sentences(news)
+        if not points:
+            self.addItem("No hay noticias para extraer puntos clave.")
+            return
+        for point in points:
+            item = QListWidgetItem(f"• {point['sentence']}")
+            item.setToolTip(point['publisher'] or "")
+            item.setData(Qt.ItemDataRole.UserRole, point['link'])
+            self.addItem(item)
+
+    def _open_link(self, item):
+        link = item.data(Qt.ItemDataRole.UserRole)
+        if link:
+            QDesktopServices.openUrl(QUrl(link))
+
+# Search bar suggestions
+
+class SymbolCompleterModel(QAbstractListModel):
+    """
+    Suggestions for the search bar. Rows show "SYMBOL  Name" but complete
+    to the bare symbol, the filtering is done by the SymbolIndex.
+    """
+
+    def __init__(self, index, parent=None):
+        super().__init__(parent)
+        self.index = index
+        self._symbols = []
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._symbols)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        symbol = self._symbols[index.row()]
+        if role == Qt.ItemDataRole.DisplayRole:
+            name = self.index.name(symbol)
+            return f"{symbol}  {name}" if name else symbol
+        if role == Qt.ItemDataRole.EditRole:
+            return symbol
+        return None
+
+    def set_query(self, text: str):
+        symbols = self.index.search(text)
+        if symbols == self._symbols:
+            return
+        self.beginResetModel()
+        self._symbols = symbols
+        self.endResetModel()
+
+
 # Circle widget
 
 class StatusCircle(QWidget):
@@ -345,14 +800,15 @@ class IndicatorWidget(QWidget):
 
         self.circle = StatusCircle()
 
+        # Fonts and colors come from styles.qss through the object names
         self.title_label = QLabel(title)
-        self.title_label.setStyleSheet("font-weight: bold; font-size: 17px;")
+        self.title_label.setObjectName("indicatorTitle")
 
         self.value_label = QLabel(str(value))
-        self.value_label.setStyleSheet("font-size: 16px; color: #333;")
+        self.value_label.setObjectName("indicatorValue")
         
         self.info_label = QLabel(info)
-        self.info_label.setStyleSheet("font-weight: bold; font-size: 16px; color: #333;")
+        self.info_label.setObjectName("indicatorInfo")
 
         h_layout = QHBoxLayout()
         h_layout.setContentsMargins(0, 0, 0, 0)
@@ -369,25 +825,669 @@ class IndicatorWidget(QWidget):
         h_layout.addLayout(text_layout)
         self.setLayout(h_layout)
 
+        self._status = None
         self.setStatus(status)
         self.setSizePolicy(QSizePolicy.Policy.Maximum, QSizePolicy.Policy.Fixed)
         self.setContentsMargins(10, 10, 10, 10)
 
     def setStatus(self, status: str):
         """Changes color depending on status"""
-        if status == "good":
-            self.circle.setColor("#4CAF50")
-            self.info_label.setStyleSheet("color: #4CAF50; font-weight: bold; font-size: 16px;")
-        elif status == "neutral":
-            self.circle.setColor("#FFC107")
-            self.info_label.setStyleSheet("color: #FFC107; font-weight: bold; font-size: 16px;")
-        elif status == "bad":
-            self.circle.setColor("#F44336")
-            self.info_label.setStyleSheet("color: #F44336; font-weight: bold; font-size: 16px;")
-        else:
-            self.circle.setColor("#9E9E9E")
-            self.info_label.setStyleSheet("color: #9E9E9E; font-weight: bold; font-size: 16px;")
+        if status not in STATUS_COLORS:
+            status = "ninguno"
+        if status == self._status:
+            return
+        self._status = status
+
+        self.circle.setColor(STATUS_COLORS.get(status, DEFAULT_STATUS_COLOR))
+
+        # The label color is picked by the [status="..."] rules in styles.qss,
+        # only this label is re-polished instead of parsing a new stylesheet
+        self.info_label.setProperty("status", status)
+        style = self.info_label.style()
+        style.unpolish(self.info_label)
+        style.polish(self.info_label)
 
     def setValue(self, value: float):
         """Updates shown value"""
-        self.value_label.setText(str(value))
+        text = str(value)
+        if text != self.value_label.text():
+            self.value_label.setText(text)
+
+    def setInfo(self, info: str):
+        """Updates the state description"""
+        if info != self.info_label.text():
+            self.info_label.setText(info)
+
+class IndicatorPanel(QWidget):
+    """
+    Grid of indicator tiles.
+    Tiles are created the first time an indicator shows up and then updated
+    in place, so switching tickers never rebuilds widgets.
+    """
+
+    COLUMNS = 4  # 4 indicadores por fila
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.grid = QGridLayout(self)
+        self.grid.setContentsMargins(0, 0, 0, 0)
+        self.tiles = {}
+        # Tiles that don't come from the indicator results, update_data leaves them alone
+        self.extras = set()
+
+    def _set_tile(self, name: str, display_value, state: str, info_text: str):
+        tile = self.tiles.get(name)
+        if tile is None:
+            tile = IndicatorWidget(name, display_value, state, info_text)
+            index = len(self.tiles)
+            self.grid.addWidget(tile, index // self.COLUMNS, index % self.COLUMNS)
+            self.tiles[name] = tile
+        else:
+            tile.setValue(display_value)
+            tile.setStatus(state)
+            tile.setInfo(info_text)
+        tile.setVisible(True)
+
+    def update_data(self, datos_indicadores: dict):
+        for name, data_tuple in datos_indicadores.items():
+            self._set_tile(name, *indicator_display(name, data_tuple))
+
+        for name, tile in self.tiles.items():
+            if name not in datos_indicadores and name not in self.extras:
+                tile.setVisible(False)
+
+    def set_extra(self, name: str, display_value, state: str, info_text: str):
+        """Shows a tile that isn't an indicator, like the news sentiment"""
+        self.extras.add(name)
+        self._set_tile(name, display_value, state, info_text)
+
+    def hide_extra(self, name: str):
+        if name in self.extras:
+            self.tiles[name].setVisible(False)
+
+# Multi-timeframe table
+
+TIMEFRAME_LABELS = {
+    "1h": "1 hora",
+    "1d": "1 día",
+    "1wk": "1 semana",
+    "1mo": "1 mes",
+}
+
+class IndicatorTableModel(QAbstractTableModel):
+    """
+    Indicators as rows, timeframes as columns.
+    New indicators or timeframes insert rows/columns, value changes only emit dataChanged.
+    """
+
+    EMPTY = ("—", None)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._names = []
+        self._timeframes = []
+        self._cells = {}  # (name, timeframe) -> (text, state)
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._names)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._timeframes)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        text, state = self._cells.get((self._names[index.row()], self._timeframes[index.column()]), self.EMPTY)
+        if role == Qt.ItemDataRole.DisplayRole:
+            return text
+        if role == Qt.ItemDataRole.ForegroundRole and state is not None:
+            return QColor(STATUS_COLORS.get(state, DEFAULT_STATUS_COLOR))
+        if role == Qt.ItemDataRole.TextAlignmentRole:
+            return Qt.AlignmentFlag.AlignCenter
+        if role == Qt.ItemDataRole.UserRole:
+            return state
+        return None
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role != Qt.ItemDataRole.DisplayRole:
+            return None
+        if orientation == Qt.Orientation.Horizontal:
+            tf = self._timeframes[section]
+            return TIMEFRAME_LABELS.get(tf, tf)
+        return self._names[section]
+
+    def update_data(self, resultados: dict):
+        """resultados: {timeframe: datos_indicadores or None}"""
+        new_timeframes = [tf for tf in resultados if tf not in self._timeframes]
+        if new_timeframes:
+            first = len(self._timeframes)
+            self.beginInsertColumns(QModelIndex(), first, first + len(new_timeframes) - 1)
+            self._timeframes.extend(new_timeframes)
+            self.endInsertColumns()
+
+        new_names = []
+        for datos in resultados.values():
+            for name in (datos or {}):
+                if name not in self._names and name not in new_names:
+                    new_names.append(name)
+        if new_names:
+            first = len(self._names)
+            self.beginInsertRows(QModelIndex(), first, first + len(new_names) - 1)
+            self._names.extend(new_names)
+            self.endInsertRows()
+
+        changed = False
+        for tf, datos in resultados.items():
+            datos = datos or {}
+            for name in self._names:
+                # Not enough bars at this timeframe for the indicator's window
+                if name not in datos or math.isnan(datos[name][0]):
+                    cell = self.EMPTY
+                else:
+                    display_value, state, info_text = indicator_display(name, datos[name])
+                    cell = (f"{display_value}  ·  {info_text}", state)
+                if self._cells.get((name, tf), self.EMPTY) != cell:
+                    self._cells[(name, tf)] = cell
+                    changed = True
+
+        if changed and self._names and self._timeframes:
+            self.dataChanged.emit(
+                self.index(0, 0),
+                self.index(len(self._names) - 1, len(self._timeframes) - 1)
+            )
+
+    def clear_values(self):
+        if not self._cells:
+            return
+        self._cells = {}
+        if self._names and self._timeframes:
+            self.dataChanged.emit(
+                self.index(0, 0),
+                self.index(len(self._names) - 1, len(self._timeframes) - 1)
+            )
+
+class TimeframeTable(QTableView):
+    """View over an IndicatorTableModel, cells colored by state"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.indicator_model = IndicatorTableModel(self)
+        self.setModel(self.indicator_model)
+        self.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.setSelectionMode(QAbstractItemView.SelectionMode.NoSelection)
+        self.setFocusPolicy(Qt.FocusPolicy.NoFocus)
+        self.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        self.verticalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
+
+    def update_data(self, resultados: dict):
+        self.indicator_model.update_data(resultados)
+
+    def clear_values(self):
+        self.indicator_model.clear_values()
+
+# Watchlist
+
+# Short headers for the compact state columns
+WATCHLIST_INDICATORS = {indicador.nombre: indicador.corto for indicador in indicadores.habilitados()}
+
+def sparkline_pixmap(values, width: int, height: int) -> QPixmap:
+    """Draws closing prices as a small line, green if the period ended up, red if down"""
+    pixmap = QPixmap(width, height)
+    pixmap.fill(Qt.GlobalColor.transparent)
+
+    values = np.asarray(values, dtype=np.float64)
+    values = values[np.isfinite(values)]
+    if len(values) < 2:
+        return pixmap
+
+    low, high = float(values.min()), float(values.max())
+    span = high - low or 1.0
+    xs = np.linspace(1, width - 1, len(values))
+    ys = (height - 2) - (values - low) / span * (height - 4)
+
+    color = STATUS_COLORS["good"] if values[-1] >= values[0] else STATUS_COLORS["bad"]
+    painter = QPainter(pixmap)
+    painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+    painter.setPen(QPen(QColor(color), 1.5))
+    painter.drawPolyline(QPolygonF([QPointF(x, y) for x, y in zip(xs, ys)]))
+    painter.end()
+    return pixmap
+
+class WatchlistModel(QAbstractTableModel):
+    """
+    One row per saved ticker: price, daily change, sparkline and indicator states.
+    Sparklines are kept as pixmaps and only redrawn when their closes change.
+    """
+
+    COLUMNS = ["Ticker", "Precio", "Var. %", "Tendencia"] + list(WATCHLIST_INDICATORS.values())
+    SPARKLINE_COLUMN = 3
+    SPARKLINE_SIZE = QSize(100, 24)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._tickers = []
+        self._rows = {}        # ticker -> row dict from WatchlistRefreshTask
+        self._states = {}      # ticker -> {indicator: (state, tooltip)}
+        self._pixmaps = {}     # ticker -> (closes, QPixmap)
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._tickers)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.COLUMNS)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and orientation == Qt.Orientation.Horizontal:
+            return self.COLUMNS[section]
+        return None
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        ticker = self._tickers[index.row()]
+        column = index.column()
+        row = self._rows.get(ticker)
+
+        if role == Qt.ItemDataRole.UserRole:
+            return ticker
+        if role == Qt.ItemDataRole.TextAlignmentRole:
+            return Qt.AlignmentFlag.AlignCenter
+
+        if column == 0:
+            return ticker if role == Qt.ItemDataRole.DisplayRole else None
+        if row is None:
+            return "—" if role == Qt.ItemDataRole.DisplayRole and column < self.SPARKLINE_COLUMN else None
+
+        if column == 1 and role == Qt.ItemDataRole.DisplayRole:
+            return f"{row['price']:.2f}"
+        if column == 2:
+            if role == Qt.ItemDataRole.DisplayRole:
+                return "—" if math.isnan(row['change']) else f"{row['change'] * 100:+.2f}%"
+            if role == Qt.ItemDataRole.ForegroundRole and not math.isnan(row['change']):
+                return QColor(STATUS_COLORS["good" if row['change'] >= 0 else "bad"])
+        if column == self.SPARKLINE_COLUMN and role == Qt.ItemDataRole.DecorationRole:
+            return self._pixmaps[ticker][1]
+        if column > self.SPARKLINE_COLUMN:
+            name = list(WATCHLIST_INDICATORS)[column - self.SPARKLINE_COLUMN - 1]
+            state, tooltip = self._states[ticker].get(name, (None, None))
+            if state is None:
+                return "—" if role == Qt.ItemDataRole.DisplayRole else None
+            if role == Qt.ItemDataRole.DisplayRole:
+                return "●"
+            if role == Qt.ItemDataRole.ForegroundRole:
+                return QColor(STATUS_COLORS.get(state, DEFAULT_STATUS_COLOR))
+            if role == Qt.ItemDataRole.ToolTipRole:
+                return tooltip
+        return None
+
+    def update_data(self, tickers: list, rows: dict):
+        """Replaces the ticker list if it changed, otherwise only changed rows are repainted"""
+        if tickers != self._tickers:
+            self.beginResetModel()
+            self._tickers = list(tickers)
+            self._rows = {}
+            self._states = {}
+            self._pixmaps = {t: p for t, p in self._pixmaps.items() if t in rows}
+            self.endResetModel()
+
+        last_column = len(self.COLUMNS) - 1
+        for position, ticker in enumerate(self._tickers):
+            row = rows.get(ticker)
+            old = self._rows.get(ticker)
+            if old is not None and row is not None and \
+                    old['timestamp'] == row['timestamp'] and old['price'] == row['price']:
+                continue
+            if old is None and row is None and ticker in self._rows:
+                continue
+
+            self._rows[ticker] = row
+            self._states[ticker] = self._row_states(row)
+            if row is not None:
+                self._update_pixmap(ticker, row['sparkline'])
+            self.dataChanged.emit(self.index(position, 0), self.index(position, last_column))
+
+    def _update_pixmap(self, ticker: str, closes):
+        cached = self._pixmaps.get(ticker)
+        if cached is not None and np.array_equal(cached[0], closes):
+            return
+        size = self.SPARKLINE_SIZE
+        self._pixmaps[ticker] = (closes, sparkline_pixmap(closes, size.width(), size.height()))
+
+    @staticmethod
+    def _row_states(row) -> dict:
+        states = {}
+        for name, data_tuple in ((row or {}).get('indicadores') or {}).items():
+            if math.isnan(data_tuple[0]):
+                continue
+            display_value, state, info_text = indicator_display(name, data_tuple)
+            states[name] = (state, f"{name}: {display_value} · {info_text}")
+        return states
+
+class WatchlistTable(QTableView):
+    """Virtualized view over a WatchlistModel, emits the ticker of a double clicked row"""
+
+    ticker_activated = pyqtSignal(str)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.watchlist_model = WatchlistModel(self)
+        self.setModel(self.watchlist_model)
+        self.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.setSelectionMode(QAbstractItemView.SelectionMode.SingleSelection)
+        self.setIconSize(WatchlistModel.SPARKLINE_SIZE)
+        self.setWordWrap(False)
+        self.verticalHeader().hide()
+        # Fixed row heights let the view skip measuring rows it doesn't paint
+        self.verticalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
+        self.verticalHeader().setDefaultSectionSize(WatchlistModel.SPARKLINE_SIZE.height() + 8)
+        header = self.horizontalHeader()
+        header.setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        header.setSectionResizeMode(WatchlistModel.SPARKLINE_COLUMN, QHeaderView.ResizeMode.Fixed)
+        self.setColumnWidth(WatchlistModel.SPARKLINE_COLUMN, WatchlistModel.SPARKLINE_SIZE.width() + 12)
+        self.doubleClicked.connect(self._on_double_clicked)
+
+    def _on_double_clicked(self, index):
+        self.ticker_activated.emit(self.watchlist_model.data(index, Qt.ItemDataRole.UserRole))
+
+    def update_data(self, tickers: list, rows: dict):
+        self.watchlist_model.update_data(tickers, rows)
+
+# Risk
+
+def _format_percent(value: float) -> str:
+    return "—" if not np.isfinite(value) else f"{value * 100:.1f}%"
+
+class RiskView(QWidget):
+    """
+    Correlation heatmap of the saved tickers, with volatility and beta per ticker.
+    Clicking a cell plots the rolling correlation of that pair.
+    """
+
+    refresh_requested = pyqtSignal()
+
+    # Tickers are only written on the axes when they fit
+    MAX_AXIS_LABELS = 40
+    ROLLING_WINDOW = 60
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._model = None
+        self._correlation = None
+        self._pair = None
+
+        layout = QVBoxLayout(self)
+
+        header = QHBoxLayout()
+        title = QLabel("Riesgo")
+        title.setStyleSheet("font-size: 18px; font-weight: 600;")
+        header.addWidget(title)
+        self.summary_label = QLabel()
+        header.addWidget(self.summary_label)
+        header.addStretch()
+        refresh_button = QPushButton("Actualizar")
+        refresh_button.setFocusPolicy(Qt.FocusPolicy.NoFocus)
+        refresh_button.clicked.connect(self.refresh_requested)
+        header.addWidget(refresh_button)
+        layout.addLayout(header)
+
+        body = QHBoxLayout()
+        left = QVBoxLayout()
+
+        self.heatmap = pg.PlotWidget()
+        self.heatmap.setBackground("w")
+        self.heatmap.setMenuEnabled(False)
+        self.heatmap.setAspectLocked(True)
+        self.heatmap.invertY(True)
+        self.heatmap.hideButtons()
+        self.image = pg.ImageItem(axisOrder="row-major")
+        colormap = pg.ColorMap([0.0, 0.5, 1.0], ["#2563eb", "#ffffff", "#F44336"])
+        self.image.setLookupTable(colormap.getLookupTable(nPts=256))
+        self.image.setLevels([-1, 1])
+        self.heatmap.addItem(self.image)
+        self.heatmap.scene().sigMouseMoved.connect(self._on_mouse_moved)
+        self.heatmap.scene().sigMouseClicked.connect(self._on_mouse_clicked)
+        left.addWidget(self.heatmap, stretch=3)
+
+        self.hover_label = QLabel("Pase el mouse sobre la matriz para ver la correlación de cada par")
+        left.addWidget(self.hover_label)
+
+        self.pair_label = QLabel("Haga clic en una celda para ver la correlación móvil del par")
+        left.addWidget(self.pair_label)
+
+        self.rolling_plot = pg.PlotWidget()
+        self.rolling_plot.setBackground("w")
+        self.rolling_plot.setMenuEnabled(False)
+        self.rolling_plot.setYRange(-1, 1)
+        self.rolling_plot.setFixedHeight(160)
+        self.rolling_plot.getAxis('bottom').setTicks([])
+        left.addWidget(self.rolling_plot, stretch=1)
+        body.addLayout(left, stretch=3)
+
+        self.table = QTableWidget(0, 3)
+        self.table.setHorizontalHeaderLabels(["Ticker", "Volatilidad", "Beta"])
+        self.table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.table.setSelectionMode(QAbstractItemView.SelectionMode.NoSelection)
+        self.table.verticalHeader().hide()
+        self.table.verticalHeader().setDefaultSectionSize(24)
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        self.table.setFixedWidth(300)
+        body.addWidget(self.table, stretch=1)
+        layout.addLayout(body)
+
+    def set_model(self, model):
+        """Redraws everything from a RiskModel, called again after each update"""
+        self._model = model
+        tickers = model.tickers
+        self._correlation = model.correlation()
+        self.image.setImage(self._correlation, autoLevels=False)
+        self.image.setRect(QRectF(0, 0, len(tickers), len(tickers)))
+
+        ticks = []
+        if len(tickers) <= self.MAX_AXIS_LABELS:
+            ticks = [(i + 0.5, ticker) for i, ticker in enumerate(tickers)]
+        self.heatmap.getAxis('bottom').setTicks([ticks])
+        self.heatmap.getAxis('left').setTicks([ticks])
+
+        volatility = model.volatility()
+        betas = model.betas()
+        order = np.argsort(np.nan_to_num(volatility, nan=-1.0))[::-1]
+        self.table.setRowCount(len(tickers))
+        for row, i in enumerate(order):
+            beta = "—" if not np.isfinite(betas[i]) else f"{betas[i]:.2f}"
+            for column, text in enumerate((tickers[i], _format_percent(volatility[i]), beta)):
+                self.table.setItem(row, column, QTableWidgetItem(text))
+
+        benchmark = f" · beta contra {model.benchmark}" if model.benchmark else ""
+        self.summary_label.setText(
+            f"Volatilidad de la cartera (pesos iguales): {_format_percent(model.portfolio_volatility())}"
+            f" · {len(tickers)} tickers{benchmark}"
+        )
+
+        if self._pair is not None and all(t in model.index for t in self._pair):
+            self._draw_rolling(*self._pair)
+        else:
+            self._pair = None
+            self.rolling_plot.clear()
+
+    def clear(self):
+        self._model = None
+        self._correlation = None
+        self._pair = None
+        self.image.clear()
+        self.rolling_plot.clear()
+        self.table.setRowCount(0)
+        self.summary_label.clear()
+
+    def _cell(self, scene_pos):
+        if self._model is None or not self.heatmap.sceneBoundingRect().contains(scene_pos):
+            return None
+        point = self.heatmap.getViewBox().mapSceneToView(scene_pos)
+        row, column = int(math.floor(point.y())), int(math.floor(point.x()))
+        if 0 <= row < len(self._model) and 0 <= column < len(self._model):
+            return row, column
+        return None
+
+    def _on_mouse_moved(self, scene_pos):
+        cell = self._cell(scene_pos)
+        if cell is None:
+            return
+        row, column = cell
+        value = self._correlation[row, column]
+        text = "sin datos suficientes" if not np.isfinite(value) else f"{value:+.2f}"
+        self.hover_label.setText(f"{self._model.tickers[row]} / {self._model.tickers[column]}: {text}")
+
+    def _on_mouse_clicked(self, event):
+        cell = self._cell(event.scenePos())
+        if cell is None or cell[0] == cell[1]:
+            return
+        self._pair = tuple(self._model.tickers[i] for i in cell)
+        self._draw_rolling(*self._pair)
+
+    def _draw_rolling(self, first: str, second: str):
+        _, values = self._model.rolling_correlation(first, second, self.ROLLING_WINDOW)
+        self.rolling_plot.clear()
+        self.pair_label.setText(f"Correlación móvil de {self.ROLLING_WINDOW} días: {first} / {second}")
+        self.rolling_plot.addItem(pg.InfiniteLine(
+            pos=0, angle=0, pen=pg.mkPen("#9E9E9E", style=Qt.PenStyle.DashLine)
+        ))
+        self.rolling_plot.plot(
+            np.arange(len(values)), values, pen=pg.mkPen("#2563eb", width=2), connect='finite'
+        )
+
+# Alerts
+
+class AlertsView(QWidget):
+    """
+    Ventana para definir reglas de alerta y ver las alertas disparadas.
+    Solo muestra y emite el texto de las reglas, el motor las interpreta.
+    """
+
+    rule_added = pyqtSignal(str)
+    rule_removed = pyqtSignal(str)
+
+    MAX_NOTIFICATIONS = 500
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowFlags(Qt.WindowType.Window)
+        self.setWindowTitle("Alertas")
+        self.setMinimumSize(460, 480)
+
+        layout = QVBoxLayout(self)
+
+        input_layout = QHBoxLayout()
+        self.rule_input = QLineEdit()
+        self.rule_input.setPlaceholderText("Ej: RSI < 30, precio cruza arriba SMA200, AAPL: ATR > 5")
+        self.rule_input.returnPressed.connect(self._on_add)
+        add_button = QPushButton("Agregar")
+        add_button.clicked.connect(self._on_add)
+        input_layout.addWidget(self.rule_input)
+        input_layout.addWidget(add_button)
+        layout.addLayout(input_layout)
+
+        layout.addWidget(QLabel("Reglas"))
+        self.rule_list = QListWidget()
+        layout.addWidget(self.rule_list, stretch=1)
+        remove_button = QPushButton("Eliminar regla")
+        remove_button.clicked.connect(self._on_remove)
+        layout.addWidget(remove_button, alignment=Qt.AlignmentFlag.AlignRight)
+
+        layout.addWidget(QLabel("Alertas disparadas"))
+        self.alert_list = QListWidget()
+        self.alert_list.setUniformItemSizes(True)
+        layout.addWidget(self.alert_list, stretch=2)
+
+    def _on_add(self):
+        text = self.rule_input.text().strip()
+        if text:
+            self.rule_added.emit(text)
+
+    def _on_remove(self):
+        item = self.rule_list.currentItem()
+        if item is not None:
+            self.rule_removed.emit(item.text())
+
+    def set_rules(self, rules: list):
+        self.rule_list.clear()
+        self.rule_list.addItems(rules)
+        self.rule_input.clear()
+
+    def add_alerts(self, alerts: list):
+        """Newest first, keeping at most MAX_NOTIFICATIONS"""
+        for alert in alerts[:self.MAX_NOTIFICATIONS]:
+            self.alert_list.insertItem(0, str(alert))
+        while self.alert_list.count() > self.MAX_NOTIFICATIONS:
+            self.alert_list.takeItem(self.alert_list.count() - 1)
+
+# Memory accounting
+
+def _format_bytes(size: int) -> str:
+    if size >= 1024 * 1024:
+        return f"{size / (1024 * 1024):.1f} MB"
+    return f"{size / 1024:.1f} KB"
+
+class MemoryView(QWidget):
+    """
+    Ventana con el uso de memoria: lo que ocupa cada caché contra el límite
+    global y, si el seguimiento está activo, lo asignado por cada subsistema.
+    """
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowFlags(Qt.WindowType.Window)
+        self.setWindowTitle("Uso de memoria")
+        self.setMinimumSize(420, 360)
+
+        layout = QVBoxLayout(self)
+
+        self.table = QTableWidget(0, 3)
+        self.table.setHorizontalHeaderLabels(["Origen", "Tamaño", "Bloques"])
+        self.table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.table.setSelectionMode(QAbstractItemView.SelectionMode.NoSelection)
+        self.table.verticalHeader().hide()
+        self.table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+        layout.addWidget(self.table)
+
+        self.trace_check = QCheckBox("Seguimiento de asignaciones (más lento)")
+        self.trace_check.setChecked(memory.is_tracing())
+        self.trace_check.toggled.connect(self._on_trace_toggled)
+        layout.addWidget(self.trace_check)
+
+        button_layout = QHBoxLayout()
+        button_layout.addStretch()
+        refresh_button = QPushButton("Actualizar")
+        refresh_button.clicked.connect(self.refresh)
+        close_button = QPushButton("Cerrar")
+        close_button.clicked.connect(self.close)
+        button_layout.addWidget(refresh_button)
+        button_layout.addWidget(close_button)
+        layout.addLayout(button_layout)
+
+    def _on_trace_toggled(self, checked: bool):
+        if checked:
+            memory.start_tracing()
+        else:
+            memory.stop_tracing()
+        self.refresh()
+
+    def refresh(self):
+        usage = memory.usage()
+        rows = [(f"Caché: {name}", _format_bytes(size), "") for name, size in usage.items()]
+        rows.append((
+            "Cachés (total / límite)",
+            f"{_format_bytes(sum(usage.values()))} / {_format_bytes(memory.CACHE_LIMIT)}",
+            ""
+        ))
+        rows += [
+            (name, _format_bytes(size), str(count))
+            for name, size, count in memory.snapshot_by_subsystem()
+        ]
+
+        self.table.setRowCount(len(rows))
+        for row, values in enumerate(rows):
+            for column, text in enumerate(values):
+                self.table.setItem(row, column, QTableWidgetItem(text))
+
+    def showEvent(self, event):
+        self.refresh()
+        super().showEvent(event)